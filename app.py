@@ -1,9 +1,16 @@
 import os
+import time
+import uuid
 import logging
 import traceback
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
-from scraper import scrape_job_posting
-from text_processor import extract_job_details
+from flask import (Flask, Response, render_template, request, jsonify, redirect, url_for, session, flash,
+                   stream_with_context)
+from scraper import scrape_job_posting, fetch_cache, normalize_url
+from llm_extractor import get_cache_stats, get_pool_stats
+from text_processor import near_duplicate_index
+from job_queue import JobQueue, JobFailed, DONE, FAILED, FINAL_EVENTS
+from models import db, save_result, get_result
+from extract_pipeline import ExtractionBatch, API_MAX_ITEMS, extract_shared, extraction_flight
 
 # Configure logging
 logging.basicConfig(level=logging.ERROR,
@@ -17,6 +24,59 @@ logger.info("Starting application...")
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 
+# Finished results are kept in SQLite (under the instance folder) unless DATABASE_URL points elsewhere
+database_url = os.environ.get("DATABASE_URL", "sqlite:///results.db")
+if database_url.startswith("postgres://"):
+    database_url = database_url.replace("postgres://", "postgresql://", 1)
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "pool_recycle": 300,
+    "pool_pre_ping": True,
+}
+db.init_app(app)
+with app.app_context():
+    db.create_all()
+
+# Seconds browsers and proxies may reuse a finished results page; results never change once stored
+RESULTS_CACHE_MAX_AGE = int(os.environ.get("RESULTS_CACHE_MAX_AGE", "3600"))
+
+# Relay model output token by token in the event stream (per-field LLM calls only)
+SSE_TOKEN_STREAMING = os.environ.get("SSE_TOKEN_STREAMING", "").lower() in ("1", "true", "yes")
+# How often an event stream checks for new events, and how long one connection lasts
+# before the browser is left to reconnect (which resumes from the last event id)
+SSE_POLL_INTERVAL = float(os.environ.get("SSE_POLL_INTERVAL", "0.2"))
+SSE_MAX_DURATION = float(os.environ.get("SSE_MAX_DURATION", "120"))
+SSE_KEEPALIVE = 15
+
+def run_scrape_job(payload, emit):
+    """Fetch a job posting and extract its details; runs on a job queue worker."""
+    url = payload['url']
+    logger.debug(f"Scraping URL: {url}")
+    emit('status', {'status': 'fetching'})
+    html_content = scrape_job_posting(url)
+    
+    if not html_content:
+        raise JobFailed('Failed to retrieve content from the provided URL')
+    
+    emit('status', {'status': 'extracting'})
+    job_details = extract_shared(html_content, url, progress=emit, stream_tokens=SSE_TOKEN_STREAMING)
+    
+    # The job only records where the result went; the details live in the result store
+    with app.app_context():
+        save_result(payload['result_id'], url, job_details)
+    return {"result_id": payload['result_id']}
+
+# Scrapes run in the background; every web worker process sharing JOB_QUEUE_PATH sees the same jobs
+job_queue = JobQueue(
+    db_path=os.environ.get("JOB_QUEUE_PATH", "job_queue.db"),
+    handler=run_scrape_job,
+    workers=int(os.environ.get("JOB_WORKERS", "2")),
+)
+
+def wants_json():
+    """Whether the client prefers a JSON response over an HTML page."""
+    return request.accept_mimetypes.best == 'application/json'
+
 @app.route('/', methods=['GET'])
 def index():
     """Render the main page with the scraper form."""
@@ -29,49 +89,186 @@ def health_check():
     logger.info("Health check endpoint accessed")
     return jsonify({"status": "ok", "message": "Application is running"})
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Report cache counters and job queue depth for sizing."""
+    return jsonify({
+        "llm_cache": get_cache_stats(),
+        "ollama": get_pool_stats(),
+        "fetch_cache": fetch_cache.stats(),
+        "jobs": job_queue.stats(),
+        "singleflight": extraction_flight.stats(),
+        "near_duplicates": near_duplicate_index.stats(),
+    })
+
 @app.route('/scrape', methods=['POST'])
 def scrape():
-    """Handle the job URL submission and scraping process."""
+    """Queue the job URL for scraping and point the client at its results."""
     url = request.form.get('job_url')
     
     if not url:
+        if wants_json():
+            return jsonify({"error": "Please enter a valid URL"}), 400
         flash('Please enter a valid URL', 'danger')
         return redirect(url_for('index'))
     
-    try:
-        # Scrape the job posting
-        logger.debug(f"Scraping URL: {url}")
-        html_content = scrape_job_posting(url)
-        
-        if not html_content:
-            flash('Failed to retrieve content from the provided URL', 'danger')
-            return redirect(url_for('index'))
-        
-        # Extract job details from the content
-        job_details = extract_job_details(html_content, url)
-        
-        # Store the results in session for display
-        session['job_details'] = job_details
-        session['source_url'] = url
-        
-        return redirect(url_for('results'))
-    
-    except Exception as e:
-        logger.error(f"Error during scraping: {str(e)}")
-        flash(f'Error during scraping: {str(e)}', 'danger')
-        return redirect(url_for('index'))
+    # The result is stored under the job's id, so one id serves for progress and results.
+    # Submissions of a URL already being scraped join that job instead of starting another.
+    job_id = uuid.uuid4().hex
+    job_id = job_queue.submit({"url": url, "result_id": job_id}, job_id=job_id,
+                              dedupe_key=normalize_url(url))
+    logger.debug(f"Queued job {job_id} for {url}")
+    session['job_id'] = job_id
+    
+    if wants_json():
+        return jsonify({
+            "job_id": job_id,
+            "status_url": url_for('job_status', job_id=job_id),
+            "results_url": url_for('job_results', job_id=job_id),
+        }), 202
+    return redirect(url_for('job_results', job_id=job_id))
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report a scrape job's status, with the job details once it is done."""
+    job = job_queue.get(job_id)
+    result = get_result(job_id) if job is None or job['status'] == DONE else None
+    if result is not None:
+        return jsonify({
+            "job_id": job_id,
+            "status": DONE,
+            "source_url": result.source_url,
+            "job_details": result.job_details,
+            "error": None,
+        })
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    
+    return jsonify({
+        "job_id": job['id'],
+        "status": job['status'],
+        "source_url": job['payload']['url'],
+        "job_details": None,
+        "error": job['error'],
+    })
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream a scrape job's progress as server-sent events.
+    
+    Events: "status", "field" (one per extracted field), "token" (model output
+    while a field streams), then "done" or "failed". Every event carries an id,
+    so a reconnecting EventSource resumes where it left off.
+    """
+    if job_queue.get(job_id) is None:
+        if get_result(job_id) is not None:
+            # The job has been cleaned up but its result is stored
+            return Response(f"event: {DONE}\ndata: {app.json.dumps({'status': DONE})}\n\n",
+                            mimetype='text/event-stream')
+        return jsonify({"error": "Unknown job"}), 404
+    
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('after') or '0'
+    last_id = int(last_id) if last_id.isdigit() else 0
+    
+    def stream():
+        nonlocal last_id
+        started = time.monotonic()
+        last_sent = started
+        while time.monotonic() - started < SSE_MAX_DURATION:
+            events = job_queue.events(job_id, last_id)
+            for event_id, event, data in events:
+                last_id = event_id
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+                if event in FINAL_EVENTS:
+                    return
+            
+            now = time.monotonic()
+            if events:
+                last_sent = now
+                continue
+            job = job_queue.get(job_id)
+            if job is None or job['status'] in (DONE, FAILED):
+                # Finished without a final event (e.g. abandoned by a crashed worker)
+                status = job['status'] if job else FAILED
+                error = job['error'] if job else 'Unknown job'
+                yield f"event: {status}\ndata: {app.json.dumps({'status': status, 'error': error})}\n\n"
+                return
+            if now - last_sent >= SSE_KEEPALIVE:
+                last_sent = now
+                yield ": keep-alive\n\n"
+            time.sleep(SSE_POLL_INTERVAL)
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/extract', methods=['POST'])
+def api_extract():
+    """
+    Extract job details from a batch of URLs and documents.
+    
+    Takes a JSON object with an "items" list; each item is a URL string or an
+    object with one of "url", "html" or "text" and an optional "id". Responds
+    with NDJSON, one line per item as it finishes, carrying the item's
+    "index" (and "id") with either "job_details" or "error".
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a JSON object with a non-empty items list"}), 400
+    if len(items) > API_MAX_ITEMS:
+        return jsonify({"error": f"At most {API_MAX_ITEMS} items per request"}), 413
+    
+    def stream():
+        for result in ExtractionBatch(items):
+            yield app.json.dumps(result) + "\n"
+    
+    return Response(stream(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'})
 
 @app.route('/results')
 def results():
-    """Display the scraped job details."""
-    job_details = session.get('job_details')
-    source_url = session.get('source_url')
+    """Display the results of the last job submitted in this session."""
+    job_id = session.get('job_id')
     
-    if not job_details:
+    if not job_id:
         flash('No job details found. Please try scraping again.', 'warning')
         return redirect(url_for('index'))
     
-    return render_template('results.html', job_details=job_details, source_url=source_url)
+    return redirect(url_for('job_results', job_id=job_id))
+
+@app.route('/results/<job_id>')
+def job_results(job_id):
+    """Display the scraped job details, or a progress page that polls until they are ready."""
+    result = get_result(job_id)
+    if result is not None:
+        response = app.make_response(render_template(
+            'results.html', job_details=result.job_details, source_url=result.source_url,
+            job_id=job_id, job_status=DONE))
+        # A stored result never changes, so it can be cached and revalidated by its id
+        response.set_etag(job_id)
+        response.last_modified = result.created_at
+        response.cache_control.public = True
+        response.cache_control.max_age = RESULTS_CACHE_MAX_AGE
+        return response.make_conditional(request)
+    
+    job = job_queue.get(job_id)
+    
+    if job is None:
+        flash('No job details found. Please try scraping again.', 'warning')
+        return redirect(url_for('index'))
+    
+    if job['status'] == FAILED:
+        flash(job['error'] or 'Error during scraping', 'danger')
+        return redirect(url_for('index'))
+    
+    # Still running (or just finished and being stored); the page polls until the result is ready
+    response = app.make_response(render_template('results.html', job_details=None,
+                                                 source_url=job['payload']['url'],
+                                                 job_id=job_id, job_status=job['status']))
+    response.cache_control.no_store = True
+    return response
 
 @app.errorhandler(404)
 def page_not_found(e):
@@ -0,0 +1,526 @@
+"""
+Offline batch extraction over a local corpus of job postings.
+
+Reads a directory of HTML files, a WARC file (optionally gzipped) or a
+JSONL file of {"url", "html"} records, runs the heuristic extraction on a
+pool of worker processes and streams the results to JSONL or Parquet.
+Each worker compiles the skill and role matchers once when it starts.
+LLM refinement is optional and runs in the parent process on a thread
+pool, so the CPU-bound parsing never waits on Ollama.
+
+Progress is checkpointed: the ids of records whose results have been
+written are appended to a checkpoint file along with the output's size at
+that point, and a rerun skips them. A rerun first cuts the output back to
+that size, so rows written after the last checkpoint are not duplicated.
+An existing output with no checkpoint is only overwritten with --restart.
+
+Example:
+    python batch_extract.py postings.warc.gz -o results.jsonl -j 8
+    python batch_extract.py postings/ -o results.parquet --llm
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from trafilatura.utils import decode_file
+
+from html_stream import is_html_content_type
+from llm_extractor import LLM_CONCURRENCY
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+HTML_EXTENSIONS = (".html", ".htm", ".xhtml")
+DETAIL_FIELDS = ["title", "company", "location", "experience", "role_type", "description_excerpt"]
+LIST_FIELDS = ["skills", "responsibilities", "qualifications"]
+
+# Whether workers keep the plain text for the LLM stage; set by the pool initializer
+_keep_text = False
+
+
+def read_directory(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield a record for every HTML file under a directory, keyed by its relative path."""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(HTML_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, name)
+            with open(file_path, 'rb') as f:
+                body = f.read()
+            yield {"id": os.path.relpath(file_path, path), "url": None, "html": body}
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the {"url", "html"} records of a JSONL file, keyed by "id", the URL or the line number."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                logger.error(f"Skipping invalid JSON on line {line_number} of {path}: {e}")
+                continue
+            if not isinstance(record, dict) or not record.get("html"):
+                logger.error(f"Skipping line {line_number} of {path}: no html")
+                continue
+            record_id = record.get("id") or record.get("url") or f"line:{line_number}"
+            yield {"id": str(record_id), "url": record.get("url"), "html": record["html"]}
+
+
+def read_warc(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the successful HTML responses stored in a WARC file, keyed by WARC-Record-ID.
+
+    A minimal reader: records are read one at a time, only "response"
+    records holding an HTTP 200 with an HTML content type are kept, and
+    chunked or gzip/deflate-encoded payloads are decoded.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rb') as f:
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            if not line.startswith(b"WARC/"):
+                raise ValueError(f"Not a WARC record header in {path}: {line[:40]!r}")
+
+            headers = _read_headers(f)
+            block = f.read(int(headers.get("content-length", "0")))
+            if headers.get("warc-type") != "response" or "application/http" not in headers.get("content-type", ""):
+                continue
+            try:
+                body = _http_payload(block)
+            except (ValueError, zlib.error) as e:
+                logger.error(f"Skipping unreadable response for {headers.get('warc-target-uri')}: {e}")
+                continue
+            if body is None:
+                continue
+            record_id = headers.get("warc-record-id") or headers.get("warc-target-uri")
+            yield {"id": record_id, "url": headers.get("warc-target-uri"), "html": body}
+
+
+def _read_headers(f) -> Dict[str, str]:
+    """Read "Name: value" lines up to a blank line; names are lowercased."""
+    headers = {}
+    for line in iter(f.readline, b""):
+        if not line.strip():
+            break
+        name, _, value = line.decode("utf-8", "replace").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _http_payload(block: bytes) -> Optional[bytes]:
+    """Return the decoded body of a stored HTTP response, or None if it is not a 200 HTML page."""
+    separator = block.find(b"\r\n\r\n")
+    head, body = (block[:separator], block[separator + 4:]) if separator != -1 else block.split(b"\n\n", 1)
+    lines = head.decode("iso-8859-1").splitlines()
+    status = lines[0].split()
+    if len(status) < 2 or status[1] != "200":
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if not is_html_content_type(headers.get("content-type")):
+        return None
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        body = _dechunk(body)
+    encoding = headers.get("content-encoding", "").lower()
+    if encoding in ("gzip", "x-gzip"):
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        body = zlib.decompress(body)
+    return body
+
+
+def _dechunk(body: bytes) -> bytes:
+    parts = []
+    pos = 0
+    while pos < len(body):
+        line_end = body.find(b"\r\n", pos)
+        if line_end == -1:
+            break
+        size = int(body[pos:line_end].split(b";", 1)[0], 16)
+        if size == 0:
+            break
+        parts.append(body[line_end + 2:line_end + 2 + size])
+        pos = line_end + 2 + size + 2
+    return b"".join(parts)
+
+
+def iter_records(path: str, input_format: str = "auto") -> Iterator[Dict[str, Any]]:
+    """
+    Read a corpus as records with "id", "url" and "html" (str or undecoded bytes).
+
+    Args:
+        path (str): Directory, WARC file or JSONL file.
+        input_format (str): "dir", "warc", "jsonl", or "auto" to decide from the path.
+    """
+    if input_format == "auto":
+        name = path.lower()
+        if os.path.isdir(path):
+            input_format = "dir"
+        elif ".warc" in name:
+            input_format = "warc"
+        else:
+            input_format = "jsonl"
+    readers = {"dir": read_directory, "warc": read_warc, "jsonl": read_jsonl}
+    return readers[input_format](path)
+
+
+def _init_worker(keep_text: bool) -> None:
+    """Load and compile the matchers once per worker process."""
+    global _keep_text
+    _keep_text = keep_text
+    import text_processor
+    text_processor.SKILL_TAXONOMY.word_matcher.compile()
+    text_processor.SKILL_TAXONOMY.space_matcher.compile()
+    for matcher in text_processor.ROLE_TYPE_MATCHERS.values():
+        matcher.compile()
+
+
+def _extract_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the heuristic extraction for one record in a worker process."""
+    from text_processor import extract_heuristic_details
+
+    result = {"id": record["id"], "url": record["url"]}
+    try:
+        html_content = record["html"]
+        if isinstance(html_content, bytes):
+            html_content = decode_file(html_content)
+        job_details, plain_text, fields = extract_heuristic_details(html_content, record["url"] or "")
+    except Exception as e:
+        logger.exception(f"Error extracting {record['id']}")
+        result["error"] = f"Error during processing: {str(e)}"
+        return result
+    result["job_details"] = job_details
+    if _keep_text:
+        result["text"] = plain_text
+        result["fields"] = fields
+    return result
+
+
+def _refine_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the LLM stage for one extracted record in the parent process."""
+    from text_processor import refine_with_llm
+
+    try:
+        refine_with_llm(result["job_details"], result.pop("text"), result.pop("fields"))
+    except Exception as e:
+        logger.error(f"LLM refinement failed for {result['id']}, keeping heuristic details: {e}")
+    return result
+
+
+def output_row(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a result into one output row."""
+    job_details = result.get("job_details") or {}
+    row = {"id": result["id"], "url": result["url"]}
+    for field in DETAIL_FIELDS:
+        row[field] = job_details.get(field)
+    for field in LIST_FIELDS:
+        row[field] = job_details.get(field)
+    row["error"] = result.get("error")
+    return row
+
+
+class JsonlOutput:
+    """
+    Append rows to a JSONL file.
+
+    Args:
+        path (str): The JSONL file.
+        position (int): Size in bytes of the file at the last checkpoint; anything
+            after it is removed. None keeps the file as it is.
+    """
+
+    def __init__(self, path: str, position: Optional[int] = None):
+        self._file = open(path, 'a', encoding='utf-8')
+        size = os.fstat(self._file.fileno()).st_size
+        if position is not None and size > position:
+            logger.warning(f"Removing {size - position} bytes written to {path} after the last checkpoint")
+            self._file.truncate(position)
+        elif position is not None and size < position:
+            logger.warning(f"{path} is shorter than at the last checkpoint, rows may be missing")
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def flush(self) -> int:
+        """Make the rows written so far durable; returns the file's size for the checkpoint."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+
+class ParquetOutput:
+    """
+    Write rows to a directory of Parquet part files, one per flush.
+
+    Requires pyarrow. Part files are written under a temporary name and
+    renamed when complete, so a crash never leaves a truncated part.
+
+    Args:
+        path (str): The output directory.
+        position (int): Number of parts at the last checkpoint; later parts are
+            removed. None keeps every part.
+    """
+
+    def __init__(self, path: str, position: Optional[int] = None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.schema = pyarrow.schema(
+            [("id", pyarrow.string()), ("url", pyarrow.string())]
+            + [(field, pyarrow.string()) for field in DETAIL_FIELDS]
+            + [(field, pyarrow.list_(pyarrow.string())) for field in LIST_FIELDS]
+            + [("error", pyarrow.string())]
+        )
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        parts = sorted(name for name in os.listdir(path) if name.endswith(".parquet"))
+        if position is not None:
+            for name in parts[position:]:
+                logger.warning(f"Removing {name}, written after the last checkpoint")
+                os.remove(os.path.join(path, name))
+            parts = parts[:position]
+        self._part = len(parts)
+        self._rows = []
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+
+    def flush(self) -> int:
+        """Write the buffered rows as a new part file; returns the number of parts for the checkpoint."""
+        if not self._rows:
+            return self._part
+        table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+        part_path = os.path.join(self.path, f"part-{self._part:05d}.parquet")
+        self._pq.write_table(table, part_path + ".tmp")
+        os.replace(part_path + ".tmp", part_path)
+        self._part += 1
+        self._rows = []
+        return self._part
+
+    def close(self) -> None:
+        self.flush()
+
+
+class Checkpoint:
+    """
+    Append-only file of the ids of records whose results have been written.
+
+    Each checkpoint appends its ids followed by a commit line holding the
+    output's position (see the outputs' flush). Ids after the last commit
+    line were being written when a run stopped, so they are dropped on load
+    and their records are extracted again.
+
+    Args:
+        path (str): The checkpoint file.
+    """
+
+    COMMIT = "#commit "
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        # Output position at the last commit; None when starting without a checkpoint
+        self.position = None
+        if os.path.exists(path):
+            self.position = 0
+            committed_size = 0
+            pending = []
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    text = line[:-1].decode('utf-8')
+                    if text.startswith(self.COMMIT):
+                        self.done.update(pending)
+                        pending = []
+                        self.position = int(text[len(self.COMMIT):])
+                        committed_size = f.tell()
+                    elif text:
+                        pending.append(text)
+            # Drop a commit that was cut short, so new entries start on a clean line
+            with open(path, 'r+b') as f:
+                f.truncate(committed_size)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def add(self, ids: Iterable[str], position: int) -> None:
+        """Record ids as done, with the output position after their rows were flushed."""
+        ids = list(ids)
+        if not ids:
+            return
+        self._file.write("".join(f"{record_id}\n" for record_id in ids) + f"{self.COMMIT}{position}\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.update(ids)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def run_batch(records: Iterable[Dict[str, Any]], output, checkpoint: Checkpoint, processes: int,
+              use_llm: bool = False, checkpoint_every: int = 1000) -> Dict[str, int]:
+    """
+    Extract every record not yet in the checkpoint and write the results.
+
+    Args:
+        records (iterable): Records from iter_records.
+        output: JsonlOutput or ParquetOutput.
+        checkpoint (Checkpoint): Ids already done; extended as results are written.
+        processes (int): Worker processes for the heuristic extraction.
+        use_llm (bool): Refine the extracted fields with the LLM.
+        checkpoint_every (int): Results written between checkpoints.
+
+    Returns:
+        dict: Counts of processed, failed and skipped records.
+    """
+    stats = {"processed": 0, "errors": 0, "skipped": 0}
+    written = []
+    # Bound the records held in memory: a few per worker, and a few per LLM slot
+    max_extracting = processes * 4
+    max_refining = LLM_CONCURRENCY * 4
+
+    def emit(result):
+        output.write(output_row(result))
+        stats["processed"] += 1
+        if result.get("error"):
+            stats["errors"] += 1
+        written.append(result["id"])
+        if len(written) >= checkpoint_every:
+            # Results are durable before their ids are checkpointed, and a resume cuts the output
+            # back to the checkpointed position, so a crash can only repeat work
+            checkpoint.add(written, output.flush())
+            written.clear()
+
+    record_iter = iter(records)
+    extracting = set()
+    refining = set()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(use_llm,)) as pool, \
+            ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="batch-llm") as llm_pool:
+        exhausted = False
+        while True:
+            while not exhausted and len(extracting) < max_extracting and len(refining) < max_refining:
+                record = next(record_iter, None)
+                if record is None:
+                    exhausted = True
+                elif record["id"] in checkpoint.done:
+                    stats["skipped"] += 1
+                else:
+                    extracting.add(pool.submit(_extract_record, record))
+            if not extracting and not refining:
+                break
+
+            done, _ = wait(extracting | refining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if future in extracting:
+                    extracting.discard(future)
+                    if use_llm and "job_details" in result:
+                        refining.add(llm_pool.submit(_refine_record, result))
+                        continue
+                else:
+                    refining.discard(future)
+                emit(result)
+
+    checkpoint.add(written, output.flush())
+    return stats
+
+
+def _has_output(path: str) -> bool:
+    """Whether a JSONL output file or Parquet output directory already holds rows."""
+    if os.path.isdir(path):
+        return any(name.endswith(".parquet") for name in os.listdir(path))
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract job details from a local corpus of job postings.")
+    parser.add_argument("input", help="Directory of HTML files, WARC file or JSONL file of {url, html} records")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Output JSONL file, or Parquet directory when it ends in .parquet")
+    parser.add_argument("--input-format", choices=["auto", "dir", "warc", "jsonl"], default="auto")
+    parser.add_argument("--output-format", choices=["auto", "jsonl", "parquet"], default="auto")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for parsing and heuristic extraction")
+    parser.add_argument("--llm", action="store_true", help="Refine the extracted fields with the LLM")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000,
+                        help="Results written between checkpoints")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore and remove an existing checkpoint and output")
+    args = parser.parse_args(argv)
+
+    output_format = args.output_format
+    if output_format == "auto":
+        output_format = "parquet" if args.output.rstrip("/").endswith(".parquet") else "jsonl"
+    checkpoint_path = args.checkpoint or args.output.rstrip("/") + ".checkpoint"
+
+    if args.restart:
+        for path in (checkpoint_path, args.output):
+            if os.path.isdir(path):
+                for name in os.listdir(path):
+                    if name.endswith((".parquet", ".parquet.tmp")):
+                        os.remove(os.path.join(path, name))
+            elif os.path.exists(path):
+                os.remove(path)
+
+    if not os.path.exists(checkpoint_path) and _has_output(args.output):
+        # Without a checkpoint there is no telling which rows are already there
+        print(f"{args.output} already exists but {checkpoint_path} does not; "
+              f"use --restart to overwrite it", file=sys.stderr)
+        return 2
+
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        output_class = ParquetOutput if output_format == "parquet" else JsonlOutput
+        output = output_class(args.output, checkpoint.position)
+    except RuntimeError as e:
+        checkpoint.close()
+        print(str(e), file=sys.stderr)
+        return 2
+    if checkpoint.done:
+        print(f"Resuming: {len(checkpoint.done)} records already done", file=sys.stderr)
+
+    started = time.monotonic()
+    try:
+        stats = run_batch(iter_records(args.input, args.input_format), output, checkpoint,
+                          processes=max(args.processes, 1), use_llm=args.llm,
+                          checkpoint_every=max(args.checkpoint_every, 1))
+    finally:
+        output.close()
+        checkpoint.close()
+
+    elapsed = time.monotonic() - started
+    print(f"Processed {stats['processed']} records ({stats['errors']} errors, "
+          f"{stats['skipped']} skipped) in {elapsed:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
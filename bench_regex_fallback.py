@@ -0,0 +1,53 @@
+"""
+Benchmark the regex fallback extractors, i.e. the path every request takes
+when Ollama is unavailable.
+
+Usage:
+    python bench_regex_fallback.py [posting.txt] [iterations]
+
+Defaults to test_job_posting.txt and 200 iterations.
+"""
+
+import sys
+import time
+
+import llm_extractor
+import text_processor
+
+# Treat Ollama as down so every extractor takes the regex path
+for host in llm_extractor.ollama_pool.hosts:
+    host.breaker.probe = lambda: False
+
+EXTRACTORS = [
+    ("skills", text_processor.extract_skills),
+    ("experience", text_processor.extract_experience),
+    ("location", lambda text: text_processor.extract_location(None, text)),
+    ("role_type", text_processor.determine_role_type),
+    ("description", text_processor.extract_description_excerpt),
+    ("responsibilities", text_processor.extract_responsibilities),
+    ("qualifications", text_processor.extract_qualifications),
+]
+
+
+def run(text, iterations):
+    """Time each extractor over the given number of iterations and print a summary."""
+    total = 0.0
+    for name, extractor in EXTRACTORS:
+        extractor(text)  # warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            extractor(text)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        print(f"{name:<18} {elapsed / iterations * 1000:8.3f} ms/posting")
+    print(f"{'all fields':<18} {total / iterations * 1000:8.3f} ms/posting "
+          f"({iterations / total:.1f} postings/s)")
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "test_job_posting.txt"
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with open(path, encoding="utf-8") as f:
+        posting = f.read()
+    print(f"Regex fallback on {path} ({len(posting)} chars), {iterations} iterations")
+    run(posting, iterations)
@@ -0,0 +1,237 @@
+"""
+Asynchronous bulk fetching of job postings.
+
+Fetches many URLs concurrently with httpx, using the same browser-like
+headers, decoding, download limits and conditional-request cache as
+scraper.scrape_job_posting. Concurrency is capped globally and per host,
+429 and 5xx responses are retried with exponential backoff, and results
+are yielded as they complete.
+
+Example:
+    async for url, html in bulk_scrape(urls):
+        if html is not None:
+            details = extract_job_details(html, url)
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from trafilatura.utils import decode_file
+
+from fetch_cache import FetchCache, response_validators
+from html_stream import DownloadRejected, HTMLBodyReader
+from rate_limiter import HostRateLimiter
+from scraper import (DEFAULT_HEADERS, SCRAPER_MAX_BYTES, SCRAPER_MAX_DOWNLOAD_BYTES,
+                     SCRAPER_STRIP_SCRIPTS, fetch_cache)
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+BULK_CONCURRENCY = int(os.environ.get("BULK_CONCURRENCY", "32"))
+BULK_PER_HOST_CONCURRENCY = int(os.environ.get("BULK_PER_HOST_CONCURRENCY", "4"))
+# Requests per second to one host; 0 leaves pacing to the per-host concurrency limit
+BULK_RATE_PER_HOST = float(os.environ.get("BULK_RATE_PER_HOST", "0"))
+BULK_MAX_RETRIES = int(os.environ.get("BULK_MAX_RETRIES", "3"))
+BULK_BACKOFF = float(os.environ.get("BULK_BACKOFF", "1"))
+BULK_MAX_BACKOFF = float(os.environ.get("BULK_MAX_BACKOFF", "60"))
+BULK_TIMEOUT = float(os.environ.get("BULK_TIMEOUT", "10"))
+
+# Status codes worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class BulkFetcher:
+    """
+    Concurrent fetcher for many job posting URLs.
+
+    Args:
+        concurrency (int): Maximum requests in flight overall.
+        per_host_concurrency (int): Maximum requests in flight to one host.
+        rate_per_host (float): Requests per second allowed to one host, 0 for no limit.
+        max_retries (int): Retries after a 429, a 5xx or a transport error.
+        backoff (float): Base delay in seconds, doubled on every retry.
+        max_backoff (float): Upper bound on a single retry delay, including Retry-After.
+        timeout (float): Per-request timeout in seconds.
+        cache (FetchCache): Conditional-request cache, shared with the scraper by
+            default. None disables revalidation.
+    """
+
+    def __init__(self, concurrency: int = BULK_CONCURRENCY,
+                 per_host_concurrency: int = BULK_PER_HOST_CONCURRENCY,
+                 rate_per_host: float = BULK_RATE_PER_HOST,
+                 max_retries: int = BULK_MAX_RETRIES,
+                 backoff: float = BULK_BACKOFF,
+                 max_backoff: float = BULK_MAX_BACKOFF,
+                 timeout: float = BULK_TIMEOUT,
+                 cache: Optional[FetchCache] = fetch_cache):
+        self.concurrency = max(concurrency, 1)
+        self.per_host_concurrency = max(per_host_concurrency, 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = HostRateLimiter(rate=rate_per_host)
+        self._slots = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        # Fetches in progress per host; a host's semaphore is dropped when its count reaches 0
+        self._host_fetches: Dict[str, int] = {}
+
+    async def fetch(self, urls: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """
+        Fetch every URL and yield (url, html) as each one completes.
+
+        html is None when the URL is invalid or could not be fetched after
+        all retries. URLs are pulled from the iterable lazily, so it may be a
+        generator over a very large sitemap.
+        """
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._host_slots = {}
+        self._host_fetches = {}
+        # Keep enough tasks queued that a slow host does not idle the global slots
+        max_pending = self.concurrency * 4
+        limits = httpx.Limits(max_connections=self.concurrency,
+                              max_keepalive_connections=self.concurrency)
+
+        url_iter = iter(urls)
+        pending = set()
+        async with httpx.AsyncClient(headers=DEFAULT_HEADERS, limits=limits,
+                                     timeout=self.timeout, follow_redirects=True) as client:
+            try:
+                exhausted = False
+                while True:
+                    while not exhausted and len(pending) < max_pending:
+                        url = next(url_iter, None)
+                        if url is None:
+                            exhausted = True
+                        else:
+                            pending.add(asyncio.ensure_future(self._fetch_one(client, url)))
+                    if not pending:
+                        break
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            finally:
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _fetch_one(self, client: httpx.AsyncClient, url: str) -> Tuple[str, Optional[str]]:
+        host = urlparse(url).hostname
+        if not host:
+            logger.error(f"Invalid URL: {url}")
+            return url, None
+
+        # The semaphore is kept while any fetch for the host is in progress (including retry
+        # waits), so the per-host cap holds; idle hosts are dropped so a long crawl stays bounded
+        host_slots = self._host_slots.get(host)
+        if host_slots is None:
+            host_slots = self._host_slots[host] = asyncio.Semaphore(self.per_host_concurrency)
+        self._host_fetches[host] = self._host_fetches.get(host, 0) + 1
+        try:
+            return await self._fetch_with_retries(client, url, host, host_slots)
+        finally:
+            self._host_fetches[host] -= 1
+            if not self._host_fetches[host]:
+                del self._host_fetches[host]
+                del self._host_slots[host]
+
+    async def _fetch_with_retries(self, client: httpx.AsyncClient, url: str, host: str,
+                                  host_slots: asyncio.Semaphore) -> Tuple[str, Optional[str]]:
+        # Cache lookups (SQLite, zlib) and decoding are blocking, so they run off the event loop
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                conditional = await asyncio.to_thread(self.cache.conditional_headers, url) \
+                    if self.cache is not None else {}
+                response, body = await self._get(client, url, host, host_slots, conditional)
+                if response.status_code == 304:
+                    cached = await asyncio.to_thread(self.cache.get, url) if self.cache is not None else None
+                    if cached is not None:
+                        return url, await asyncio.to_thread(decode_file, cached.body)
+                    # The cached copy was evicted since the request went out
+                    response, body = await self._get(client, url, host, host_slots, {})
+
+                if body is not None:
+                    if self.cache is not None:
+                        await asyncio.to_thread(self.cache.store, url, body, **response_validators(response.headers))
+                    return url, await asyncio.to_thread(decode_file, body)
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+            except DownloadRejected as e:
+                logger.warning(f"Skipping {url}: {str(e)}")
+                return url, None
+            except httpx.HTTPStatusError as e:
+                logger.error(f"Request error for {url}: {str(e)}")
+                return url, None
+            except httpx.TransportError as e:
+                error = str(e) or type(e).__name__
+            except Exception as e:
+                logger.error(f"Unexpected error fetching {url}: {str(e)}")
+                return url, None
+
+            if attempt == self.max_retries:
+                logger.error(f"Giving up on {url} after {attempt + 1} attempts: {error}")
+                return url, None
+            delay = self._retry_delay(attempt, retry_after)
+            logger.warning(f"Retrying {url} in {delay:.1f}s after {error}")
+            await asyncio.sleep(delay)
+
+        return url, None
+
+    async def _get(self, client: httpx.AsyncClient, url: str, host: str,
+                   host_slots: asyncio.Semaphore,
+                   headers: Dict[str, str]) -> Tuple[httpx.Response, Optional[bytes]]:
+        """
+        Send one GET and stream its body under the download limits.
+
+        Returns the response and its body, or None for the body on a 304 or a
+        retryable status. Other error statuses raise httpx.HTTPStatusError.
+        """
+        # Take the host slot and wait out the host's rate limit before taking a global slot,
+        # so requests queued on a busy or rate-limited host do not hold global slots
+        async with host_slots:
+            delay = self.rate_limiter.reserve(host)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with self._slots:
+                async with client.stream('GET', url, headers=headers) as response:
+                    if response.status_code == 304 or response.status_code in RETRY_STATUSES:
+                        return response, None
+                    response.raise_for_status()
+                    reader = HTMLBodyReader(SCRAPER_MAX_BYTES, SCRAPER_MAX_DOWNLOAD_BYTES, SCRAPER_STRIP_SCRIPTS)
+                    reader.check_headers(response.headers)
+                    async for chunk in response.aiter_bytes():
+                        reader.feed(chunk)
+                    return response, reader.finish()
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Exponential backoff with jitter, or the server's Retry-After seconds if given."""
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), self.max_backoff)
+            except ValueError:
+                pass  # HTTP-date form, fall back to our own backoff
+        delay = self.backoff * (2 ** attempt)
+        return min(delay * random.uniform(0.5, 1.5), self.max_backoff)
+
+
+def bulk_scrape(urls: Iterable[str], **options) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """
+    Fetch many job posting URLs concurrently.
+
+    Args:
+        urls (iterable): URLs to fetch.
+        **options: BulkFetcher settings overriding the BULK_* environment defaults.
+
+    Returns:
+        async iterator: (url, html) pairs in completion order; html is None on failure.
+    """
+    return BulkFetcher(**options).fetch(urls)
@@ -0,0 +1,193 @@
+"""
+Batch extraction pipeline behind the JSON API.
+
+A batch mixes URLs to fetch with HTML or plain text documents supplied by
+the caller. Each item goes through a fetch stage (URLs only) and an extract
+stage (parsing, heuristics and the LLM calls), each run on its own shared
+thread pool, so a batch never has more than API_FETCH_CONCURRENCY downloads
+and API_EXTRACT_CONCURRENCY extractions in flight. LLM calls are further
+capped per Ollama host by the LLM pool. Results are yielded as items
+finish, and a failing item yields an error instead of failing the batch.
+
+Identical pages (by content hash) being extracted at the same time, in
+this process or another one sharing SINGLEFLIGHT_PATH, are extracted once
+and the result is shared.
+"""
+
+import hashlib
+import html
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from scraper import scrape_job_posting
+from singleflight import SingleFlight
+from text_processor import extract_job_details
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+API_FETCH_CONCURRENCY = int(os.environ.get("API_FETCH_CONCURRENCY", "8"))
+API_EXTRACT_CONCURRENCY = int(os.environ.get("API_EXTRACT_CONCURRENCY", "4"))
+API_MAX_ITEMS = int(os.environ.get("API_MAX_ITEMS", "100"))
+
+# Concurrent extractions of the same page share one run, across the processes sharing this
+# file (the job queue database by default); set it empty to coalesce within a process only
+SINGLEFLIGHT_PATH = os.environ.get("SINGLEFLIGHT_PATH", os.environ.get("JOB_QUEUE_PATH", "job_queue.db"))
+extraction_flight = SingleFlight(db_path=SINGLEFLIGHT_PATH or None)
+
+# Stage pools are shared by every batch in the process, created on first use
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_stage_executor(stage: str) -> ThreadPoolExecutor:
+    """Return the shared thread pool for the "fetch" or "extract" stage."""
+    with _executors_lock:
+        executor = _executors.get(stage)
+        if executor is None:
+            workers = API_FETCH_CONCURRENCY if stage == "fetch" else API_EXTRACT_CONCURRENCY
+            executor = _executors[stage] = ThreadPoolExecutor(max_workers=max(workers, 1),
+                                                              thread_name_prefix=f"api-{stage}")
+        return executor
+
+
+def extract_shared(html_content: str, url: str, progress=None, stream_tokens: bool = False) -> Dict[str, Any]:
+    """
+    Extract job details, sharing the run with concurrent extractions of the same page.
+
+    Takes the same arguments as text_processor.extract_job_details. Progress
+    events are only produced by the caller that runs the extraction; a caller
+    that receives a shared result is sent a "field" event per field at the end.
+    """
+    key = "extract:" + hashlib.sha256(html_content.encode('utf-8', 'surrogatepass')).hexdigest()
+    job_details, shared = extraction_flight.do(
+        key, lambda: extract_job_details(html_content, url, progress=progress, stream_tokens=stream_tokens))
+    if shared:
+        logger.info(f"Shared the extraction of an identical page for {url}")
+        if progress is not None:
+            for name, value in job_details.items():
+                progress('field', {'name': name, 'value': value})
+    return dict(job_details)
+
+
+def text_to_html(text: str) -> str:
+    """Wrap a plain text document in minimal HTML, one paragraph per line."""
+    paragraphs = "".join(f"<p>{html.escape(line)}</p>" for line in text.splitlines() if line.strip())
+    return f"<html><body>{paragraphs}</body></html>"
+
+
+def parse_item(item: Any) -> Dict[str, Any]:
+    """
+    Normalize one batch item.
+
+    Args:
+        item: A URL string, or an object with one of "url", "html" or "text"
+            and an optional caller-chosen "id".
+
+    Returns:
+        dict: The item with "url" and "html" keys set as available.
+
+    Raises:
+        ValueError: If the item is not in one of the accepted forms.
+    """
+    if isinstance(item, str):
+        item = {"url": item}
+    if not isinstance(item, dict):
+        raise ValueError("Item must be a URL or an object with url, html or text")
+    sources = [key for key in ("url", "html", "text") if item.get(key)]
+    if len(sources) != 1 or not isinstance(item[sources[0]], str):
+        raise ValueError("Item must have exactly one of url, html or text")
+    parsed = {"id": item.get("id"), "url": item.get("url"), "html": item.get("html")}
+    if sources[0] == "text":
+        parsed["html"] = text_to_html(item["text"])
+    return parsed
+
+
+class ExtractionBatch:
+    """
+    One batch of items moving through the fetch and extract stages.
+
+    Iterating yields one result dict per item, in completion order, with the
+    item's index in the request and its id if one was given, plus either
+    "job_details" or "error". Closing the iterator early cancels items that
+    have not started yet.
+
+    Args:
+        items (list): Raw batch items, see parse_item.
+    """
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self._results = queue.Queue()
+        self._futures = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        pending = 0
+        for index, raw in enumerate(self.items):
+            try:
+                item = parse_item(raw)
+            except ValueError as e:
+                yield self._result(index, raw if isinstance(raw, dict) else {}, error=str(e))
+                continue
+            pending += 1
+            if item["html"] is not None:
+                self._submit("extract", self._extract, index, item, item["html"])
+            else:
+                self._submit("fetch", self._fetch, index, item)
+
+        try:
+            for _ in range(pending):
+                yield self._results.get()
+        finally:
+            with self._lock:
+                self._closed = True
+                for future in self._futures:
+                    future.cancel()
+
+    def _submit(self, stage: str, function, *args) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._futures.append(get_stage_executor(stage).submit(function, *args))
+
+    def _fetch(self, index: int, item: Dict[str, Any]) -> None:
+        try:
+            html_content = scrape_job_posting(item["url"])
+        except Exception as e:
+            logger.exception(f"Error fetching {item['url']}")
+            self._results.put(self._result(index, item, error=f"Error fetching URL: {str(e)}"))
+            return
+        if not html_content:
+            self._results.put(self._result(index, item, error="Failed to retrieve content from the provided URL"))
+            return
+        self._submit("extract", self._extract, index, item, html_content)
+
+    def _extract(self, index: int, item: Dict[str, Any], html_content: str) -> None:
+        try:
+            job_details = extract_shared(html_content, item["url"] or "")
+        except Exception as e:
+            logger.exception(f"Error extracting item {index}")
+            self._results.put(self._result(index, item, error=f"Error during processing: {str(e)}"))
+            return
+        self._results.put(self._result(index, item, job_details=job_details))
+
+    @staticmethod
+    def _result(index: int, item: Dict[str, Any], job_details: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> Dict[str, Any]:
+        result = {"index": index}
+        if item.get("id") is not None:
+            result["id"] = item["id"]
+        if item.get("url"):
+            result["url"] = item["url"]
+        if error is not None:
+            result["error"] = error
+        else:
+            result["job_details"] = job_details
+        return result
@@ -0,0 +1,202 @@
+"""
+Conditional-request cache for fetched pages.
+
+Stores each page body (zlib-compressed) together with the ETag and
+Last-Modified validators the server sent. On the next fetch of the same
+URL the validators go out as If-None-Match/If-Modified-Since, and a
+304 Not Modified response is answered from the cache instead of
+downloading the page again. Total compressed size is bounded; the least
+recently used pages are evicted first.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+
+class CachedPage(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class FetchCache:
+    """
+    Size-bounded SQLite cache of page bodies and their HTTP validators.
+
+    Args:
+        db_path (str): SQLite file, shared by every process that opens it, or
+            ":memory:" for a per-process cache.
+        max_bytes (int): Upper bound on the total compressed size of stored bodies.
+        compression_level (int): zlib compression level for stored bodies.
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_bytes: int = 64 * 1024 * 1024,
+                 compression_level: int = 6):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+
+        self._lock = threading.Lock()
+        self._db = None
+        self._total_bytes = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+        try:
+            self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS fetch_cache ("
+                "url TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, "
+                "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS fetch_cache_accessed ON fetch_cache (accessed_at)")
+            self._db.commit()
+            self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM fetch_cache").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Could not open fetch cache database {db_path}: {e}")
+            self._db = None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Return If-None-Match/If-Modified-Since headers for a cached URL, or {} if not cached."""
+        if self._db is None:
+            return {}
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT etag, last_modified FROM fetch_cache WHERE url = ?", (url,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading fetch cache: {e}")
+            return {}
+        if row is None:
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Return the cached page for url after a 304, or None if it is no longer cached."""
+        if self._db is None:
+            return None
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT body, etag, last_modified FROM fetch_cache WHERE url = ?", (url,)
+                ).fetchone()
+                if row is None:
+                    self._stats["misses"] += 1
+                    return None
+                self._db.execute("UPDATE fetch_cache SET accessed_at = ? WHERE url = ?", (time.time(), url))
+                self._db.commit()
+                self._stats["hits"] += 1
+            return CachedPage(zlib.decompress(row[0]), row[1], row[2])
+        except (sqlite3.Error, zlib.error) as e:
+            logger.error(f"Error reading fetch cache: {e}")
+            return None
+
+    def store(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """
+        Cache a freshly downloaded body.
+
+        Pages without an ETag or Last-Modified validator cannot be revalidated,
+        so they are not stored (and any older copy is dropped).
+        """
+        if self._db is None:
+            return
+        try:
+            with self._lock:
+                self._delete(url)
+                compressed = zlib.compress(body, self.compression_level) if etag or last_modified else None
+                if compressed is None or len(compressed) > self.max_bytes:
+                    self._db.commit()
+                    return
+                now = time.time()
+                if self.db_path != ":memory:":
+                    # Other processes sharing the file may have stored or evicted pages since
+                    self._total_bytes = self._db.execute(
+                        "SELECT COALESCE(SUM(size), 0) FROM fetch_cache").fetchone()[0]
+                self._db.execute(
+                    "INSERT INTO fetch_cache (url, body, size, etag, last_modified, fetched_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, compressed, len(compressed), etag, last_modified, now, now)
+                )
+                self._total_bytes += len(compressed)
+                self._stats["stores"] += 1
+                self._evict()
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing fetch cache: {e}")
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute("DELETE FROM fetch_cache")
+                self._db.commit()
+                self._total_bytes = 0
+            except sqlite3.Error as e:
+                logger.error(f"Error clearing fetch cache: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["bytes"] = self._total_bytes
+            stats["max_bytes"] = self.max_bytes
+            if self._db is not None:
+                try:
+                    stats["entries"] = self._db.execute("SELECT COUNT(*) FROM fetch_cache").fetchone()[0]
+                except sqlite3.Error:
+                    stats["entries"] = None
+            return stats
+
+    def _delete(self, url: str) -> None:
+        row = self._db.execute("SELECT size FROM fetch_cache WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM fetch_cache WHERE url = ?", (url,))
+            self._total_bytes -= row[0]
+
+    def _evict(self) -> None:
+        """Remove least recently used pages until the total size fits max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT url, size FROM fetch_cache ORDER BY accessed_at LIMIT 32"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for url, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM fetch_cache WHERE url = ?", (url,))
+                self._total_bytes -= size
+                self._stats["evictions"] += 1
+
+
+def response_validators(headers) -> Dict[str, Optional[str]]:
+    """
+    Return the ETag and Last-Modified validators to cache from response headers.
+
+    Both are None when the response must not be stored (Cache-Control: no-store).
+    """
+    cache_control = (headers.get('Cache-Control') or '').lower()
+    if 'no-store' in cache_control:
+        return {"etag": None, "last_modified": None}
+    return {"etag": headers.get('ETag'), "last_modified": headers.get('Last-Modified')}
@@ -0,0 +1,216 @@
+"""
+Parsed job posting page shared by text extraction and the structure-based extractors.
+
+The HTML is parsed once with lxml and the same tree serves plain text
+extraction (through trafilatura) and the title, company and location
+lookups. Right after parsing, a single pass over the tree indexes the
+elements those lookups need, so they never walk the tree again. With
+metadata enabled, trafilatura parses the raw HTML itself and
+our own tree is only built if an extractor still needs the DOM.
+"""
+
+import copy
+import logging
+from typing import Dict, List, Optional
+
+import lxml.html
+from lxml import etree
+import trafilatura
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Text nodes that are not part of the visible page
+_VISIBLE_TEXT = etree.XPath('.//text()[not(parent::script) and not(parent::style) and not(parent::noscript)]')
+_UPPERCASE = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_LOWERCASE = 'abcdefghijklmnopqrstuvwxyz'
+
+# Class/id substrings and tags indexed when the tree is built
+INDEXED_SUBSTRINGS = ("job-title", "company", "location")
+INDEXED_TAGS = ("h1",)
+
+
+def parse_html(html_content):
+    """
+    Parse HTML into an lxml document tree.
+
+    Args:
+        html_content (str): The HTML content to parse.
+
+    Returns:
+        lxml.html.HtmlElement: The document root, or None if the content cannot be parsed.
+    """
+    if not html_content:
+        return None
+    try:
+        return lxml.html.document_fromstring(html_content)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        try:
+            return lxml.html.document_fromstring(html_content.encode('utf-8'))
+        except Exception as e:
+            logger.error(f"Error parsing HTML: {str(e)}")
+            return None
+    except Exception as e:
+        logger.error(f"Error parsing HTML: {str(e)}")
+        return None
+
+
+def element_text(element):
+    """Return the visible text of an element, stripped and joined like BeautifulSoup's get_text(strip=True)."""
+    return "".join(text.strip() for text in _VISIBLE_TEXT(element))
+
+
+class JobPage:
+    """
+    One job posting page, parsed at most once.
+
+    Args:
+        html_content (str): The HTML content of the job posting.
+        use_metadata (bool): Extract text together with trafilatura metadata
+            (title, site name) from the raw HTML, so callers can skip the DOM
+            when the metadata already answers their questions.
+    """
+
+    def __init__(self, html_content, use_metadata=False):
+        self.html = html_content or ""
+        self.use_metadata = use_metadata
+        self._tree = None
+        self._parsed = False
+        self._text = None
+        self._metadata = None
+        self._class_index = {}
+        self._id_index = {}
+        self._tag_index = {}
+        self._meta_index = {}
+
+    @property
+    def tree(self):
+        """The lxml document tree, parsed and indexed on first access."""
+        if not self._parsed:
+            self._tree = parse_html(self.html)
+            if self._tree is not None:
+                self._build_index(self._tree)
+            self._parsed = True
+        return self._tree
+
+    def _build_index(self, tree):
+        """
+        Index the tree in one pass.
+
+        Records elements whose class or id contains one of INDEXED_SUBSTRINGS
+        (case-insensitive), elements with one of INDEXED_TAGS, and the first
+        content of every og:* meta property.
+        """
+        class_index = {substring: [] for substring in INDEXED_SUBSTRINGS}
+        id_index = {substring: [] for substring in INDEXED_SUBSTRINGS}
+        tag_index = {tag: [] for tag in INDEXED_TAGS}
+        meta_index = {}
+
+        for element in tree.iter(etree.Element):
+            tag = element.tag
+            if tag in tag_index:
+                tag_index[tag].append(element)
+            elif tag == 'meta':
+                meta_property = element.get('property')
+                if meta_property and meta_property.startswith('og:') and meta_property not in meta_index:
+                    meta_index[meta_property] = element.get('content')
+
+            class_value = element.get('class')
+            if class_value:
+                class_value = class_value.lower()
+                for substring in INDEXED_SUBSTRINGS:
+                    if substring in class_value:
+                        class_index[substring].append(element)
+            id_value = element.get('id')
+            if id_value:
+                id_value = id_value.lower()
+                for substring in INDEXED_SUBSTRINGS:
+                    if substring in id_value:
+                        id_index[substring].append(element)
+
+        self._class_index = class_index
+        self._id_index = id_index
+        self._tag_index = tag_index
+        self._meta_index = meta_index
+
+    @property
+    def text(self):
+        """Plain text of the posting, from trafilatura with a whole-document fallback."""
+        if self._text is None:
+            self._extract()
+        return self._text
+
+    @property
+    def metadata(self) -> Dict[str, Optional[str]]:
+        """Trafilatura metadata (title, sitename); empty unless use_metadata is set."""
+        if self._text is None:
+            self._extract()
+        return self._metadata
+
+    def _extract(self):
+        text = None
+        self._metadata = {}
+        try:
+            if self.use_metadata:
+                document = trafilatura.bare_extraction(self.html, with_metadata=True)
+                if document is not None:
+                    fields = document.as_dict()
+                    text = fields.get('text')
+                    self._metadata = {
+                        'title': fields.get('title'),
+                        'sitename': fields.get('sitename'),
+                    }
+            elif self.tree is not None:
+                # Trafilatura may prune the tree it is given, so hand it a copy
+                text = trafilatura.extract(copy.deepcopy(self.tree))
+        except Exception as e:
+            logger.error(f"Error extracting plain text: {str(e)}")
+
+        if not text:
+            # Fallback to all visible text if trafilatura extraction fails
+            text = " ".join(part.strip() for part in _VISIBLE_TEXT(self.tree) if part.strip()) if self.tree is not None else ""
+        self._text = text
+
+    def find_texts(self, tag) -> List[str]:
+        """Return the text of every element with the given tag, in document order."""
+        if self.tree is None:
+            return []
+        elements = self._tag_index[tag] if tag in self._tag_index else self.tree.iter(tag)
+        return [element_text(element) for element in elements]
+
+    def meta_content(self, meta_property) -> Optional[str]:
+        """Return the content of the first <meta property=...> tag, if any."""
+        if self.tree is None:
+            return None
+        if meta_property.startswith('og:'):
+            return self._meta_index.get(meta_property)
+        contents = self.tree.xpath('//meta[@property=$name]/@content', name=meta_property)
+        return contents[0] if contents else None
+
+    def texts_with_class_or_id(self, substring) -> List[str]:
+        """
+        Return the text of elements whose class or id contains substring (case-insensitive).
+
+        Class matches come first, then id matches, each in document order.
+        """
+        if self.tree is None:
+            return []
+        if substring in self._class_index:
+            elements = self._class_index[substring] + self._id_index[substring]
+            return [element_text(element) for element in elements]
+
+        texts = []
+        for attribute in ('class', 'id'):
+            elements = self.tree.xpath(
+                f'//*[contains(translate(@{attribute}, $upper, $lower), $needle)]',
+                upper=_UPPERCASE, lower=_LOWERCASE, needle=substring.lower()
+            )
+            texts.extend(element_text(element) for element in elements)
+        return texts
+
+
+def extract_page_text(html_content):
+    """Extract plain text from HTML content, parsing it once."""
+    return JobPage(html_content).text
@@ -0,0 +1,167 @@
+"""
+Streaming, size-capped reading of HTML response bodies.
+
+Fetchers feed the body to an HTMLBodyReader chunk by chunk instead of
+loading the whole response at once. The reader rejects non-HTML content
+types and oversized bodies as early as possible, and can drop the content
+of <script> and <style> elements as it streams so only the markup the
+extractors use is kept in memory. JSON-LD scripts are always kept, since
+they carry structured job data.
+"""
+
+import logging
+from typing import Optional
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Content types accepted as HTML; a missing Content-Type is accepted too
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+_WHITESPACE = b' \t\n\r\f'
+
+
+class DownloadRejected(Exception):
+    """Raised when a response is not HTML or exceeds the configured size limits."""
+
+
+def is_html_content_type(content_type: Optional[str]) -> bool:
+    """Whether a Content-Type header value denotes HTML (missing values are allowed)."""
+    if not content_type:
+        return True
+    return content_type.split(';', 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+class ScriptStyleStripper:
+    """
+    Incremental filter that drops the content of <script> and <style> elements.
+
+    The tags themselves are kept so the document structure is unchanged.
+    Scripts whose opening tag mentions ld+json are passed through.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._closing = None  # closing tag being searched for, e.g. b'</script'
+        self._keep = False    # whether the content up to _closing is emitted
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Filter the next chunk, holding back bytes that may start a tag split across chunks."""
+        data = self._buffer + chunk
+        self._buffer = b''
+        lower = data.lower()
+        out = []
+        pos = 0
+        while True:
+            if self._closing:
+                end = lower.find(self._closing, pos)
+                if end == -1:
+                    # Hold back a tail that could be the start of the closing tag
+                    tail = max(pos, len(data) - len(self._closing) + 1)
+                    if self._keep:
+                        out.append(data[pos:tail])
+                    self._buffer = data[tail:]
+                    return b''.join(out)
+                if self._keep:
+                    out.append(data[pos:end])
+                pos = end
+                self._closing = None
+                continue
+
+            start, name = self._find_open_tag(lower, pos)
+            if start == -1:
+                # Hold back a trailing '<' that could begin <script or <style
+                hold = data.rfind(b'<', max(pos, len(data) - len(b'<script') + 1))
+                if hold == -1:
+                    out.append(data[pos:])
+                else:
+                    out.append(data[pos:hold])
+                    self._buffer = data[hold:]
+                return b''.join(out)
+
+            name_end = start + 1 + len(name)
+            tag_end = lower.find(b'>', name_end)
+            if tag_end == -1:
+                out.append(data[pos:start])
+                self._buffer = data[start:]
+                return b''.join(out)
+            if lower[name_end:name_end + 1] not in (b'>', b'/') and lower[name_end] not in _WHITESPACE:
+                # Some other tag that merely starts with the name, e.g. <scripts>
+                out.append(data[pos:name_end])
+                pos = name_end
+                continue
+
+            open_tag = lower[start:tag_end + 1]
+            out.append(data[pos:tag_end + 1])
+            pos = tag_end + 1
+            if not open_tag.endswith(b'/>'):
+                self._closing = b'</' + name
+                self._keep = name == b'script' and b'ld+json' in open_tag
+
+    def flush(self) -> bytes:
+        """Return whatever is still held back at the end of the stream."""
+        data = b'' if self._closing and not self._keep else self._buffer
+        self._buffer = b''
+        return data
+
+    @staticmethod
+    def _find_open_tag(lower: bytes, pos: int):
+        script = lower.find(b'<script', pos)
+        style = lower.find(b'<style', pos)
+        if script == -1 and style == -1:
+            return -1, None
+        if style == -1 or (script != -1 and script < style):
+            return script, b'script'
+        return style, b'style'
+
+
+class HTMLBodyReader:
+    """
+    Accumulate a response body under size limits.
+
+    Args:
+        max_bytes (int): Maximum size of the kept body, after stripping.
+        max_download_bytes (int): Maximum number of bytes read from the network.
+        strip_scripts (bool): Drop <script>/<style> content while reading.
+    """
+
+    def __init__(self, max_bytes: int, max_download_bytes: int, strip_scripts: bool = False):
+        self.max_bytes = max_bytes
+        self.max_download_bytes = max(max_download_bytes, max_bytes)
+        self.downloaded = 0
+        self._stripper = ScriptStyleStripper() if strip_scripts else None
+        self._parts = []
+        self._size = 0
+
+    def check_headers(self, headers) -> None:
+        """Reject the response from its headers alone when possible."""
+        content_type = headers.get('Content-Type')
+        if not is_html_content_type(content_type):
+            raise DownloadRejected(f"Not an HTML page (Content-Type: {content_type})")
+        content_length = headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_download_bytes:
+            raise DownloadRejected(f"Response too large ({content_length} bytes)")
+
+    def feed(self, chunk: bytes) -> None:
+        """Add the next chunk of the body."""
+        self.downloaded += len(chunk)
+        if self.downloaded > self.max_download_bytes:
+            raise DownloadRejected(f"Response exceeded {self.max_download_bytes} bytes")
+        if self._stripper is not None:
+            chunk = self._stripper.feed(chunk)
+        self._append(chunk)
+
+    def finish(self) -> bytes:
+        """Return the complete (possibly stripped) body."""
+        if self._stripper is not None:
+            self._append(self._stripper.flush())
+        return b''.join(self._parts)
+
+    def _append(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self._size += len(chunk)
+        if self._size > self.max_bytes:
+            raise DownloadRejected(f"HTML body exceeded {self.max_bytes} bytes")
+        self._parts.append(chunk)
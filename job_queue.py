@@ -0,0 +1,401 @@
+"""
+SQLite-backed background job queue.
+
+Web requests enqueue a job and return its id straight away; a pool of
+worker threads runs the jobs and stores their results, which clients poll
+by id. Jobs live in a SQLite table, so every web worker process sharing the
+database file sees the same jobs, claims are atomic across processes, and
+jobs left running by a crashed process are picked up again once their
+lease expires; a live worker renews the lease of the jobs it is running so
+long jobs are not taken over. A job submitted with a dedupe key while another job with
+the same key is still queued or running is not created again: the caller
+gets the existing job's id and shares its result.
+
+While a job runs, its handler can emit progress events (e.g. one per
+extracted field). Events are stored next to the job so any process can
+stream them to a client, resuming from the last event id it saw.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Run the cleanup of old finished jobs once every this many claims
+CLEANUP_INTERVAL = 100
+
+# Events that end a job's event stream
+FINAL_EVENTS = ("done", "failed")
+
+
+class JobFailed(Exception):
+    """Raised by a job handler to fail the job with a user-facing message."""
+
+
+class JobQueue:
+    """
+    Persistent job queue with a local pool of worker threads.
+
+    Args:
+        db_path (str): SQLite file holding the jobs table.
+        handler (callable): Runs one job; takes the payload dict and an
+            emit(event, data) callback for progress events, and returns a
+            JSON-serializable result. Raise JobFailed for an expected failure.
+        workers (int): Worker threads started in this process.
+        lease (float): Seconds after which a running job whose lease was not
+            renewed is presumed abandoned and handed to another worker. Workers
+            renew the leases of their running jobs every lease / 3 seconds.
+        max_attempts (int): Attempts before an abandoned job is marked failed.
+        retention (float): Seconds finished jobs are kept.
+        poll_interval (float): Seconds an idle worker waits before checking for
+            jobs enqueued by other processes.
+    """
+
+    def __init__(self, db_path: str, handler: Callable[[Dict[str, Any], Callable], Any], workers: int = 2,
+                 lease: float = 600, max_attempts: int = 3, retention: float = 86400,
+                 poll_interval: float = 1.0):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = max(workers, 1)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.poll_interval = poll_interval
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._claims = 0
+        # Jobs running in this process, with the attempt number their lease was claimed under
+        self._running: Dict[str, int] = {}
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            columns = [row[1] for row in db.execute("PRAGMA table_info(jobs)")]
+            if "dedupe_key" not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN dedupe_key TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe_key ON jobs (dedupe_key, status)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, "
+                "event TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id)")
+
+    def submit(self, payload: Dict[str, Any], job_id: Optional[str] = None,
+               dedupe_key: Optional[str] = None) -> str:
+        """
+        Enqueue a job.
+
+        Args:
+            payload (dict): JSON-serializable input passed to the handler.
+            job_id (str): Id to give the job instead of a generated one.
+            dedupe_key (str): Jobs with the same key are coalesced while one is
+                queued or running.
+
+        Returns:
+            str: The job id; that of the in-flight job when coalesced.
+        """
+        self.start()
+        job_id = job_id or uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = None
+                if dedupe_key is not None:
+                    row = db.execute(
+                        "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                        (dedupe_key, QUEUED, RUNNING)
+                    ).fetchone()
+                if row is None:
+                    db.execute(
+                        "INSERT INTO jobs (id, status, payload, dedupe_key, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (job_id, QUEUED, json.dumps(payload), dedupe_key, time.time())
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        if row is not None:
+            logger.info(f"Coalesced job {job_id} into in-flight job {row[0]}")
+            return row[0]
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a job's status, and its result or error once finished.
+
+        Returns:
+            dict: id, status, payload, result, error and timestamps, or None if unknown.
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, status, payload, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "payload": json.loads(row[2]),
+            "result": json.loads(row[3]) if row[3] is not None else None,
+            "error": row[4],
+            "created_at": row[5],
+            "started_at": row[6],
+            "finished_at": row[7],
+        }
+
+    def emit(self, job_id: str, event: str, data: Any) -> None:
+        """Record a progress event for a job."""
+        try:
+            with self._connect() as db:
+                db.execute("INSERT INTO job_events (job_id, event, data) VALUES (?, ?, ?)",
+                           (job_id, event, json.dumps(data)))
+        except sqlite3.Error as e:
+            logger.error(f"Error recording {event} event for job {job_id}: {e}")
+
+    def events(self, job_id: str, after: int = 0, limit: int = 500) -> List[Tuple[int, str, str]]:
+        """
+        Return a job's events recorded after the given event id.
+
+        Returns:
+            list: (event id, event name, JSON data) tuples in order.
+        """
+        with self._connect() as db:
+            return db.execute(
+                "SELECT id, event, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (job_id, after, limit)
+            ).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs in each status."""
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        stats = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        stats.update(dict(rows))
+        return stats
+
+    def start(self) -> None:
+        """Start the worker threads if they are not running yet."""
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Ask the worker threads to exit after their current job and wait for them."""
+        self._stop.set()
+        self._wakeup.set()
+        with self._start_lock:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def renew_leases(self) -> None:
+        """Push back the lease expiry of every job running in this process."""
+        with self._lock:
+            running = list(self._running.items())
+        if not running:
+            return
+        try:
+            with self._connect() as db:
+                for job_id, attempt in running:
+                    renewed = db.execute(
+                        "UPDATE jobs SET started_at = ? WHERE id = ? AND status = ? AND attempts = ?",
+                        (time.time(), job_id, RUNNING, attempt)
+                    ).rowcount
+                    if not renewed:
+                        logger.warning(f"Job {job_id} lost its lease to another worker")
+        except sqlite3.Error as e:
+            logger.error(f"Error renewing job leases: {e}")
+
+    @contextmanager
+    def _connect(self):
+        """Open an autocommit connection for one operation; workers and requests never share one."""
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.lease / 3):
+            self.renew_leases()
+        # Jobs still finishing after stop() keep their leases until they end
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+            self.renew_leases()
+            time.sleep(min(self.lease / 3, 1.0))
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"Error claiming job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(*job)
+
+    def _claim(self):
+        """Atomically take the oldest queued job, or an abandoned running one."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                with self._lock:
+                    self._claims += 1
+                    cleanup = self._claims % CLEANUP_INTERVAL == 0
+                if cleanup:
+                    db.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                               (DONE, FAILED, now - self.retention))
+                    db.execute("DELETE FROM job_events WHERE job_id NOT IN (SELECT id FROM jobs)")
+
+                # Abandoned jobs that used up their attempts are failed rather than retried
+                db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                    "WHERE status = ? AND started_at < ? AND attempts >= ?",
+                    (FAILED, "Job was interrupted too many times", now, RUNNING, now - self.lease, self.max_attempts)
+                )
+                row = db.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE status = ? OR (status = ? AND started_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now - self.lease)
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, now, row[0])
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        # The attempt number identifies this claim; a later claim of the same job increments it
+        return (row[0], json.loads(row[1]), row[2] + 1) if row is not None else None
+
+    def _run(self, job_id: str, payload: Dict[str, Any], attempt: int) -> None:
+        with self._lock:
+            self._running[job_id] = attempt
+        try:
+            self._execute(job_id, payload, attempt)
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+
+    def _execute(self, job_id: str, payload: Dict[str, Any], attempt: int) -> None:
+        result = None
+        error = None
+        emitter = EventBatcher(lambda event, data: self.emit(job_id, event, data))
+        try:
+            emitter("status", {"status": RUNNING})
+            result = self.handler(payload, emitter)
+        except JobFailed as e:
+            error = str(e)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            error = f"Error during processing: {str(e)}"
+        emitter.flush()
+
+        try:
+            with self._connect() as db:
+                # Only the current claim may finish the job; a run that lost its lease must not
+                # overwrite the result or verdict of the run that took over
+                saved = db.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                    "WHERE id = ? AND status = ? AND attempts = ?",
+                    (FAILED if error is not None else DONE,
+                     json.dumps(result) if error is None else None, error, time.time(), job_id, RUNNING, attempt)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Error saving result of job {job_id}: {e}")
+            saved = 0
+        if not saved:
+            logger.warning(f"Discarding the result of job {job_id}: attempt {attempt} no longer holds its lease")
+            return
+        # Only announce the end once the result can be read back
+        if error is None:
+            self.emit(job_id, "done", {"status": DONE})
+        else:
+            self.emit(job_id, "failed", {"status": FAILED, "error": error})
+
+
+class EventBatcher:
+    """
+    Thread-safe emit callback that coalesces token events.
+
+    Consecutive "token" events for the same field are merged and written at
+    most every interval seconds, so streaming model output does not cost one
+    database write per token. Any other event flushes pending tokens first,
+    keeping the order of events.
+
+    Args:
+        emit (callable): Underlying emit(event, data) callback.
+        interval (float): Seconds token text is held before being written.
+    """
+
+    def __init__(self, emit: Callable[[str, Any], None], interval: float = 0.25):
+        self._emit = emit
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._flushed_at = time.monotonic()
+
+    def __call__(self, event: str, data: Any) -> None:
+        with self._lock:
+            if event == "token":
+                field = data.get("field")
+                self._tokens[field] = self._tokens.get(field, "") + data.get("text", "")
+                if time.monotonic() - self._flushed_at < self.interval:
+                    return
+                self._flush_tokens()
+            else:
+                self._flush_tokens()
+                self._emit(event, data)
+
+    def flush(self) -> None:
+        """Write any held token text."""
+        with self._lock:
+            self._flush_tokens()
+
+    def _flush_tokens(self) -> None:
+        for field, text in self._tokens.items():
+            self._emit("token", {"field": field, "text": text})
+        self._tokens = {}
+        self._flushed_at = time.monotonic()
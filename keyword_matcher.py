@@ -0,0 +1,121 @@
+"""
+Multi-keyword matcher for the regex fallback extractors.
+
+All keywords are compiled into one prefix-factored (trie-shaped) regular
+expression, so a single linear scan of the text finds every keyword
+occurrence and the per-position cost does not grow with the size of the
+dictionary. Matching is zero-width, which keeps overlapping occurrences
+("product management" and "management"), and keywords that are prefixes of
+a longer match at the same position ("machine" in "machine learning") are
+reported as well.
+
+Matchers pickle as their pattern source and compile on first use, so a
+serialized matcher loads without rebuilding the trie.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Boundary modes: "word" behaves like wrapping each keyword in \b...\b,
+# "space" requires a space or the start/end of the text on both sides
+BOUNDARIES = ("word", "space")
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def build_trie_pattern(keywords: Iterable[str]) -> str:
+    """Build a regex alternation of keywords, factored on shared prefixes."""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            # Longer keywords are tried first, the shorter terminal one on backtracking
+            return '(?:' + body + ')?'
+        return body
+
+    return render(trie)
+
+
+class KeywordMatcher:
+    """
+    Find every occurrence of a fixed set of keywords in one pass.
+
+    Args:
+        keywords (iterable): Keywords to match. Matching is case-sensitive, so
+            callers lowercase both the keywords and the text as needed.
+        boundary (str): "word" (\\b semantics) or "space" (space-delimited).
+    """
+
+    def __init__(self, keywords: Iterable[str], boundary: str = "word"):
+        if boundary not in BOUNDARIES:
+            raise ValueError(f"Unknown boundary mode: {boundary}")
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        self.boundary = boundary
+
+        # For each keyword, the shorter keywords that start it, longest first
+        keyword_set = set(self.keywords)
+        self._prefixes = {
+            keyword: [keyword[:end] for end in range(len(keyword) - 1, 0, -1) if keyword[:end] in keyword_set]
+            for keyword in self.keywords
+        }
+
+        trie = build_trie_pattern(self.keywords)
+        if not self.keywords:
+            self.pattern = None
+        elif boundary == "word":
+            self.pattern = rf'(?=\b({trie})\b)'
+        else:
+            self.pattern = rf'(?=(?<![^ ])({trie})(?![^ ]))'
+        self._regex = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_regex'] = None
+        return state
+
+    def compile(self):
+        """Compile the pattern now instead of on the first match."""
+        if self._regex is None and self.pattern is not None:
+            self._regex = re.compile(self.pattern)
+        return self._regex
+
+    def _ends_at_boundary(self, text: str, start: int, end: int) -> bool:
+        if self.boundary == "space":
+            return end == len(text) or text[end] == ' '
+        before = _is_word_char(text[end - 1])
+        after = _is_word_char(text[end]) if end < len(text) else False
+        return before != after
+
+    def finditer(self, text: str) -> Iterator[Tuple[str, int]]:
+        """Yield (keyword, start) for every keyword occurrence in text."""
+        regex = self.compile()
+        if regex is None:
+            return
+        for match in regex.finditer(text):
+            keyword = match.group(1)
+            start = match.start(1)
+            yield keyword, start
+            for prefix in self._prefixes[keyword]:
+                if self._ends_at_boundary(text, start, start + len(prefix)):
+                    yield prefix, start
+
+    def findall(self, text: str) -> List[str]:
+        """Return the distinct keywords found in text, in order of first occurrence."""
+        return list(dict.fromkeys(keyword for keyword, _ in self.finditer(text)))
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Return how many times each keyword occurs in text."""
+        return Counter(keyword for keyword, _ in self.finditer(text))
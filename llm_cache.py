@@ -0,0 +1,191 @@
+"""
+Content-addressed cache for LLM extraction results.
+
+Entries are keyed on a hash of the normalized job text together with the
+extraction type, model and prompt version, so reposts and repeated
+submissions of the same posting are served without another model call.
+An in-memory LRU tier is always used; an optional SQLite tier keeps
+entries across restarts.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Run disk-tier pruning once every this many writes
+DISK_PRUNE_INTERVAL = 100
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic reformatting maps to the same cache key."""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def make_cache_key(text: str, extraction_type: str, model: str, prompt_version: str) -> str:
+    """Build the cache key for one extraction of one posting."""
+    text_hash = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return f"{text_hash}:{extraction_type}:{model}:{prompt_version}"
+
+
+class LLMCache:
+    """
+    Two-tier LRU cache for LLM results.
+
+    Args:
+        max_entries (int): Maximum number of entries held in memory.
+        ttl (float): Seconds an entry stays valid in either tier.
+        db_path (str): Optional SQLite file for the persistent tier.
+        max_disk_entries (int): Maximum number of entries kept on disk.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400,
+                 db_path: Optional[str] = None, max_disk_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires ON llm_cache (expires_at)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Could not open LLM cache database {db_path}: {e}")
+                self._db = None
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached value for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+            value = self._disk_get(key, now)
+            if value is not None:
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+                self._memory_set(key, value, now)
+                return value
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: List[str]) -> None:
+        """Store value under key in every enabled tier."""
+        now = time.time()
+        with self._lock:
+            self._memory_set(key, value, now)
+            self._disk_set(key, value, now)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM llm_cache")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error clearing LLM cache database: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            if self._db is not None:
+                try:
+                    stats["disk_size"] = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                except sqlite3.Error:
+                    stats["disk_size"] = None
+            return stats
+
+    def _memory_set(self, key: str, value: List[str], now: float) -> None:
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[List[str]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                self._stats["expirations"] += 1
+                return None
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error reading LLM cache database: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: List[str], now: float) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % DISK_PRUNE_INTERVAL == 0:
+                self._disk_prune(now)
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing LLM cache database: {e}")
+
+    def _disk_prune(self, now: float) -> None:
+        """Remove expired rows, then the soonest-expiring rows beyond max_disk_entries."""
+        expired = self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        self._stats["expirations"] += max(expired, 0)
+        overflow = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY expires_at LIMIT ?)", (overflow,)
+            )
+            self._stats["evictions"] += overflow
@@ -5,9 +5,13 @@ This module replaces regex-based extraction with AI-powered extraction.
 
 import json
 import logging
-from typing import Dict, List, Optional, Union, Any
+import os
+from typing import Callable, Dict, List, Optional, Set, Union, Any
 
-import ollama
+from llm_cache import LLMCache, make_cache_key
+from ollama_pool import OllamaHost, OllamaPool, parse_hosts
+from text_chunker import chunk_text, estimate_tokens, merge_results
+from skill_taxonomy import get_skill_taxonomy
 
 # Configure logging
 logging.basicConfig(level=logging.ERROR)
@@ -16,8 +20,233 @@ logger = logging.getLogger(__name__)
 # Define the model to use
 LLM_MODEL = "llama3.2:latest"
 
+# Bump whenever a prompt changes so cached results from the old prompt are not reused
+PROMPT_VERSION = "4"
 
-def extract_with_llm(text: str, extraction_type: str) -> List[str]:
+# Cache of parsed LLM results, keyed on the normalized job text and extraction settings
+llm_cache = LLMCache(
+    max_entries=int(os.environ.get("LLM_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("LLM_CACHE_TTL", "86400")),
+    db_path=os.environ.get("LLM_CACHE_PATH") or None,
+)
+
+# Maximum number of requests this process keeps in flight to each Ollama host, unless the
+# host sets its own in OLLAMA_HOSTS
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+
+# Ollama servers to spread requests over, comma-separated "url[|model[|max_concurrency]]"
+# entries, e.g. "http://gpu1:11434,http://gpu2:11434|qwen2.5:7b|8". Hosts without a model
+# run LLM_MODEL; empty means the single server at OLLAMA_HOST (localhost by default).
+OLLAMA_HOSTS = os.environ.get("OLLAMA_HOSTS", "")
+# Seconds a chat request may take before it is retried on another host
+OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "120"))
+
+# Availability probing, per host: a healthy host is re-probed after OLLAMA_PROBE_INTERVAL seconds,
+# the breaker trips after OLLAMA_FAILURE_THRESHOLD consecutive failed calls and a tripped
+# breaker is re-probed once OLLAMA_COOLDOWN seconds have passed
+OLLAMA_PROBE_INTERVAL = float(os.environ.get("OLLAMA_PROBE_INTERVAL", "300"))
+OLLAMA_FAILURE_THRESHOLD = int(os.environ.get("OLLAMA_FAILURE_THRESHOLD", "3"))
+OLLAMA_COOLDOWN = float(os.environ.get("OLLAMA_COOLDOWN", "30"))
+OLLAMA_PROBE_TIMEOUT = float(os.environ.get("OLLAMA_PROBE_TIMEOUT", "5"))
+
+ollama_pool = OllamaPool([
+    OllamaHost(
+        url,
+        model,
+        max_concurrency=max_concurrency,
+        timeout=OLLAMA_TIMEOUT,
+        probe_timeout=OLLAMA_PROBE_TIMEOUT,
+        failure_threshold=OLLAMA_FAILURE_THRESHOLD,
+        cooldown=OLLAMA_COOLDOWN,
+        probe_interval=OLLAMA_PROBE_INTERVAL,
+    )
+    for url, model, max_concurrency in parse_hosts(OLLAMA_HOSTS, LLM_MODEL, LLM_MAX_CONCURRENCY)
+])
+
+# Requests the whole pool can have in flight, for sizing the threads that issue them
+LLM_CONCURRENCY = ollama_pool.capacity
+
+# Identifies the model(s) behind cached results; the same as LLM_MODEL unless hosts run others
+LLM_MODEL_TAG = ollama_pool.model_tag
+
+# Estimated token budget for the job text in one prompt, and the most chunks sent per field
+LLM_TOKEN_BUDGET = int(os.environ.get("LLM_TOKEN_BUDGET", "3000"))
+LLM_MAX_CHUNKS = int(os.environ.get("LLM_MAX_CHUNKS", "4"))
+
+# Fields that can be extracted, in the order they appear in job details
+LLM_FIELDS = ["skills", "experience", "role_type", "responsibilities", "qualifications"]
+
+# Fields the model returns as a single string rather than a list
+SCALAR_FIELDS = {"experience", "role_type"}
+
+# Generation settings sent with every chat request. With structured output on, Ollama constrains
+# the reply to the field's JSON schema instead of the model wrapping JSON in prose.
+LLM_STRUCTURED_OUTPUT = os.environ.get("LLM_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+LLM_TEMPERATURE = float(os.environ.get("LLM_TEMPERATURE", "0"))
+# How long Ollama keeps the model loaded after a request, e.g. "30m", "-1" to never unload
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# Most tokens generated per reply; short scalar answers get a tight cap
+LLM_NUM_PREDICT = {
+    field: int(os.environ.get(f"LLM_NUM_PREDICT_{field.upper()}", default))
+    for field, default in (("skills", "384"), ("experience", "48"), ("role_type", "32"),
+                           ("responsibilities", "384"), ("qualifications", "384"), ("combined", "1024"))
+}
+
+# Context window requested from Ollama. Ollama reloads the model whenever num_ctx changes, so it
+# is fixed at a size that fits a full chunk, the longest prompt and reply; only prompts that
+# do not fit (LLM_TOKEN_BUDGET raised without LLM_NUM_CTX) get a larger window.
+LLM_NUM_CTX_STEP = 1024
+PROMPT_OVERHEAD_TOKENS = 512
+LLM_NUM_CTX = int(os.environ.get("LLM_NUM_CTX") or 0) or (
+    -(-(LLM_TOKEN_BUDGET + PROMPT_OVERHEAD_TOKENS + max(LLM_NUM_PREDICT.values())) // LLM_NUM_CTX_STEP)
+    * LLM_NUM_CTX_STEP
+)
+
+# Answers the model may give for role_type
+ROLE_TYPES = ["Individual Contributor", "Team Lead/Manager",
+              "Role type unclear (possibly both IC and leadership aspects)"]
+
+# Per-field instructions used to build the combined extraction prompt
+COMBINED_FIELD_DESCRIPTIONS = {
+    "skills": 'JSON list of the technical and soft skills required, one or a few words per skill',
+    "experience": 'string with the years of experience required, e.g. "3+ years of experience required" or "Entry-level position"',
+    "role_type": 'one of "Individual Contributor", "Team Lead/Manager" or "Role type unclear (possibly both IC and leadership aspects)"',
+    "responsibilities": 'JSON list of the key job responsibilities as 3-4 word pointers',
+    "qualifications": 'JSON list of the key qualifications, skills and tools along with experience needed as 3-4 word pointers',
+}
+
+
+def _output_schema(extraction_type: str) -> Dict[str, Any]:
+    """JSON schema of the reply for one field."""
+    if extraction_type == "role_type":
+        return {"type": "string", "enum": ROLE_TYPES}
+    if extraction_type in SCALAR_FIELDS:
+        return {"type": "string"}
+    return {"type": "array", "items": {"type": "string"}}
+
+
+def _combined_schema(fields: List[str]) -> Dict[str, Any]:
+    """JSON schema of the combined reply, an object with one key per field."""
+    return {
+        "type": "object",
+        "properties": {field: _output_schema(field) for field in fields},
+        "required": list(fields),
+    }
+
+
+def _context_size(prompt_tokens: int, num_predict: int) -> int:
+    """Pick num_ctx for a request: LLM_NUM_CTX, or more if the prompt and reply do not fit in it."""
+    needed = -(-(prompt_tokens + num_predict) // LLM_NUM_CTX_STEP) * LLM_NUM_CTX_STEP
+    return max(LLM_NUM_CTX, needed)
+
+
+def _load_reply(result: str, opening: str, closing: str) -> Any:
+    """
+    Decode the JSON in a model reply, or return None if there is none.
+
+    Structured output replies are plain JSON. Without it the model may wrap
+    the JSON in extra text, so the span from the first opening to the last
+    closing bracket is tried next.
+    """
+    try:
+        return json.loads(result)
+    except json.JSONDecodeError:
+        pass
+
+    json_start = result.find(opening)
+    json_end = result.rfind(closing) + 1
+    if not 0 <= json_start < json_end:
+        logger.warning(f"Could not find JSON in response: {result}")
+        return None
+    try:
+        return json.loads(result[json_start:json_end])
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse LLM response as JSON: {e}")
+        logger.error(f"Raw response: {result}")
+        return None
+
+
+def _parse_reply(result: str, extraction_type: str) -> Optional[List[str]]:
+    """Parse a model reply for one field into a list of strings, or return None if it is unusable."""
+    if extraction_type in SCALAR_FIELDS:
+        try:
+            value = json.loads(result)
+        except json.JSONDecodeError:
+            # An unstructured reply is the bare answer, possibly quoted
+            value = result.strip().strip('"')
+    else:
+        value = _load_reply(result, '[', ']')
+        if value is None:
+            return None
+
+    items = _validate_field(extraction_type, value)
+    if items is None:
+        logger.warning(f"LLM response for {extraction_type} has the wrong shape: {result}")
+    return items
+
+
+def _chat(system_prompt: str, user_content: str, on_token: Optional[Callable[[str], None]] = None,
+          schema: Optional[Dict[str, Any]] = None, num_predict: Optional[int] = None) -> str:
+    """
+    Send a single system/user exchange to an Ollama host and return the reply text.
+
+    If on_token is given, the reply is streamed and every piece of text is
+    passed to it as it arrives. The reply is constrained to schema when
+    structured output is enabled and capped at num_predict tokens.
+    """
+    messages = [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": user_content
+        }
+    ]
+    num_predict = num_predict or max(LLM_NUM_PREDICT.values())
+    options = {
+        "temperature": LLM_TEMPERATURE,
+        "num_predict": num_predict,
+        "num_ctx": _context_size(estimate_tokens(system_prompt) + estimate_tokens(user_content), num_predict),
+    }
+    request = {
+        "messages": messages,
+        "options": options,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+    }
+    if LLM_STRUCTURED_OUTPUT and schema is not None:
+        request["format"] = schema
+
+    pieces = []
+
+    def send(host):
+        if on_token is None:
+            response = host.client.chat(model=host.model, **request)
+            return response['message']['content']
+        for part in host.client.chat(model=host.model, stream=True, **request):
+            piece = part['message']['content']
+            if piece:
+                pieces.append(piece)
+                on_token(piece)
+        return "".join(pieces)
+
+    # A streamed reply can only move to another host until its first piece has been passed on
+    return ollama_pool.call(send, can_retry=lambda: not pieces)
+
+
+def extract_with_llm(text: str, extraction_type: str,
+                     on_token: Optional[Callable[[str], None]] = None,
+                     model_fields: Optional[Set[str]] = None) -> List[str]:
+    """
+    Extract one field from the job text with the LLM.
+
+    If on_token is given, the model's reply is streamed to it piece by piece;
+    cached results are returned without calling it. Falls back to keyword
+    extraction if the model fails. If model_fields is given, extraction_type
+    is added to it when the result came from the model rather than the fallback.
+    """
     try:
         if extraction_type == "responsibilities":
             system_prompt = """You are an expert job analyst. Extract key job responsibilities from the provided job description.
@@ -78,54 +307,152 @@ def extract_with_llm(text: str, extraction_type: str) -> List[str]:
         else:
             raise ValueError(f"Unknown extraction type: {extraction_type}")
         
-        max_text_length = 15000
-        if len(text) > max_text_length:
-            logger.warning(f"Text too long ({len(text)} chars), truncating to {max_text_length} chars")
-            text = text[:max_text_length]
+        cache_key = make_cache_key(text, extraction_type, LLM_MODEL_TAG, PROMPT_VERSION)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit for {extraction_type}")
+            if model_fields is not None:
+                model_fields.add(extraction_type)
+            return list(cached)
         
-        # Make request to Ollama
-        response = ollama.chat(
-            model=LLM_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": f"Job description text:\n\n{text}\n\nExtract the {extraction_type}."
-                }
-            ]
-        )
-        
-        result = response['message']['content']
-        logger.debug(f"LLM response for {extraction_type}: {result}")
+        # Send only the sections relevant to this field, split to fit the token budget
+        chunks = chunk_text(text, extraction_type, LLM_TOKEN_BUDGET, LLM_MAX_CHUNKS)
+        chunk_results = []
+        for chunk in chunks:
+            # Make request to Ollama
+            result = _chat(system_prompt, f"Job description text:\n\n{chunk}\n\nExtract the {extraction_type}.",
+                           on_token=on_token, schema=_output_schema(extraction_type),
+                           num_predict=LLM_NUM_PREDICT[extraction_type])
+            logger.debug(f"LLM response for {extraction_type}: {result}")
 
-        try:
-            # Find JSON list in the response (handles cases where model adds extra text)
-            json_start = result.find('[')
-            json_end = result.rfind(']') + 1
+            items = _parse_reply(result, extraction_type)
+            if items is None:
+                continue
+            chunk_results.append(items)
+            # Single-valued fields only need the first chunk that answers
+            if extraction_type in SCALAR_FIELDS and items:
+                break
 
-            if 0 <= json_start < json_end:
-                json_str = result[json_start:json_end]
-                parsed_list = json.loads(json_str)
-                
-                # Format as bullet points
-                return [item for item in parsed_list if item.strip()]
-            
-            logger.warning(f"Could not find JSON list in response: {result}")
-            return fallback_extraction(text, extraction_type)
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {e}")
-            logger.error(f"Raw response: {result}")
+        if not chunk_results:
             return fallback_extraction(text, extraction_type)
+
+        items = merge_results(chunk_results)
+        if extraction_type == "skills":
+            items = get_skill_taxonomy().normalize(items)
+        llm_cache.set(cache_key, items)
+        if model_fields is not None:
+            model_fields.add(extraction_type)
+        return items
             
     except Exception as e:
         logger.error(f"Error in LLM extraction: {e}")
         return fallback_extraction(text, extraction_type)
 
 
+def extract_all_with_llm(text: str, extraction_types: Optional[List[str]] = None,
+                         model_fields: Optional[Set[str]] = None) -> Dict[str, List[str]]:
+    """
+    Extract several fields from the job text with a single LLM call.
+
+    The model is asked for one JSON object holding every requested field, so the
+    job text is only sent (and prefilled) once. Each field is validated on its
+    own; fields that are missing or malformed are retried through the per-field
+    `extract_with_llm` path.
+
+    Returns a dict mapping each extraction type to a list of strings, in the
+    same shape `extract_with_llm` returns. If model_fields is given, the fields
+    that came from the model rather than the fallback are added to it.
+    """
+    fields = list(extraction_types or LLM_FIELDS)
+    for field in fields:
+        if field not in COMBINED_FIELD_DESCRIPTIONS:
+            raise ValueError(f"Unknown extraction type: {field}")
+
+    # Serve what we can from the cache and only ask the model for the rest
+    results = {}
+    cache_keys = {field: make_cache_key(text, field, LLM_MODEL_TAG, PROMPT_VERSION) for field in fields}
+    for field in fields:
+        cached = llm_cache.get(cache_keys[field])
+        if cached is not None:
+            results[field] = list(cached)
+            if model_fields is not None:
+                model_fields.add(field)
+    missing = [field for field in fields if field not in results]
+    if not missing:
+        logger.debug("LLM cache hit for all combined fields")
+        return results
+
+    # role_type is judged from the whole posting (the same context the per-field path gives it),
+    # so with role_type the combined prompt carries the full posting when it fits in one chunk
+    chunks = []
+    if "role_type" in missing:
+        chunks = chunk_text(text, "role_type", LLM_TOKEN_BUDGET)
+        if len(chunks) > 1:
+            results["role_type"] = extract_with_llm(text, "role_type", model_fields=model_fields)
+            missing.remove("role_type")
+            if not missing:
+                return {field: results[field] for field in fields}
+    if len(chunks) != 1:
+        chunks = chunk_text(text, "combined", LLM_TOKEN_BUDGET)
+
+    # The combined prompt is only used when the relevant sections fit in one chunk;
+    # longer postings go through the per-field path, which chunks each field separately
+    if len(chunks) > 1:
+        logger.info(f"Posting needs {len(chunks)} chunks, using per-field extraction")
+        for field in missing:
+            results[field] = extract_with_llm(text, field, model_fields=model_fields)
+        return {field: results[field] for field in fields}
+
+    parsed = {}
+    try:
+        field_lines = "\n".join(f'"{field}": {COMBINED_FIELD_DESCRIPTIONS[field]}' for field in missing)
+        system_prompt = f"""You are an expert job analyst. Extract the following fields from the provided job description
+            and return them together as a single JSON object with exactly these keys:
+            {field_lines}
+            
+            Do not include bullet points or numbering in list items.
+            Only return the JSON object, nothing else."""
+
+        result = _chat(system_prompt, f"Job description text:\n\n{chunks[0] if chunks else text}\n\nExtract the {', '.join(missing)}.",
+                       schema=_combined_schema(missing), num_predict=LLM_NUM_PREDICT["combined"])
+        logger.debug(f"LLM response for combined extraction: {result}")
+
+        parsed = _load_reply(result, '{', '}')
+        if not isinstance(parsed, dict):
+            parsed = {}
+
+    except Exception as e:
+        logger.error(f"Error in combined LLM extraction: {e}")
+
+    for field in missing:
+        value = _validate_field(field, parsed.get(field))
+        if value is None:
+            logger.warning(f"Combined extraction returned no valid {field}, using per-field extraction")
+            value = extract_with_llm(text, field, model_fields=model_fields)
+        else:
+            if field == "skills":
+                value = get_skill_taxonomy().normalize(value)
+            llm_cache.set(cache_keys[field], value)
+            if model_fields is not None:
+                model_fields.add(field)
+        results[field] = value
+    return {field: results[field] for field in fields}
+
+
+def _validate_field(extraction_type: str, value: Any) -> Optional[List[str]]:
+    """Normalize one field of a combined response, or return None if it is unusable."""
+    if extraction_type in SCALAR_FIELDS:
+        if isinstance(value, list) and value:
+            value = value[0]
+        if isinstance(value, str) and value.strip():
+            return [value.strip()]
+        return None
+
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        return None
+    return [item.strip() for item in value if item.strip()]
+
+
 def fallback_extraction(text: str, extraction_type: str) -> List[str]:
     logger.info(f"Using fallback extraction for {extraction_type}")
 
@@ -152,27 +479,27 @@ def fallback_extraction(text: str, extraction_type: str) -> List[str]:
     return [f"• {item}" for item in results[:8]]
 
 
-def check_ollama_available() -> bool:
-    try:
-        response = ollama.list()
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit, miss and eviction counters of the LLM result cache."""
+    return llm_cache.stats()
 
-        if not response or "models" not in response:
-            logger.error("Failed to retrieve model list from Ollama.")
-            return False
 
-        available_models = [model.get("model", "") for model in response.get("models", [])]
+def get_pool_stats() -> Dict[str, Any]:
+    """Return load, health and failover counters of the Ollama hosts."""
+    return ollama_pool.stats()
 
-        if LLM_MODEL in available_models:
-            logger.info(f"✅ Ollama is available and model '{LLM_MODEL}' is loaded.")
-            return True
-        else:
-            logger.warning(f"⚠️ Ollama is available, but model '{LLM_MODEL}' is not loaded. Available models: {available_models}")
-            return False
 
-    except Exception as e:
-        logger.error(f"❌ Failed to connect to Ollama: {e}")
+def check_ollama_available() -> bool:
+    """Probe every Ollama host and return whether any of them can be used."""
+    available = [host.check() for host in ollama_pool.hosts]
+    if not any(available):
         logger.warning("⚠️ Will use fallback extraction methods instead of LLM.")
-        return False
+    return any(available)
+
+
+def is_ollama_available() -> bool:
+    """Return whether the LLM path should be used right now."""
+    return ollama_pool.is_available()
 
 
 if __name__ == '__main__':
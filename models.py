@@ -0,0 +1,66 @@
+"""
+Persistent store of extracted job details.
+
+Finished scrapes are saved here under their job id, so a results page can
+be served (and cached) long after the job itself has been cleaned out of
+the job queue, and the browser session only has to carry that id. SQLite is
+used by default; set DATABASE_URL to use Postgres instead.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import DeclarativeBase
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+db = SQLAlchemy(model_class=Base)
+
+
+class JobResult(db.Model):
+    """Job details extracted from one scraped posting."""
+
+    __tablename__ = "job_results"
+
+    id = db.Column(db.String(32), primary_key=True)
+    source_url = db.Column(db.Text, nullable=False)
+    job_details = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           default=lambda: datetime.now(timezone.utc))
+
+
+def save_result(result_id: str, source_url: str, job_details: Dict[str, Any]) -> None:
+    """
+    Store the job details of a finished scrape.
+
+    Args:
+        result_id (str): Id the result is served under (the job id).
+        source_url (str): URL of the scraped posting.
+        job_details (dict): Extracted fields.
+    """
+    try:
+        db.session.merge(JobResult(id=result_id, source_url=source_url, job_details=job_details))
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+
+
+def get_result(result_id: str) -> Optional[JobResult]:
+    """Return the stored result with the given id, or None."""
+    try:
+        return db.session.get(JobResult, result_id)
+    except SQLAlchemyError as e:
+        logger.error(f"Error reading result {result_id}: {e}")
+        db.session.rollback()
+        return None
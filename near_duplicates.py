@@ -0,0 +1,230 @@
+"""
+Near-duplicate detection of job posting text with SimHash.
+
+Each posting's plain text is reduced to a 64-bit SimHash of its word
+3-shingles; postings that differ only in small wording changes get
+fingerprints a few bits apart. Fingerprints are indexed with banded LSH:
+split into max_distance + 1 bands, two fingerprints within max_distance
+bits must agree exactly on at least one band, so a lookup only compares
+against the postings sharing a band instead of the whole index.
+
+The index keeps the extracted fields of each posting, so a repost can
+reuse them instead of running the LLM again. It lives in memory, bounded
+to the most recently used entries, and can be persisted to SQLite.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# _BIT_TABLES[bit] maps a byte to 1 if that bit is set in it, else 0
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def simhash(text: str, min_tokens: int = 0) -> Optional[int]:
+    """
+    Compute the 64-bit SimHash of a text's word shingles.
+
+    Returns:
+        int: The fingerprint, or None if the text has fewer than min_tokens words.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens or len(tokens) < min_tokens:
+        return None
+    shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(len(tokens) - SHINGLE_SIZE + 1, 1))}
+
+    # A fingerprint bit is set when more than half the shingle hashes have it set. The
+    # hashes are counted a column at a time: every hash's byte at one position is sliced
+    # out, mapped to that bit's value and counted, so the per-hash work stays in C.
+    digests = b"".join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    fingerprint = 0
+    for position in range(FINGERPRINT_BITS // 8):
+        column = digests[position::8]
+        # Digests are big-endian: the first byte holds the most significant bits
+        shift = (FINGERPRINT_BITS // 8 - 1 - position) * 8
+        for bit, table in enumerate(_BIT_TABLES):
+            if column.translate(table).count(1) * 2 > len(shingles):
+                fingerprint |= 1 << (shift + bit)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """
+    SimHash LSH index mapping posting fingerprints to their extracted fields.
+
+    Args:
+        threshold (float): Minimum similarity (1 - differing bits / 64) for a match.
+        max_entries (int): Entries kept; the least recently matched are evicted.
+            0 disables the index.
+        min_tokens (int): Texts shorter than this many words are not fingerprinted.
+        db_path (str): SQLite file to persist entries in, or None for memory only.
+        version (str): Tag stored with each entry; persisted entries with another
+            tag (e.g. from an older prompt version) are ignored.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 10000, min_tokens: int = 50,
+                 db_path: Optional[str] = None, version: str = ""):
+        self.max_distance = max(int((1 - threshold) * FINGERPRINT_BITS), 0)
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+        self.version = version
+
+        # Pigeonhole: within max_distance bits, at least one of max_distance + 1 bands is unchanged
+        bands = min(self.max_distance + 1, FINGERPRINT_BITS)
+        band_width = FINGERPRINT_BITS // bands
+        self._bands = [(index * band_width, (1 << band_width) - 1) for index in range(bands)]
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._buckets: List[Dict[int, set]] = [{} for _ in self._bands]
+        self._db = None
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+        if db_path and max_entries > 0:
+            self._open(db_path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def fingerprint(self, text: str) -> Optional[int]:
+        """Fingerprint a posting's text, or None if it is too short to compare reliably."""
+        if not self.enabled:
+            return None
+        return simhash(text, self.min_tokens)
+
+    def find(self, fingerprint: Optional[int]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Look up the closest indexed posting within the threshold.
+
+        Returns:
+            tuple: A copy of its fields and the similarity, or None if there is no match.
+        """
+        if fingerprint is None:
+            return None
+        with self._lock:
+            best = None
+            for bucket, key in zip(self._buckets, self._band_keys(fingerprint)):
+                for candidate in bucket.get(key, ()):
+                    distance = hamming_distance(fingerprint, candidate)
+                    if distance <= self.max_distance and (best is None or distance < best[1]):
+                        best = (candidate, distance)
+            if best is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._entries.move_to_end(best[0])
+            fields = dict(self._entries[best[0]])
+        return fields, 1 - best[1] / FINGERPRINT_BITS
+
+    def add(self, fingerprint: Optional[int], fields: Dict[str, Any]) -> None:
+        """Index a posting's extracted fields under its fingerprint."""
+        if fingerprint is None or not fields:
+            return
+        with self._lock:
+            evicted = self._insert(fingerprint, dict(fields))
+            if self._db is not None:
+                try:
+                    # The new entry and the evictions it caused are written in one transaction
+                    with self._db:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO near_duplicates (fingerprint, fields, version, created_at) "
+                            "VALUES (?, ?, ?, ?)",
+                            (_to_signed(fingerprint), json.dumps(fields), self.version, time.time())
+                        )
+                        self._db.executemany("DELETE FROM near_duplicates WHERE fingerprint = ?",
+                                             [(_to_signed(old),) for old in evicted])
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    logger.error(f"Error persisting near-duplicate entry: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the number of entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_distance"] = self.max_distance
+            return stats
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        return [(fingerprint >> shift) & mask for shift, mask in self._bands]
+
+    def _insert(self, fingerprint: int, fields: Dict[str, Any]) -> List[int]:
+        """Add an entry in memory; returns the fingerprints evicted to make room."""
+        evicted_entries = []
+        if fingerprint in self._entries:
+            self._entries.move_to_end(fingerprint)
+        else:
+            for bucket, key in zip(self._buckets, self._band_keys(fingerprint)):
+                bucket.setdefault(key, set()).add(fingerprint)
+        self._entries[fingerprint] = fields
+
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            for bucket, key in zip(self._buckets, self._band_keys(evicted)):
+                members = bucket.get(key)
+                if members is not None:
+                    members.discard(evicted)
+                    if not members:
+                        del bucket[key]
+            self._stats["evictions"] += 1
+            evicted_entries.append(evicted)
+        return evicted_entries
+
+    def _open(self, db_path: str) -> None:
+        """Open the persistent store and load its most recent entries into memory."""
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicates ("
+                "fingerprint INTEGER PRIMARY KEY, fields TEXT NOT NULL, version TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM near_duplicates WHERE version != ?", (self.version,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT fingerprint, fields FROM near_duplicates ORDER BY created_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Could not open near-duplicate database {db_path}, keeping the index in memory: {e}")
+            self._db = None
+            return
+        with self._lock:
+            for fingerprint, fields in reversed(rows):
+                self._insert(_to_unsigned(fingerprint), json.loads(fields))
+
+
+def _to_signed(fingerprint: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
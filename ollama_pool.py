@@ -0,0 +1,312 @@
+"""
+Pool of Ollama hosts with load balancing and failover.
+
+Each host has its own client, model, concurrency cap and circuit breaker.
+A request goes to the available host with the fewest requests in flight
+relative to its cap, waiting if every host is at its cap. When a call to a
+host fails (a timeout, a refused connection or an error reply) the host's
+breaker records the failure and the request moves to the next host, so a
+slow or dead box only costs the requests that were on it; after repeated
+failures the breaker takes the host out of rotation until a probe finds
+it healthy again.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import ollama
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+
+class OllamaUnavailable(Exception):
+    """Raised when no Ollama host can take a request."""
+
+
+def parse_hosts(spec: str, default_model: str, default_concurrency: int) -> List[Tuple[Optional[str], str, int]]:
+    """
+    Parse an OLLAMA_HOSTS value.
+
+    Args:
+        spec (str): Comma-separated hosts, each "url", "url|model" or
+            "url|model|max_concurrency"; an empty model or concurrency takes
+            the default.
+        default_model (str): Model for hosts that do not name one.
+        default_concurrency (int): Concurrency cap for hosts that do not set one.
+
+    Returns:
+        list: (url, model, max_concurrency) per host, or a single entry for
+            the client's default host (OLLAMA_HOST) if spec is empty.
+
+    Raises:
+        ValueError: If a concurrency cap is not a positive integer.
+    """
+    hosts = []
+    for entry in spec.split(','):
+        parts = [part.strip() for part in entry.split('|')]
+        if not parts[0]:
+            continue
+        model = parts[1] if len(parts) > 1 and parts[1] else default_model
+        concurrency = int(parts[2]) if len(parts) > 2 and parts[2] else default_concurrency
+        if concurrency < 1:
+            raise ValueError(f"Invalid concurrency for Ollama host {parts[0]}: {concurrency}")
+        hosts.append((parts[0], model, concurrency))
+    return hosts or [(None, default_model, default_concurrency)]
+
+
+class OllamaCircuitBreaker:
+    """
+    Lazily probed, self-healing view of whether Ollama can be used.
+
+    Nothing is probed until the first call to `is_available`; callers arriving
+    while that first probe runs wait for its answer. While closed
+    (available) the probe is repeated every `probe_interval` seconds. The
+    breaker opens when a probe fails or after `failure_threshold` consecutive
+    failed calls; once `cooldown` seconds have passed a single caller re-probes
+    (half-open) and the breaker closes again if Ollama has recovered.
+    """
+
+    def __init__(self, probe, failure_threshold: int = 3, cooldown: float = 30,
+                 probe_interval: float = 300, name: str = "Ollama"):
+        self.probe = probe
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+
+        self._lock = threading.Lock()
+        self._available = None
+        self._checked_at = 0.0
+        self._failures = 0
+        self._probing = False
+        self._first_probe = threading.Event()
+
+    @property
+    def available(self) -> Optional[bool]:
+        """The last known state without probing, or None if never probed."""
+        return self._available
+
+    def is_available(self) -> bool:
+        """Return whether Ollama should be used, probing it if the state is stale."""
+        now = time.monotonic()
+        with self._lock:
+            if self._available is not None:
+                wait = self.probe_interval if self._available else self.cooldown
+                if now - self._checked_at < wait or self._probing:
+                    return self._available
+            # Only reached while probing if this is the first probe
+            waiting = self._probing
+            self._probing = True
+
+        if waiting:
+            self._first_probe.wait()
+            return bool(self._available)
+
+        try:
+            available = bool(self.probe())
+        except Exception as e:
+            logger.error(f"{self.name} availability probe failed: {e}")
+            available = False
+
+        with self._lock:
+            if available and not self._available:
+                logger.info(f"{self.name} is available, using it for LLM extraction")
+            elif not available and self._available is not False:
+                logger.warning(f"{self.name} is unavailable, not using it for the next {self.cooldown:.0f}s")
+            self._available = available
+            self._checked_at = time.monotonic()
+            self._failures = 0
+            self._probing = False
+            self._first_probe.set()
+            return available
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._available and self._failures >= self.failure_threshold:
+                logger.warning(f"{self.name} failed {self._failures} calls in a row, "
+                               f"not using it for the next {self.cooldown:.0f}s")
+                self._available = False
+                self._checked_at = time.monotonic()
+
+
+class OllamaHost:
+    """
+    One Ollama server in the pool.
+
+    Args:
+        url (str): Base URL of the server, or None for the client default (OLLAMA_HOST).
+        model (str): Model to run on this server.
+        max_concurrency (int): Requests this process sends it at once.
+        timeout (float): Seconds a chat request may take before it fails over.
+        probe_timeout (float): Seconds the health probe may take.
+        failure_threshold, cooldown, probe_interval: See OllamaCircuitBreaker.
+    """
+
+    def __init__(self, url: Optional[str], model: str, max_concurrency: int = 4, timeout: float = 120,
+                 probe_timeout: float = 5, failure_threshold: int = 3, cooldown: float = 30,
+                 probe_interval: float = 300):
+        self.url = url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.client = ollama.Client(host=url, timeout=timeout)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+
+        self._probe_client = ollama.Client(host=url, timeout=probe_timeout)
+        self.breaker = OllamaCircuitBreaker(
+            self.check,
+            failure_threshold=failure_threshold,
+            cooldown=cooldown,
+            probe_interval=probe_interval,
+            name=f"Ollama at {self.name}",
+        )
+
+    @property
+    def name(self) -> str:
+        return self.url or "the default host"
+
+    def check(self) -> bool:
+        """Probe the server and return whether it has this host's model."""
+        try:
+            response = self._probe_client.list()
+
+            if not response or "models" not in response:
+                logger.error(f"Failed to retrieve model list from Ollama at {self.name}.")
+                return False
+
+            available_models = [model.get("model", "") for model in response.get("models", [])]
+
+            if self.model in available_models:
+                logger.info(f"Ollama at {self.name} is available and model '{self.model}' is loaded.")
+                return True
+            logger.warning(f"Ollama at {self.name} is available, but model '{self.model}' is not loaded. "
+                           f"Available models: {available_models}")
+            return False
+
+        except Exception as e:
+            logger.error(f"Failed to connect to Ollama at {self.name}: {e}")
+            return False
+
+
+class OllamaPool:
+    """
+    Least-outstanding-requests balancer over a set of OllamaHosts.
+
+    Args:
+        hosts (list): The hosts to spread requests over.
+    """
+
+    def __init__(self, hosts: Sequence[OllamaHost]):
+        self.hosts = list(hosts)
+        self._cond = threading.Condition()
+        self._failovers = 0
+
+    @property
+    def capacity(self) -> int:
+        """Requests the pool can have in flight at once."""
+        return sum(host.max_concurrency for host in self.hosts)
+
+    @property
+    def model_tag(self) -> str:
+        """The models the pool may answer with, for keying cached results."""
+        return "+".join(sorted({host.model for host in self.hosts}))
+
+    def is_available(self) -> bool:
+        """Return whether any host can take requests, probing hosts whose state is stale."""
+        return any(host.breaker.is_available() for host in self.hosts)
+
+    def call(self, function: Callable[[OllamaHost], Any], can_retry: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Run function against a host, moving to another host if it fails.
+
+        Args:
+            function: Called with the chosen OllamaHost; should use its client and model.
+            can_retry: Called after a failure; returning False re-raises the error
+                instead of failing over (e.g. once part of a streamed reply was used).
+
+        Returns:
+            Whatever function returned.
+
+        Raises:
+            OllamaUnavailable: If no host is available.
+            Exception: The last host's error once every available host has failed.
+        """
+        tried = []
+        last_error = None
+        while True:
+            try:
+                host = self._acquire(tried)
+            except OllamaUnavailable:
+                if last_error is not None:
+                    raise last_error
+                raise
+            try:
+                result = function(host)
+            except Exception as e:
+                host.breaker.record_failure()
+                with self._cond:
+                    host.failures += 1
+                if can_retry is not None and not can_retry():
+                    raise
+                logger.warning(f"Ollama request to {host.name} failed, trying another host: {e}")
+                tried.append(host)
+                last_error = e
+                continue
+            finally:
+                self._release(host)
+            host.breaker.record_success()
+            if tried:
+                with self._cond:
+                    self._failovers += 1
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-host load and health, without probing."""
+        with self._cond:
+            return {
+                "failovers": self._failovers,
+                "hosts": [
+                    {
+                        "host": host.name,
+                        "model": host.model,
+                        "available": host.breaker.available,
+                        "outstanding": host.outstanding,
+                        "max_concurrency": host.max_concurrency,
+                        "requests": host.requests,
+                        "failures": host.failures,
+                    }
+                    for host in self.hosts
+                ],
+            }
+
+    def _acquire(self, exclude: List[OllamaHost]) -> OllamaHost:
+        """Reserve a slot on the least loaded available host, waiting for one if all are full."""
+        while True:
+            # Health is checked outside the lock since it may probe a host
+            healthy = [host for host in self.hosts if host not in exclude and host.breaker.is_available()]
+            if not healthy:
+                raise OllamaUnavailable("No Ollama host is available")
+            with self._cond:
+                free = [host for host in healthy if host.outstanding < host.max_concurrency]
+                if free:
+                    host = min(free, key=lambda host: host.outstanding / host.max_concurrency)
+                    host.outstanding += 1
+                    host.requests += 1
+                    return host
+                # Wake up when a slot is released, or periodically to notice hosts going down
+                self._cond.wait(timeout=1.0)
+
+    def _release(self, host: OllamaHost) -> None:
+        with self._cond:
+            host.outstanding -= 1
+            self._cond.notify()
@@ -0,0 +1,104 @@
+"""
+Per-host token-bucket rate limiting for outgoing fetches.
+
+Each host gets its own bucket, so a request only waits behind earlier
+requests to the same host. Tokens are reserved rather than polled: a
+caller that finds the bucket empty is told how long to wait for its slot,
+which lets blocking and asyncio callers share the same limiter.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a fixed rate.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens, i.e. the allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Take one token and return how many seconds the caller must wait before using it."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        # A negative balance is a queue of reservations waiting for refill
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        """Whether the bucket would be full again by now, so dropping it changes nothing."""
+        return self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+class HostRateLimiter:
+    """
+    Rate limiter holding one TokenBucket per host.
+
+    Args:
+        rate (float): Requests per second allowed to each host. 0 disables limiting.
+        burst (float): Requests a host may receive back to back before limiting applies.
+        max_hosts (int): Number of host buckets kept; idle buckets are dropped first.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: float = 1, max_hosts: int = 1024):
+        self.rate = rate
+        self.burst = burst
+        self.max_hosts = max_hosts
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, host: str) -> float:
+        """
+        Reserve the next request slot for host without blocking.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        if self.rate <= 0 or not host:
+            return 0.0
+        host = host.lower()
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+                self._prune(now)
+            else:
+                self._buckets.move_to_end(host)
+            return bucket.reserve(now)
+
+    def acquire(self, host: str) -> float:
+        """
+        Block until a request to host is allowed.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        delay = self.reserve(host)
+        if delay > 0:
+            logger.debug(f"Rate limiting {host}: waiting {delay:.2f}s")
+            time.sleep(delay)
+        return delay
+
+    def _prune(self, now: float) -> None:
+        """Drop least recently used idle buckets while over max_hosts."""
+        for host in list(self._buckets):
+            if len(self._buckets) <= self.max_hosts:
+                break
+            if self._buckets[host].is_idle(now):
+                del self._buckets[host]
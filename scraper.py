@@ -1,10 +1,15 @@
-import time
+import os
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
-import trafilatura
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from trafilatura.utils import decode_file
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from fetch_cache import FetchCache, response_validators
+from html_document import extract_page_text
+from html_stream import DownloadRejected, HTMLBodyReader
+from rate_limiter import HostRateLimiter
 
 # Configure logging
 logging.basicConfig(level=logging.ERROR)
@@ -19,6 +24,83 @@ DEFAULT_HEADERS = {
     'Upgrade-Insecure-Requests': '1',
 }
 
+# Connection pooling: number of per-host pools kept, and connections per host
+SCRAPER_POOL_HOSTS = int(os.environ.get("SCRAPER_POOL_HOSTS", "32"))
+SCRAPER_POOL_PER_HOST = int(os.environ.get("SCRAPER_POOL_PER_HOST", "4"))
+SCRAPER_TIMEOUT = float(os.environ.get("SCRAPER_TIMEOUT", "10"))
+
+# Per-host politeness: requests per second to the same host, and the allowed burst
+SCRAPER_RATE_PER_HOST = float(os.environ.get("SCRAPER_RATE_PER_HOST", "1"))
+SCRAPER_BURST_PER_HOST = float(os.environ.get("SCRAPER_BURST_PER_HOST", "1"))
+
+host_rate_limiter = HostRateLimiter(rate=SCRAPER_RATE_PER_HOST, burst=SCRAPER_BURST_PER_HOST)
+
+# Streaming download limits: the kept HTML body, and the bytes read from the network.
+# With SCRAPER_STRIP_SCRIPTS, <script>/<style> content (except JSON-LD) is dropped while reading.
+SCRAPER_MAX_BYTES = int(os.environ.get("SCRAPER_MAX_BYTES", str(5 * 1024 * 1024)))
+SCRAPER_MAX_DOWNLOAD_BYTES = int(os.environ.get("SCRAPER_MAX_DOWNLOAD_BYTES", str(20 * 1024 * 1024)))
+SCRAPER_STRIP_SCRIPTS = os.environ.get("SCRAPER_STRIP_SCRIPTS", "").lower() in ("1", "true", "yes")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Conditional-request cache of page bodies, kept on disk so re-crawls after a restart (and every
+# worker process sharing the file) only pay for revalidation; FETCH_CACHE_PATH=:memory: keeps it per process
+fetch_cache = FetchCache(
+    db_path=os.environ.get("FETCH_CACHE_PATH", "fetch_cache.db") or ":memory:",
+    max_bytes=int(os.environ.get("FETCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+# Query parameters that only track where a link was shared, ignored when comparing URLs
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "igshid"}
+
+# Shared keep-alive session, created on first use
+_session = None
+
+
+def get_session():
+    """
+    Return the shared HTTP session.
+
+    The session keeps connections alive between requests and holds at most
+    SCRAPER_POOL_PER_HOST connections per host; extra concurrent requests to
+    the same host wait for a free connection instead of opening new ones.
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=SCRAPER_POOL_HOSTS,
+                              pool_maxsize=SCRAPER_POOL_PER_HOST,
+                              pool_block=True)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _session = session
+    return _session
+
+def normalize_url(url):
+    """
+    Normalize a URL so links to the same posting compare equal.
+    
+    Lowercases the scheme and host, drops default ports, the fragment and
+    utm_*/click-tracking parameters, and sorts the remaining query parameters.
+    
+    Args:
+        url (str): The URL to normalize.
+        
+    Returns:
+        str: The normalized URL, or the stripped input if it is not an absolute URL.
+    """
+    url = url.strip()
+    parsed = urlparse(url)
+    if not parsed.scheme or not parsed.hostname:
+        return url
+    scheme = parsed.scheme.lower()
+    netloc = parsed.hostname
+    if parsed.port and (scheme, parsed.port) not in (("http", 80), ("https", 443)):
+        netloc = f"{netloc}:{parsed.port}"
+    query = sorted((name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+                   if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMS)
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, urlencode(query), ""))
+
 def scrape_job_posting(url):
     """
     Scrape the job posting from the provided URL.
@@ -38,23 +120,28 @@ def scrape_job_posting(url):
             logger.error(f"Invalid URL: {url}")
             return None
         
-        # Use trafilatura to fetch the URL
-        downloaded = trafilatura.fetch_url(url)
+        # Revalidate a cached copy instead of downloading the page again
+        response = _get(url, parsed_url.hostname, fetch_cache.conditional_headers(url))
+        if response.status_code == 304:
+            response.close()
+            cached = fetch_cache.get(url)
+            if cached is not None:
+                logger.info(f"Not modified, serving cached copy of {url}")
+                return decode_file(cached.body)
+            # The cached copy was evicted since the request went out
+            response = _get(url, parsed_url.hostname)
         
-        if not downloaded:
-            # Fallback to requests if trafilatura fails
-            logger.warning("Trafilatura fetch failed, falling back to requests")
-            response = requests.get(url, headers=DEFAULT_HEADERS, timeout=10)
-            response.raise_for_status()
-            html_content = response.text
-        else:
-            html_content = downloaded
+        body = read_html_body(response)
+        fetch_cache.store(url, body, **response_validators(response.headers))
         
-        # Add a small delay to be respectful to the website
-        time.sleep(1)
+        # Decode the same way trafilatura.fetch_url does, guessing the encoding when needed
+        html_content = decode_file(body)
         
         return html_content
     
+    except DownloadRejected as e:
+        logger.warning(f"Skipping {url}: {str(e)}")
+        return None
     except RequestException as e:
         logger.error(f"Request error: {str(e)}")
         return None
@@ -62,6 +149,34 @@ def scrape_job_posting(url):
         logger.error(f"Unexpected error during scraping: {str(e)}")
         return None
 
+def _get(url, host, headers=None):
+    """Send a GET through the shared session once the host's rate limit allows it."""
+    # Only requests to the same host wait on each other
+    host_rate_limiter.acquire(host)
+    return get_session().get(url, headers=headers, timeout=SCRAPER_TIMEOUT, stream=True)
+
+def read_html_body(response):
+    """
+    Stream a response body into memory under the configured size limits.
+    
+    Args:
+        response (requests.Response): A response opened with stream=True.
+        
+    Returns:
+        bytes: The (optionally script-stripped) HTML body.
+        
+    Raises:
+        DownloadRejected: If the response is not HTML or is too large.
+        requests.HTTPError: If the response has an error status.
+    """
+    with response:
+        response.raise_for_status()
+        reader = HTMLBodyReader(SCRAPER_MAX_BYTES, SCRAPER_MAX_DOWNLOAD_BYTES, SCRAPER_STRIP_SCRIPTS)
+        reader.check_headers(response.headers)
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            reader.feed(chunk)
+        return reader.finish()
+
 def extract_plain_text(html_content):
     """
     Extract plain text from HTML content using trafilatura.
@@ -73,17 +188,8 @@ def extract_plain_text(html_content):
         str: The extracted plain text.
     """
     try:
-        text = trafilatura.extract(html_content)
-        if not text:
-            # Fallback to BeautifulSoup if trafilatura extraction fails
-            soup = BeautifulSoup(html_content, 'html.parser')
-            text = soup.get_text(separator=' ', strip=True)
-        return text
+        # Parses the document once and falls back to its visible text if trafilatura fails
+        return extract_page_text(html_content)
     except Exception as e:
         logger.error(f"Error extracting plain text: {str(e)}")
-        # Fallback to BeautifulSoup
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            return soup.get_text(separator=' ', strip=True)
-        except:
-            return ""
+        return ""
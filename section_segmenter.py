@@ -0,0 +1,140 @@
+"""
+Single-pass segmentation of job posting text into typed sections.
+
+The plain text is tokenized once, line by line: heading lines start a new
+section whose type (responsibilities, qualifications, skills, benefits,
+about, description, location or other) is decided from the heading, and
+the lines under it become the section's items with any bullet markers
+removed. Headings written inline ("Responsibilities: lead the team") are
+split into the heading and a first item. The regex extractors and the LLM
+chunker all read this one structure instead of rescanning the text with
+their own section patterns.
+"""
+
+import logging
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Section types in order of precedence, with the heading keywords that select them;
+# "Qualifications & Skills" is a qualifications section, "Technical Skills" a skills one
+SECTION_TYPES = (
+    ("responsibilities", ("responsibilit", "duties", "what you'll do", "what you will do",
+                          "what you'll be doing", "day to day", "job functions", "your role",
+                          "the role", "your impact")),
+    ("qualifications", ("qualification", "requirement", "what you'll need", "what you need",
+                        "what we're looking for", "we're looking for", "who you are", "must have",
+                        "nice to have", "preferred", "education", "experience")),
+    ("skills", ("skill", "technolog", "tech stack", "tools", "expertise")),
+    ("benefits", ("benefit", "perks", "what we offer", "compensation", "salary")),
+    ("about", ("about us", "about the company", "who we are", "our company", "our mission")),
+    ("description", ("job description", "about the job", "about the position", "overview", "summary")),
+    ("location", ("location", "where you'll work")),
+)
+
+BULLET_PREFIX_RE = re.compile(r'^(?:[•▪●◦‣∙·*]|-(?=\s)|\d+[.)](?=\s))\s*')
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+INLINE_HEADING_RE = re.compile(r'^([^:]{2,40}):\s+(\S.*)$')
+_KNOWN_HEADING_RE = re.compile(
+    "|".join(re.escape(keyword) for _, keywords in SECTION_TYPES for keyword in keywords)
+    + r"|how to apply|what we|what you'll|what you will|about the",
+    re.IGNORECASE
+)
+
+# Paragraphs under a heading longer than this are split into sentences when they stand alone
+LONG_PARAGRAPH = 160
+
+
+class Section(NamedTuple):
+    kind: str
+    heading: str
+    lines: List[str]
+    items: List[str]
+
+
+def section_kind(heading: str) -> str:
+    """Classify a heading into one of the SECTION_TYPES, or "other"."""
+    heading = heading.lower()
+    for kind, keywords in SECTION_TYPES:
+        if any(keyword in heading for keyword in keywords):
+            return kind
+    return "other"
+
+
+def is_heading(line: str) -> bool:
+    """Guess whether a stripped line is a section heading."""
+    if not line or len(line) > 80 or BULLET_PREFIX_RE.match(line):
+        return False
+    if line.endswith(':'):
+        return True
+    return (len(line) <= 60 and len(line.split()) <= 8 and line[-1] not in '.!?,;'
+            and bool(_KNOWN_HEADING_RE.search(line)))
+
+
+class SegmentedPosting:
+    """
+    A job posting split into typed sections.
+
+    Args:
+        text (str): Plain text of the posting.
+    """
+
+    def __init__(self, text: str):
+        self.sections: List[Section] = []
+        self.lines: List[str] = []
+        self._segment(text or "")
+
+    def _segment(self, text: str) -> None:
+        heading, kind, lines = "", "intro", []
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            self.lines.append(line)
+            if is_heading(line):
+                self._add(heading, kind, lines)
+                heading, kind, lines = line, section_kind(line.rstrip(':')), []
+                continue
+            inline = INLINE_HEADING_RE.match(line)
+            if inline and section_kind(inline.group(1)) != "other":
+                self._add(heading, kind, lines)
+                heading, kind, lines = inline.group(1), section_kind(inline.group(1)), [inline.group(2)]
+                continue
+            lines.append(line)
+        self._add(heading, kind, lines)
+
+    def _add(self, heading: str, kind: str, lines: List[str]) -> None:
+        if not heading and not lines:
+            return
+        items = [BULLET_PREFIX_RE.sub('', line).strip() for line in lines]
+        if len(items) == 1 and len(items[0]) > LONG_PARAGRAPH and kind not in ("intro", "other"):
+            # A section written as one paragraph: treat each sentence as an item
+            items = [sentence.strip() for sentence in SENTENCE_SPLIT_RE.split(items[0])]
+        self.sections.append(Section(kind, heading, lines, [item for item in items if item]))
+
+    def of(self, *kinds: str) -> List[Section]:
+        """Return the sections of the given kinds, in document order."""
+        return [section for section in self.sections if section.kind in kinds]
+
+    def items(self, *kinds: str) -> List[str]:
+        """Return the items of every section of the given kinds, in document order."""
+        return [item for section in self.of(*kinds) for item in section.items]
+
+    def split(self) -> List[Tuple[str, List[str]]]:
+        """Return (heading, lines) pairs for every section."""
+        return [(section.heading, section.lines) for section in self.sections]
+
+
+@lru_cache(maxsize=32)
+def segment(text: str) -> SegmentedPosting:
+    """
+    Segment posting text, reusing the result for text seen recently.
+
+    Every extractor for one posting is given the same plain text, so they
+    all share one segmentation.
+    """
+    return SegmentedPosting(text)
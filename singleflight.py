@@ -0,0 +1,197 @@
+"""
+Coalescing of concurrent identical calls ("singleflight").
+
+While a call for a key is in flight, further calls for the same key wait
+for it and share its result instead of repeating the work. Within a
+process this is a dict of in-flight calls guarded by a lock. With a
+SQLite file configured, the first process to start a key takes a lease
+row on it and stores the JSON result there when done; other processes
+(e.g. the other gunicorn workers) poll the row and pick the result up. A
+lease that outlives its holder (a crashed worker) expires and the next
+caller takes over.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run a function at most once at a time per key, sharing the result with concurrent callers.
+
+    Args:
+        db_path (str): SQLite file shared by the processes to coalesce across,
+            or None to coalesce within this process only.
+        lease (float): Seconds a process may hold a key before others presume
+            it dead and run the call themselves.
+        result_ttl (float): Seconds a finished result stays readable for
+            processes still polling for it.
+        poll_interval (float): Seconds between checks while another process
+            holds the key.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, lease: float = 300, result_ttl: float = 60,
+                 poll_interval: float = 0.2):
+        self.db_path = db_path
+        self.lease = lease
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._owner = uuid.uuid4().hex
+        self._stats = {
+            "executed": 0,
+            "coalesced": 0,
+        }
+
+        if db_path:
+            try:
+                with self._connect() as db:
+                    db.execute(
+                        "CREATE TABLE IF NOT EXISTS singleflight ("
+                        "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL, "
+                        "result TEXT, finished_at REAL)"
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Could not open singleflight database {db_path}, coalescing in-process only: {e}")
+                self.db_path = None
+
+    def do(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Call function, unless a call for the same key is already in flight.
+
+        Results shared across processes go through JSON, so function must
+        return a JSON-serializable value when a database is configured.
+        Callers sharing a result must treat it as read-only.
+
+        Returns:
+            tuple: The result, and whether it was shared from another caller's run.
+
+        Raises:
+            Exception: Whatever function raised, for the caller that ran it and the
+                in-process callers waiting on it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                self._stats["coalesced"] += 1
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        shared = False
+        try:
+            if self.db_path:
+                call.result, shared = self._do_shared(key, function)
+            else:
+                call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._stats["coalesced" if shared else "executed"] += 1
+            call.done.set()
+        return call.result, shared
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many calls ran and how many shared another call's result."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+            return stats
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _do_shared(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        while True:
+            try:
+                leader, finished, result = self._acquire(key)
+            except sqlite3.Error as e:
+                logger.error(f"Singleflight lease failed for {key}, running the call unshared: {e}")
+                return function(), False
+            if finished:
+                return result, True
+            if not leader:
+                time.sleep(self.poll_interval)
+                continue
+
+            try:
+                result = function()
+            except BaseException:
+                # Let a waiting process take the key over and run the call itself
+                self._release(key)
+                raise
+            self._complete(key, result)
+            return result, False
+
+    def _acquire(self, key: str) -> Tuple[bool, bool, Any]:
+        """Take the key's lease if it is free; returns (leader, finished, result)."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "DELETE FROM singleflight WHERE (finished_at IS NULL AND expires_at < ?) OR finished_at < ?",
+                    (now, now - self.result_ttl)
+                )
+                row = db.execute("SELECT result, finished_at FROM singleflight WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    db.execute("INSERT INTO singleflight (key, owner, expires_at) VALUES (?, ?, ?)",
+                               (key, self._owner, now + self.lease))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return True, False, None
+        if row[1] is not None:
+            return False, True, json.loads(row[0])
+        return False, False, None
+
+    def _complete(self, key: str, result: Any) -> None:
+        try:
+            with self._connect() as db:
+                db.execute("UPDATE singleflight SET result = ?, finished_at = ? WHERE key = ? AND owner = ?",
+                           (json.dumps(result), time.time(), key, self._owner))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Could not share the result for {key}: {e}")
+            self._release(key)
+
+    def _release(self, key: str) -> None:
+        try:
+            with self._connect() as db:
+                db.execute("DELETE FROM singleflight WHERE key = ? AND owner = ?", (key, self._owner))
+        except sqlite3.Error as e:
+            logger.error(f"Could not release singleflight key {key}: {e}")
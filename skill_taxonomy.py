@@ -0,0 +1,178 @@
+"""
+Skill taxonomy with alias normalization.
+
+A taxonomy file lists canonical skills, each with an id, a display name and
+any number of aliases:
+
+    {"version": 1, "skills": [
+        {"id": "nodejs", "name": "node.js", "aliases": ["node", "nodejs"]}
+    ]}
+
+Every alias and name is compiled into keyword matchers that map back to the
+canonical id, so "Node", "node.js" and "NodeJS" all come out as "node.js".
+The compiled taxonomy is pickled next to the source file and reused as long
+as the source is unchanged, so startup does not rebuild it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+from typing import Dict, Iterable, List, Optional
+
+from keyword_matcher import KeywordMatcher
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Bump when the compiled layout changes so stale pickles are rebuilt
+COMPILED_FORMAT_VERSION = 1
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skill_taxonomy.json")
+SKILL_TAXONOMY_PATH = os.environ.get("SKILL_TAXONOMY_PATH", DEFAULT_TAXONOMY_PATH)
+SKILL_TAXONOMY_CACHE = os.environ.get("SKILL_TAXONOMY_CACHE") or None
+
+# Process-wide taxonomy, loaded on first use
+_taxonomy = None
+
+
+def normalize_alias(alias: str) -> str:
+    """Lowercase an alias and collapse whitespace and surrounding bullets/punctuation."""
+    alias = re.sub(r'\s+', ' ', alias.lower()).strip()
+    return alias.strip('•*-–,;:. ')
+
+
+class SkillTaxonomy:
+    """
+    Compiled skill taxonomy.
+
+    Args:
+        skills (iterable): Dicts with "id", "name" and optional "aliases".
+    """
+
+    def __init__(self, skills: Iterable[Dict]):
+        self.names = {}
+        self.alias_to_id = {}
+        for skill in skills:
+            skill_id = skill["id"]
+            self.names[skill_id] = skill["name"]
+            for alias in [skill["name"]] + list(skill.get("aliases", [])):
+                alias = normalize_alias(alias)
+                if not alias:
+                    continue
+                if alias in self.alias_to_id and self.alias_to_id[alias] != skill_id:
+                    logger.warning(f"Alias '{alias}' maps to both {self.alias_to_id[alias]} and {skill_id}, keeping the first")
+                    continue
+                self.alias_to_id[alias] = skill_id
+
+        # Word-boundary matcher for whole texts, space-delimited matcher for bullet items
+        self.word_matcher = KeywordMatcher(self.alias_to_id)
+        self.space_matcher = KeywordMatcher(self.alias_to_id, boundary="space")
+
+    @classmethod
+    def from_keywords(cls, keywords: Iterable[str]) -> "SkillTaxonomy":
+        """Build a taxonomy where every keyword is its own canonical skill."""
+        return cls({"id": keyword.lower(), "name": keyword} for keyword in keywords)
+
+    def canonical_id(self, skill: str) -> Optional[str]:
+        """Return the canonical id for a skill name or alias, or None if unknown."""
+        return self.alias_to_id.get(normalize_alias(skill))
+
+    def canonical_name(self, skill: str) -> Optional[str]:
+        """Return the canonical display name for a skill name or alias, or None if unknown."""
+        skill_id = self.canonical_id(skill)
+        return self.names[skill_id] if skill_id else None
+
+    def normalize(self, skills: Iterable[str]) -> List[str]:
+        """
+        Map skills to canonical names, keeping unknown skills as given.
+
+        Duplicates (by canonical id, or case-insensitively for unknown skills)
+        are dropped, keeping the first occurrence.
+        """
+        normalized = []
+        seen = set()
+        for skill in skills:
+            if skill.startswith('• '):
+                skill = skill[2:]
+            skill = skill.strip()
+            if not skill:
+                continue
+            skill_id = self.canonical_id(skill)
+            key = skill_id or f"?{skill.lower()}"
+            if key in seen:
+                continue
+            seen.add(key)
+            normalized.append(self.names[skill_id] if skill_id else skill)
+        return normalized
+
+    def find(self, text: str) -> List[str]:
+        """Return canonical names of skills mentioned in lowercased text on word boundaries."""
+        return self._names_for(self.word_matcher.findall(text))
+
+    def find_space_delimited(self, text: str) -> List[str]:
+        """Return canonical names of skills appearing in lowercased text as space-delimited terms."""
+        return self._names_for(self.space_matcher.findall(text))
+
+    def _names_for(self, aliases: Iterable[str]) -> List[str]:
+        ids = dict.fromkeys(self.alias_to_id[alias] for alias in aliases)
+        return [self.names[skill_id] for skill_id in ids]
+
+
+def load_taxonomy(path: str, cache_path: Optional[str] = None) -> SkillTaxonomy:
+    """
+    Load a taxonomy file, reusing its compiled pickle when the source is unchanged.
+
+    Args:
+        path (str): JSON taxonomy file.
+        cache_path (str): Where the compiled taxonomy is stored. Defaults to
+            the source path with a ".pickle" suffix.
+
+    Returns:
+        SkillTaxonomy: The compiled taxonomy.
+    """
+    cache_path = cache_path or path + ".pickle"
+    with open(path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+
+    try:
+        with open(cache_path, 'rb') as f:
+            compiled = pickle.load(f)
+        if compiled.get("format") == COMPILED_FORMAT_VERSION and compiled.get("digest") == digest:
+            return compiled["taxonomy"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable compiled taxonomy {cache_path}: {e}")
+
+    taxonomy = SkillTaxonomy(json.loads(source)["skills"])
+    try:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"format": COMPILED_FORMAT_VERSION, "digest": digest, "taxonomy": taxonomy},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not save compiled taxonomy to {cache_path}: {e}")
+    return taxonomy
+
+
+def get_skill_taxonomy() -> SkillTaxonomy:
+    """
+    Return the shared taxonomy loaded from SKILL_TAXONOMY_PATH.
+
+    If the file cannot be loaded an empty taxonomy is returned, which keeps
+    skills as given apart from de-duplication.
+    """
+    global _taxonomy
+    if _taxonomy is None:
+        try:
+            _taxonomy = load_taxonomy(SKILL_TAXONOMY_PATH, SKILL_TAXONOMY_CACHE)
+        except Exception as e:
+            logger.error(f"Could not load skill taxonomy from {SKILL_TAXONOMY_PATH}: {e}")
+            _taxonomy = SkillTaxonomy([])
+    return _taxonomy
@@ -52,6 +52,12 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // Follow a queued scrape job until its results are ready
+    const jobProgress = document.getElementById('job-progress');
+    if (jobProgress) {
+        followJob(jobProgress);
+    }
+    
     // Add example URL functionality
     const exampleLinks = document.querySelectorAll('.example-link');
     exampleLinks.forEach(link => {
@@ -111,6 +117,125 @@ function showLoading() {
     }
 }
 
+// Render a job's fields as they are streamed, falling back to polling without EventSource
+function followJob(progressElement) {
+    const eventsUrl = progressElement.dataset.eventsUrl;
+    if (!window.EventSource || !eventsUrl) {
+        pollJobStatus(progressElement.dataset.statusUrl);
+        return;
+    }
+    
+    const source = new EventSource(eventsUrl);
+    source.addEventListener('status', event => {
+        setJobStatus(JSON.parse(event.data).status);
+    });
+    source.addEventListener('field', event => {
+        const field = JSON.parse(event.data);
+        renderField(field.name, field.value);
+    });
+    source.addEventListener('token', event => {
+        const token = JSON.parse(event.data);
+        appendFieldTokens(token.field, token.text);
+    });
+    
+    // The results page renders the full details, or redirects back with the error
+    const finish = () => {
+        source.close();
+        window.location.reload();
+    };
+    source.addEventListener('done', finish);
+    source.addEventListener('failed', finish);
+    
+    // The browser reconnects by itself after a dropped stream; only give up on a closed one
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            pollJobStatus(progressElement.dataset.statusUrl);
+        }
+    };
+}
+
+// Update the job status badge
+function setJobStatus(status) {
+    const statusElement = document.getElementById('job-status');
+    if (statusElement) {
+        statusElement.textContent = status;
+    }
+}
+
+// Show an extracted field value in place of its placeholder
+function renderField(name, value) {
+    const item = document.querySelector(`#job-progress [data-field="${name}"]`);
+    if (!item) {
+        return;
+    }
+    
+    const container = item.querySelector('.field-value');
+    container.innerHTML = '';
+    container.classList.remove('text-muted');
+    item.dataset.filled = 'true';
+    
+    if (Array.isArray(value)) {
+        const list = document.createElement('ul');
+        list.className = 'mb-0';
+        value.forEach(entry => {
+            const listItem = document.createElement('li');
+            listItem.textContent = entry;
+            list.appendChild(listItem);
+        });
+        container.appendChild(list);
+    } else {
+        container.textContent = value || '';
+    }
+}
+
+// Show raw model output for a field while it is still being generated
+function appendFieldTokens(name, text) {
+    const item = document.querySelector(`#job-progress [data-field="${name}"]`);
+    if (!item || item.dataset.filled) {
+        return;
+    }
+    
+    const container = item.querySelector('.field-value');
+    let stream = container.querySelector('.field-stream');
+    if (!stream) {
+        container.innerHTML = '';
+        stream = document.createElement('pre');
+        stream.className = 'field-stream small text-muted mb-0';
+        container.appendChild(stream);
+    }
+    stream.textContent += text;
+}
+
+// Poll the job status endpoint and reload once the job has finished
+function pollJobStatus(statusUrl, delay = 1000) {
+    fetch(statusUrl, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json()
+            .catch(() => ({}))
+            .then(job => ({ ok: response.ok, job: job })))
+        .then(({ ok, job }) => {
+            // An unknown job or a server error will not change by asking again
+            if (!ok || !job.status) {
+                setJobStatus('error');
+                showError(job.error || 'Failed to check job status');
+                return;
+            }
+            
+            setJobStatus(job.status);
+            
+            if (job.status === 'done' || job.status === 'failed') {
+                // The results page renders the details, or redirects back with the error
+                window.location.reload();
+                return;
+            }
+            
+            setTimeout(() => pollJobStatus(statusUrl, Math.min(delay * 1.5, 5000)), delay);
+        })
+        .catch(err => {
+            console.error('Failed to check job status: ', err);
+            setTimeout(() => pollJobStatus(statusUrl, Math.min(delay * 2, 10000)), delay);
+        });
+}
+
 // Copy text to clipboard
 async function copyToClipboard(text) {
     if (navigator.clipboard) {
@@ -0,0 +1,265 @@
+"""
+Structured-data extraction of schema.org JobPosting fields.
+
+Many job boards embed the posting as JSON-LD or microdata. JSON-LD blocks
+are found with a regex scan of the raw HTML, so no DOM is built for them;
+microdata needs the parsed tree and is only read when the page mentions a
+JobPosting item type. Whatever fields the posting provides are mapped to
+the job details keys (title, company, location, experience, skills,
+responsibilities, qualifications) so the heuristic and LLM extractors can
+skip them.
+"""
+
+import html
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from lxml import etree
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+JSON_LD_RE = re.compile(
+    r'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+MICRODATA_JOB_RE = re.compile(r'itemtype\s*=\s*["\']?https?://schema\.org/JobPosting', re.IGNORECASE)
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_ITEM_BREAK_RE = re.compile(r'<\s*(?:li|br|p|div|h\d)\b[^>]*>|\n|•', re.IGNORECASE)
+_LIST_SPLIT_RE = re.compile(r'[,;\n•]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Skill entries longer than this are prose rather than a skill name
+MAX_SKILL_LENGTH = 60
+# Same cap on list items as the regex extractors
+MAX_ITEMS = 10
+
+
+def find_json_ld_job(html_content: str) -> Optional[Dict[str, Any]]:
+    """Return the first JobPosting object from the page's JSON-LD blocks, or None."""
+    if not html_content or 'ld+json' not in html_content:
+        return None
+    for match in JSON_LD_RE.finditer(html_content):
+        raw = match.group(1).strip()
+        # Some sites wrap the block in an HTML comment or CDATA section
+        raw = re.sub(r'^(?:<!--|<!\[CDATA\[)|(?:-->|\]\]>)$', '', raw).strip()
+        try:
+            data = json.loads(raw, strict=False)
+        except ValueError:
+            try:
+                data = json.loads(html.unescape(raw), strict=False)
+            except ValueError as e:
+                logger.debug(f"Skipping unparseable JSON-LD block: {e}")
+                continue
+        job = _find_job_posting(data)
+        if job is not None:
+            return job
+    return None
+
+
+def has_microdata_job(html_content: str) -> bool:
+    """Cheap check for a microdata JobPosting item in raw HTML."""
+    return bool(html_content) and bool(MICRODATA_JOB_RE.search(html_content))
+
+
+def find_microdata_job(tree) -> Optional[Dict[str, Any]]:
+    """Return the first microdata JobPosting item in an lxml tree as a JSON-LD-shaped dict, or None."""
+    if tree is None:
+        return None
+    for element in tree.iter(etree.Element):
+        if element.get('itemscope') is not None and 'schema.org/JobPosting' in (element.get('itemtype') or ''):
+            return _microdata_item(element)
+    return None
+
+
+def job_posting_fields(job: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Map a JobPosting object to job details fields.
+
+    Args:
+        job (dict): A schema.org JobPosting, from JSON-LD or microdata.
+
+    Returns:
+        dict: Only the fields the posting actually provides.
+    """
+    if not job:
+        return {}
+    fields = {}
+
+    title = _text(job.get('title') or job.get('name'))
+    if title:
+        fields['title'] = title
+
+    company = _name(job.get('hiringOrganization'))
+    if company:
+        fields['company'] = company
+
+    location = _location(job)
+    if location:
+        fields['location'] = location
+
+    experience = _experience(job.get('experienceRequirements'))
+    if experience:
+        fields['experience'] = experience
+
+    skills = [skill for skill in _list_items(job.get('skills')) if len(skill) <= MAX_SKILL_LENGTH]
+    if skills:
+        fields['skills'] = skills
+
+    responsibilities = _bullets(job.get('responsibilities'))
+    if responsibilities:
+        fields['responsibilities'] = responsibilities
+
+    qualifications = _bullets(_values(job.get('qualifications')) + _values(job.get('educationRequirements')))
+    if qualifications:
+        fields['qualifications'] = qualifications
+
+    return fields
+
+
+def _find_job_posting(data) -> Optional[Dict[str, Any]]:
+    """Search a JSON-LD document (object, list or @graph) for a JobPosting."""
+    if isinstance(data, list):
+        for item in data:
+            job = _find_job_posting(item)
+            if job is not None:
+                return job
+    elif isinstance(data, dict):
+        types = data.get('@type')
+        types = types if isinstance(types, list) else [types]
+        if 'JobPosting' in types:
+            return data
+        if '@graph' in data:
+            return _find_job_posting(data['@graph'])
+    return None
+
+
+def _microdata_item(element) -> Dict[str, Any]:
+    """Collect the itemprops of one microdata item, nesting child items."""
+    item = {'@type': (element.get('itemtype') or '').rsplit('/', 1)[-1]}
+
+    def walk(node):
+        for child in node.iterchildren(etree.Element):
+            names = (child.get('itemprop') or '').split()
+            is_item = child.get('itemscope') is not None
+            if names:
+                value = _microdata_item(child) if is_item else _microdata_value(child)
+                for name in names:
+                    if name in item:
+                        existing = item[name]
+                        item[name] = (existing if isinstance(existing, list) else [existing]) + [value]
+                    else:
+                        item[name] = value
+            if not is_item:
+                walk(child)
+
+    walk(element)
+    return item
+
+
+def _microdata_value(element) -> str:
+    for attribute in ('content', 'datetime', 'href', 'src'):
+        if element.get(attribute) is not None:
+            return element.get(attribute)
+    # Keep the markup of rich values such as responsibilities lists
+    if len(element):
+        return etree.tostring(element, encoding='unicode', method='html', with_tail=False)
+    return element.text_content()
+
+
+def _values(value) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _text(value) -> str:
+    """Plain text of a string or HTML fragment, with entities decoded and whitespace collapsed."""
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('@value') or ''
+    if not isinstance(value, str):
+        return str(value) if isinstance(value, (int, float)) else ''
+    return _WHITESPACE_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', value))).strip()
+
+
+def _name(value) -> str:
+    for item in _values(value):
+        name = _text(item.get('name') if isinstance(item, dict) else item)
+        if name:
+            return name
+    return ''
+
+
+def _location(job: Dict[str, Any]) -> str:
+    places = []
+    for place in _values(job.get('jobLocation')):
+        address = place.get('address', place) if isinstance(place, dict) else place
+        if isinstance(address, dict):
+            parts = [_name(address.get(key)) for key in ('addressLocality', 'addressRegion', 'addressCountry')]
+            parts = [part for index, part in enumerate(parts) if part and part not in parts[:index]]
+            text = ", ".join(parts)
+        else:
+            text = _text(address)
+        if text and text not in places:
+            places.append(text)
+    location = "; ".join(places)
+
+    location_types = [_text(value).upper() for value in _values(job.get('jobLocationType'))]
+    if 'TELECOMMUTE' in location_types:
+        return f"Remote ({location})" if location else "Remote"
+    return location
+
+
+def _experience(value) -> str:
+    for item in _values(value):
+        if isinstance(item, dict):
+            months = item.get('monthsOfExperience')
+            try:
+                months = float(months)
+            except (TypeError, ValueError):
+                months = None
+            if months:
+                years = months / 12
+                years = int(years) if years.is_integer() else round(years, 1)
+                return f"{years}+ years of experience required"
+            text = _text(item.get('description'))
+        else:
+            text = _text(item)
+        if text:
+            return text
+    return ''
+
+
+def _list_items(value) -> List[str]:
+    """Split a list-valued property (list, comma-separated string or DefinedTerm objects) into items."""
+    items = []
+    for item in _values(value):
+        if isinstance(item, dict):
+            text = _text(item)
+            parts = [text] if text else []
+        else:
+            parts = _LIST_SPLIT_RE.split(_text(item))
+        for part in parts:
+            part = part.strip(' .')
+            if part and part not in items:
+                items.append(part)
+    return items
+
+
+def _bullets(value: Iterable) -> List[str]:
+    """Split rich-text properties into "• " items, one per list item, line or paragraph."""
+    items = []
+    for item in _values(value) if not isinstance(value, list) else value:
+        if isinstance(item, dict):
+            item = item.get('description') or item.get('name') or ''
+        if not isinstance(item, str):
+            continue
+        for part in _ITEM_BREAK_RE.split(item):
+            text = _text(part).lstrip('-*• ').strip()
+            if len(text) >= 10 and "• " + text not in items:
+                items.append("• " + text)
+    return items[:MAX_ITEMS]
@@ -0,0 +1,116 @@
+"""
+Checks that a batch run killed mid-stream resumes without duplicating rows.
+
+Run with pytest, or directly: python test_batch_extract.py
+"""
+
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import batch_extract
+
+# The run to be killed is forked so the patched output class applies in it
+fork = multiprocessing.get_context("fork")
+
+with open("test_job_posting.txt") as f:
+    POSTING = f.read()
+
+
+def write_corpus(path, count):
+    with open(path, "w") as f:
+        for n in range(count):
+            html = f"<html><body><h1>Posting {n}</h1>" + "".join(
+                f"<p>{line}</p>" for line in POSTING.splitlines() if line.strip()) + "</body></html>"
+            f.write(json.dumps({"id": f"job-{n}", "url": f"https://example.com/{n}", "html": html}) + "\n")
+
+
+def _killed_run(argv, rows_before_kill):
+    """Run the batch and die abruptly partway through writing a row."""
+    write = batch_extract.JsonlOutput.write
+    written = []
+
+    def write_then_die(self, row):
+        if len(written) == rows_before_kill:
+            self._file.write(json.dumps(row)[:20])
+            self._file.flush()
+            # Take the pool's workers down too, as killing the process group would
+            for child in multiprocessing.active_children():
+                child.kill()
+            os._exit(1)
+        written.append(row)
+        write(self, row)
+
+    batch_extract.JsonlOutput.write = write_then_die
+    batch_extract.main(argv)
+
+
+def last_commit(checkpoint_path):
+    with open(checkpoint_path) as f:
+        commits = [line for line in f if line.startswith(batch_extract.Checkpoint.COMMIT)]
+    return int(commits[-1][len(batch_extract.Checkpoint.COMMIT):])
+
+
+def output_ids(path):
+    with open(path) as f:
+        return [json.loads(line)["id"] for line in f]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    corpus = str(tmp_path / "corpus.jsonl")
+    write_corpus(corpus, 20)
+    output = str(tmp_path / "results.jsonl")
+    return corpus, output, output + ".checkpoint"
+
+
+def test_resume_after_kill_writes_each_id_once(paths):
+    corpus, output, checkpoint_path = paths
+    argv = [corpus, "-o", output, "-j", "1", "--checkpoint-every", "3"]
+
+    run = fork.Process(target=_killed_run, args=(argv, 8))
+    run.start()
+    run.join()
+    assert run.exitcode == 1
+
+    # Rows 7 and 8 and part of a ninth were written after the last commit, at 6 rows
+    position = last_commit(checkpoint_path)
+    with open(output, "rb") as f:
+        before = f.read()
+    assert before.count(b"\n") == 8
+    assert before[:position].count(b"\n") == 6
+    assert not before.endswith(b"\n")
+
+    # Opening the output for the resume cuts it back to the commit position
+    checkpoint = batch_extract.Checkpoint(checkpoint_path)
+    checkpoint.close()
+    batch_extract.JsonlOutput(output, checkpoint.position).close()
+    with open(output, "rb") as f:
+        assert f.read() == before[:position]
+
+    assert batch_extract.main(argv) == 0
+    ids = output_ids(output)
+    assert len(ids) == len(set(ids)) == 20
+    assert sorted(ids) == sorted(f"job-{n}" for n in range(20))
+    with open(output, "rb") as f:
+        assert f.read()[:position] == before[:position]
+
+
+def test_existing_output_without_checkpoint_needs_restart(paths):
+    corpus, output, checkpoint_path = paths
+    argv = [corpus, "-o", output, "-j", "1"]
+    assert batch_extract.main(argv) == 0
+    os.remove(checkpoint_path)
+
+    assert batch_extract.main(argv) == 2
+    assert len(output_ids(output)) == 20
+    assert not os.path.exists(checkpoint_path)
+
+    assert batch_extract.main(argv + ["--restart"]) == 0
+    assert len(output_ids(output)) == 20
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,119 @@
+"""
+Checks that HTMLBodyReader strips <script>/<style> content the same way
+however the body is split into chunks.
+
+Run with pytest, or directly: python test_html_stream.py
+"""
+
+import random
+
+import pytest
+
+from html_stream import DownloadRejected, HTMLBodyReader
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><title>Data Engineer</title>
+<STYLE type="text/css">body { color: red; } /* </styl */</STYLE>
+<script>var a = "<b>not markup</b>"; if (a < 2) {}</script>
+<script type="application/ld+json">{"@type": "JobPosting", "title": "Data Engineer"}</script>
+<script src="/app.js"/>
+<Script
+  async>window.track("</scrip");</SCRIPT >
+</head><body>
+<scripts>kept, not a script tag</scripts>
+<p>Build pipelines in Python &lt;script&gt; and SQL.</p>
+<style>p { margin: 0 }</style><p>Apply today.</p>
+</body></html>
+"""
+
+EXPECTED = b"""<!DOCTYPE html>
+<html><head><title>Data Engineer</title>
+<STYLE type="text/css"></STYLE>
+<script></script>
+<script type="application/ld+json">{"@type": "JobPosting", "title": "Data Engineer"}</script>
+<script src="/app.js"/>
+<Script
+  async></SCRIPT >
+</head><body>
+<scripts>kept, not a script tag</scripts>
+<p>Build pipelines in Python &lt;script&gt; and SQL.</p>
+<style></style><p>Apply today.</p>
+</body></html>
+"""
+
+
+def read(body, sizes, strip_scripts=True):
+    reader = HTMLBodyReader(max_bytes=1 << 20, max_download_bytes=1 << 20, strip_scripts=strip_scripts)
+    pos = 0
+    for size in sizes:
+        reader.feed(body[pos:pos + size])
+        pos += size
+    reader.feed(body[pos:])
+    return reader.finish()
+
+
+def random_sizes(rng, length):
+    sizes = []
+    while sum(sizes) < length:
+        sizes.append(rng.choice([0, 1, 1, 2, 3, 5, 8, 13, 40]))
+    return sizes
+
+
+def test_one_shot_strip():
+    assert read(PAGE, []) == EXPECTED
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_chunking_matches_one_shot(seed):
+    rng = random.Random(seed)
+    assert read(PAGE, random_sizes(rng, len(PAGE))) == read(PAGE, [])
+
+
+def test_every_single_split_point():
+    one_shot = read(PAGE, [])
+    for split in range(len(PAGE)):
+        assert read(PAGE, [split]) == one_shot, split
+
+
+def test_byte_at_a_time():
+    assert read(PAGE, [1] * len(PAGE)) == EXPECTED
+
+
+def test_unterminated_script_is_dropped():
+    body = b"<p>Title</p><script>var x = 1; </scr"
+    assert read(body, []) == b"<p>Title</p><script>"
+    assert read(body, [1] * len(body)) == b"<p>Title</p><script>"
+
+
+def test_unterminated_json_ld_is_kept():
+    body = b'<script type="application/ld+json">{"title": "Data'
+    assert read(body, [3] * len(body)) == body
+
+
+def test_without_stripping_the_body_is_unchanged():
+    rng = random.Random(0)
+    assert read(PAGE, random_sizes(rng, len(PAGE)), strip_scripts=False) == PAGE
+
+
+def test_size_limits():
+    # The download limit counts bytes read, before stripping
+    reader = HTMLBodyReader(max_bytes=450, max_download_bytes=450, strip_scripts=True)
+    with pytest.raises(DownloadRejected):
+        for start in range(0, len(PAGE), 64):
+            reader.feed(PAGE[start:start + 64])
+    # The kept body fits once stripped
+    assert read(PAGE, []) == EXPECTED and len(EXPECTED) < 450
+
+    reader = HTMLBodyReader(max_bytes=100, max_download_bytes=10_000)
+    with pytest.raises(DownloadRejected):
+        reader.feed(PAGE)
+
+    with pytest.raises(DownloadRejected):
+        HTMLBodyReader(1000, 1000).check_headers({"Content-Type": "application/pdf"})
+    with pytest.raises(DownloadRejected):
+        HTMLBodyReader(1000, 1000).check_headers({"Content-Type": "text/html", "Content-Length": "5000"})
+    HTMLBodyReader(1000, 1000).check_headers({"Content-Type": "text/html; charset=utf-8"})
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, "-q"]))
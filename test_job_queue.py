@@ -0,0 +1,166 @@
+"""
+Checks the SQLite job queue with two queue instances sharing one database,
+as two web worker processes would.
+
+Run with pytest, or directly: python test_job_queue.py
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def final_events(queue, job_id):
+    return [event for _, event, _ in queue.events(job_id) if event in ("done", "failed")]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+@pytest.fixture
+def queues():
+    started = []
+
+    def make(db_path, handler, **kwargs):
+        kwargs.setdefault("poll_interval", 0.05)
+        queue = JobQueue(db_path, handler, **kwargs)
+        started.append(queue)
+        return queue
+
+    yield make
+    for queue in started:
+        queue.stop(timeout=5)
+
+
+def test_each_job_runs_once_across_instances(db_path, queues):
+    runs = []
+    lock = threading.Lock()
+
+    def handler(payload, emit):
+        with lock:
+            runs.append(payload["n"])
+        time.sleep(0.01)
+        return {"n": payload["n"]}
+
+    first = queues(db_path, handler, workers=3)
+    second = queues(db_path, handler, workers=3)
+    job_ids = [(first if n % 2 else second).submit({"n": n}) for n in range(40)]
+
+    assert wait_for(lambda: all(first.get(job_id)["status"] == DONE for job_id in job_ids))
+    assert sorted(runs) == list(range(40))
+    for n, job_id in enumerate(job_ids):
+        assert second.get(job_id)["result"] == {"n": n}
+        assert final_events(first, job_id) == ["done"]
+
+
+def test_dedupe_key_returns_in_flight_job(db_path, queues):
+    release = threading.Event()
+    queue = queues(db_path, lambda payload, emit: release.wait(10) and payload, workers=1)
+    other = queues(db_path, lambda payload, emit: payload, workers=1)
+
+    job_id = queue.submit({"url": "a"}, dedupe_key="a")
+    assert wait_for(lambda: queue.get(job_id)["status"] == RUNNING)
+    assert other.submit({"url": "a"}, dedupe_key="a") == job_id
+    assert queue.submit({"url": "b"}, dedupe_key="b") != job_id
+
+    release.set()
+    assert wait_for(lambda: queue.get(job_id)["status"] == DONE)
+    # Once the first job is finished, the same key starts a new job
+    assert other.submit({"url": "a"}, dedupe_key="a") != job_id
+
+
+def abandon(db_path, job_id, attempts, age):
+    """Make a job look like it was left running by a crashed worker."""
+    with sqlite3.connect(db_path) as db:
+        db.execute("UPDATE jobs SET status = ?, started_at = ?, attempts = ? WHERE id = ?",
+                   (RUNNING, time.time() - age, attempts, job_id))
+
+
+def insert_job(db_path, payload):
+    with sqlite3.connect(db_path) as db:
+        db.execute("INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)",
+                   ("job-1", QUEUED, json.dumps(payload), time.time()))
+    return "job-1"
+
+
+def test_expired_lease_is_taken_over(db_path, queues):
+    JobQueue(db_path, None)
+    job_id = insert_job(db_path, {"n": 1})
+    abandon(db_path, job_id, attempts=1, age=120)
+
+    queue = queues(db_path, lambda payload, emit: payload, workers=1, lease=60)
+    queue.start()
+    assert wait_for(lambda: queue.get(job_id)["status"] == DONE)
+    assert queue.get(job_id)["result"] == {"n": 1}
+
+
+def test_max_attempts_fails_abandoned_job(db_path, queues):
+    JobQueue(db_path, None)
+    job_id = insert_job(db_path, {"n": 1})
+    abandon(db_path, job_id, attempts=3, age=120)
+
+    runs = []
+    queue = queues(db_path, lambda payload, emit: runs.append(payload), workers=1, lease=60, max_attempts=3)
+    queue.start()
+    assert wait_for(lambda: queue.get(job_id)["status"] == FAILED)
+    assert queue.get(job_id)["error"] == "Job was interrupted too many times"
+    assert runs == []
+
+
+def test_running_job_keeps_its_lease(db_path, queues):
+    runs = []
+
+    def slow(payload, emit):
+        runs.append(payload)
+        time.sleep(1.5)
+        return payload
+
+    # The job outlives its 0.3s lease several times over; the heartbeat keeps the other queue off it
+    first = queues(db_path, slow, workers=1, lease=0.3)
+    job_id = first.submit({"n": 1})
+    assert wait_for(lambda: first.get(job_id)["status"] == RUNNING)
+    second = queues(db_path, slow, workers=2, lease=0.3)
+    second.start()
+
+    assert wait_for(lambda: first.get(job_id)["status"] == DONE)
+    assert len(runs) == 1
+    assert final_events(first, job_id) == ["done"]
+
+
+def test_stale_run_does_not_overwrite_the_verdict(db_path, queues):
+    release = threading.Event()
+    queue = queues(db_path, lambda payload, emit: release.wait(10) and {"stale": True}, workers=1, lease=60)
+    job_id = queue.submit({"n": 1})
+    assert wait_for(lambda: queue.get(job_id)["status"] == RUNNING)
+
+    # Another worker took the job over and it was failed in the meantime
+    with sqlite3.connect(db_path) as db:
+        db.execute("UPDATE jobs SET status = ?, error = ?, attempts = attempts + 1 WHERE id = ?",
+                   (FAILED, "Job was interrupted too many times", job_id))
+    release.set()
+    time.sleep(0.5)
+
+    job = queue.get(job_id)
+    assert job["status"] == FAILED
+    assert job["result"] is None
+    assert final_events(queue, job_id) == []
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,90 @@
+"""
+Checks that the near-duplicate index only hands model output to reposts.
+
+Run with pytest, or directly: python test_near_duplicates.py
+"""
+
+import json
+
+import llm_extractor
+import text_processor
+from llm_cache import LLMCache
+from near_duplicates import NearDuplicateIndex
+from ollama_pool import OllamaHost, OllamaPool
+
+with open("test_job_posting.txt") as f:
+    POSTING = f.read()
+
+
+def to_html(text):
+    return "<html><body>" + "".join(f"<p>{line}</p>" for line in text.splitlines() if line.strip()) + "</body></html>"
+
+
+def fake_reply(schema):
+    """A well-formed reply for the requested schema."""
+    def value(field_schema):
+        if field_schema["type"] == "array":
+            return ["Model answer"]
+        return field_schema.get("enum", ["Model answer"])[0]
+    if schema["type"] == "object":
+        return json.dumps({field: value(field_schema) for field, field_schema in schema["properties"].items()})
+    return json.dumps(value(schema))
+
+
+class FakeClient:
+    def __init__(self):
+        self.fail = False
+        self.calls = 0
+
+    def chat(self, model, messages, stream=False, format=None, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("model server went away")
+        return {"message": {"content": fake_reply(format)}}
+
+
+def setup(monkeypatch):
+    host = OllamaHost(None, llm_extractor.LLM_MODEL, failure_threshold=1000)
+    host.breaker.probe = lambda: True
+    host.client = FakeClient()
+    monkeypatch.setattr(llm_extractor, "ollama_pool", OllamaPool([host]))
+    monkeypatch.setattr(llm_extractor, "llm_cache", LLMCache())
+    index = NearDuplicateIndex(threshold=0.9)
+    monkeypatch.setattr(text_processor, "near_duplicate_index", index)
+    return host.client, index
+
+
+def test_fallback_values_are_not_reused(monkeypatch):
+    client, index = setup(monkeypatch)
+
+    client.fail = True
+    first = text_processor.extract_job_details(to_html(POSTING), "https://example.com/1")
+    assert client.calls > 0
+    assert index.stats()["entries"] == 0
+
+    # A repost with a small edit must go back to the model, not reuse the fallback values
+    client.fail = False
+    client.calls = 0
+    edited = POSTING.replace("experienced", "seasoned", 1) + "\nApply today."
+    repost = text_processor.extract_job_details(to_html(edited), "https://example.com/2")
+    assert client.calls > 0
+    assert index.stats()["hits"] == 0
+    assert repost["responsibilities"] == ["Model answer"]
+    assert repost["responsibilities"] != first["responsibilities"]
+
+
+def test_model_values_are_reused(monkeypatch):
+    client, index = setup(monkeypatch)
+
+    original = text_processor.extract_job_details(to_html(POSTING), "https://example.com/1")
+    assert index.stats()["entries"] == 1
+
+    client.calls = 0
+    repost = text_processor.extract_job_details(to_html(POSTING + "\nApply today."), "https://example.com/2")
+    assert client.calls == 0
+    assert repost["responsibilities"] == original["responsibilities"] == ["Model answer"]
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,249 @@
+"""
+Checks the Ollama host pool against local stub servers that mimic the Ollama API.
+
+Each stub serves /api/tags (the health probe) and /api/chat, and can be told
+to answer slowly, hang, fail with a 500 or break off a streamed reply.
+
+Run with pytest, or directly: python test_ollama_pool.py
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_extractor
+from ollama_pool import OllamaHost, OllamaPool
+
+MODEL = "llama3.2:latest"
+REPLY = '["Python", "SQL"]'
+
+
+class StubOllama:
+    """
+    A minimal Ollama server on a free local port.
+
+    Args:
+        model (str): The model it reports and accepts.
+        mode (str): "ok", "fail" (500 on chat), "hang" (never answers in time)
+            or "partial" (streams one piece, then an error).
+        delay (float): Seconds each chat request takes.
+    """
+
+    def __init__(self, model=MODEL, mode="ok", delay=0.0):
+        self.model = model
+        self.mode = mode
+        self.delay = delay
+        self.chats = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._send(200, {"models": [{"name": stub.model, "model": stub.model}]})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with stub._lock:
+                    stub.chats += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(stub.delay)
+                    if stub.mode == "hang":
+                        time.sleep(5)
+                    if stub.mode == "fail" or request.get("model") != stub.model:
+                        self._send(500, {"error": "stub failure"})
+                    elif request.get("stream"):
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/x-ndjson")
+                        self.end_headers()
+                        self._line(stub._part(REPLY[:5], False))
+                        if stub.mode == "partial":
+                            self._line({"error": "stub broke off the stream"})
+                        else:
+                            self._line(stub._part(REPLY[5:], True))
+                    else:
+                        self._send(200, stub._part(REPLY, True))
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _line(self, body):
+                self.wfile.write((json.dumps(body) + "\n").encode())
+                self.wfile.flush()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _part(self, content, done):
+        return {"model": self.model, "created_at": "2024-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": content}, "done": done}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    started = []
+
+    def start(**kwargs):
+        stub = StubOllama(**kwargs)
+        started.append(stub)
+        return stub
+
+    yield start
+    for stub in started:
+        stub.close()
+
+
+def make_host(stub, max_concurrency=4, timeout=10, failure_threshold=3):
+    return OllamaHost(stub.url, stub.model, max_concurrency=max_concurrency, timeout=timeout,
+                      probe_timeout=2, failure_threshold=failure_threshold, cooldown=60)
+
+
+def chat(host):
+    return host.client.chat(model=host.model, messages=[{"role": "user", "content": "hi"}])["message"]["content"]
+
+
+def run_concurrently(function, count):
+    results = [None] * count
+
+    def worker(index):
+        results[index] = function()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_per_host_concurrency_cap(stubs):
+    first, second = stubs(delay=0.2), stubs(model="qwen2.5:7b", delay=0.2)
+    pool = OllamaPool([make_host(first, max_concurrency=1), make_host(second, max_concurrency=2)])
+
+    results = run_concurrently(lambda: pool.call(chat), 9)
+
+    assert results == [REPLY] * 9
+    assert first.max_active == 1
+    assert second.max_active == 2
+    # Each host ran the model configured for it, or the stub would have answered 500
+    assert first.chats + second.chats == 9
+    assert pool.stats()["failovers"] == 0
+
+
+def test_least_outstanding_selection(stubs):
+    pool = OllamaPool([make_host(stubs(), max_concurrency=2), make_host(stubs(), max_concurrency=2)])
+    first, second = pool.hosts
+    release = threading.Event()
+    chosen = []
+
+    def hold(host):
+        chosen.append(host)
+        release.wait()
+
+    # Ties go to the first host; after that each request goes to the host with fewer in flight
+    holders = [threading.Thread(target=pool.call, args=(hold,)) for _ in range(3)]
+    for thread in holders:
+        thread.start()
+        while len(chosen) < holders.index(thread) + 1:
+            time.sleep(0.01)
+    assert chosen == [first, second, first]
+    assert (first.outstanding, second.outstanding) == (2, 1)
+
+    assert pool.call(lambda host: host) is second
+    release.set()
+    for thread in holders:
+        thread.join()
+    assert (first.outstanding, second.outstanding) == (0, 0)
+
+
+def test_failover_and_breaker_trip_on_errors(stubs):
+    failing, healthy = stubs(mode="fail"), stubs()
+    pool = OllamaPool([make_host(failing, failure_threshold=3), make_host(healthy)])
+    bad_host = pool.hosts[0]
+
+    for _ in range(3):
+        assert pool.call(chat) == REPLY
+    assert failing.chats == 3
+    assert bad_host.failures == 3
+    assert pool.stats()["failovers"] == 3
+    # record_failure took the host out after failure_threshold failures in a row
+    assert bad_host.breaker.available is False
+
+    for _ in range(3):
+        assert pool.call(chat) == REPLY
+    assert failing.chats == 3
+    assert healthy.chats == 6
+
+
+def test_failover_on_timeout(stubs):
+    hanging, healthy = stubs(mode="hang"), stubs()
+    pool = OllamaPool([make_host(hanging, timeout=0.5, failure_threshold=1), make_host(healthy)])
+
+    started = time.monotonic()
+    assert pool.call(chat) == REPLY
+    assert time.monotonic() - started < 3
+    assert hanging.chats == 1
+    assert pool.hosts[0].breaker.available is False
+
+    assert pool.call(chat) == REPLY
+    assert hanging.chats == 1
+
+
+def test_no_failover_after_streamed_tokens(stubs, monkeypatch):
+    broken, healthy = stubs(mode="partial"), stubs()
+    monkeypatch.setattr(llm_extractor, "ollama_pool", OllamaPool([make_host(broken), make_host(healthy)]))
+    pieces = []
+
+    # Part of the reply already reached the caller, so retrying elsewhere would repeat it
+    with pytest.raises(Exception):
+        llm_extractor._chat("system", "user", on_token=pieces.append)
+    assert pieces == [REPLY[:5]]
+    assert broken.chats == 1
+    assert healthy.chats == 0
+
+
+def test_stream_fails_over_before_first_token(stubs, monkeypatch):
+    failing, healthy = stubs(mode="fail"), stubs()
+    monkeypatch.setattr(llm_extractor, "ollama_pool", OllamaPool([make_host(failing), make_host(healthy)]))
+    pieces = []
+
+    assert llm_extractor._chat("system", "user", on_token=pieces.append) == REPLY
+    assert "".join(pieces) == REPLY
+    assert (failing.chats, healthy.chats) == (1, 1)
+
+
+def test_unavailable_when_every_host_is_down(stubs):
+    pool = OllamaPool([make_host(stubs(mode="fail"), failure_threshold=1),
+                       make_host(stubs(mode="fail"), failure_threshold=1)])
+
+    with pytest.raises(Exception):
+        pool.call(chat)
+    assert not pool.is_available()
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, "-q"]))
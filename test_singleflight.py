@@ -0,0 +1,191 @@
+"""
+Checks request coalescing within a process (threads) and across processes
+sharing a SQLite file.
+
+Run with pytest, or directly: python test_singleflight.py
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+# Worker processes are forked so they see this module's functions
+fork = multiprocessing.get_context("fork")
+
+
+def run_in_threads(function, count):
+    results = [None] * count
+    errors = [None] * count
+    start = threading.Barrier(count)
+
+    def worker(index):
+        start.wait()
+        try:
+            results[index] = function()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.3)
+        return {"value": 42}
+
+    results, errors = run_in_threads(lambda: flight.do("key", work), 8)
+
+    assert calls == [1]
+    assert errors == [None] * 8
+    assert all(value == {"value": 42} for value, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flight.stats() == {"executed": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        key = threading.current_thread().name
+        calls.append(key)
+        time.sleep(0.2)
+        return key
+
+    results, _ = run_in_threads(lambda: flight.do(threading.current_thread().name, work), 4)
+    assert len(set(calls)) == 4
+    assert all(not shared for _, shared in results)
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    _, errors = run_in_threads(lambda: flight.do("key", fail), 5)
+
+    assert calls == [1]
+    assert all(isinstance(error, ValueError) and str(error) == "boom" for error in errors)
+    # The failed call is not remembered; the next caller runs again
+    assert flight.do("key", lambda: "ok") == ("ok", False)
+
+
+def _child_do(db_path, key, runs_path, sleep, fail, queue):
+    flight = SingleFlight(db_path=db_path, lease=30, poll_interval=0.05)
+
+    def work():
+        with open(runs_path, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(sleep)
+        if fail:
+            raise RuntimeError("child failed")
+        return {"pid": os.getpid()}
+
+    try:
+        queue.put(flight.do(key, work))
+    except RuntimeError as e:
+        queue.put(("error", str(e)))
+
+
+def _child_hold(db_path, key, lease):
+    """Take the key's lease and hang, to be killed mid-call."""
+    SingleFlight(db_path=db_path, lease=lease).do(key, lambda: time.sleep(60))
+
+
+def runs(runs_path):
+    if not os.path.exists(runs_path):
+        return []
+    with open(runs_path) as f:
+        return f.read().split()
+
+
+def lease_taken(db_path, key):
+    try:
+        with sqlite3.connect(db_path) as db:
+            return db.execute("SELECT 1 FROM singleflight WHERE key = ?", (key,)).fetchone() is not None
+    except sqlite3.Error:
+        return False
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_processes_share_one_run(tmp_path):
+    db_path = str(tmp_path / "flight.db")
+    runs_path = str(tmp_path / "runs")
+    SingleFlight(db_path=db_path)
+    queue = fork.Queue()
+
+    children = [fork.Process(target=_child_do, args=(db_path, "key", runs_path, 0.5, False, queue))
+                for _ in range(4)]
+    for child in children:
+        child.start()
+    results = [queue.get(timeout=20) for _ in children]
+    for child in children:
+        child.join()
+
+    assert len(runs(runs_path)) == 1
+    leader = int(runs(runs_path)[0])
+    assert all(value == {"pid": leader} for value, _ in results)
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+
+
+def test_expired_lease_of_dead_process_is_taken_over(tmp_path):
+    db_path = str(tmp_path / "flight.db")
+    SingleFlight(db_path=db_path)
+
+    holder = fork.Process(target=_child_hold, args=(db_path, "key", 0.5))
+    holder.start()
+    assert wait_for(lambda: lease_taken(db_path, "key"))
+    holder.kill()
+    holder.join()
+
+    flight = SingleFlight(db_path=db_path, poll_interval=0.05)
+    started = time.monotonic()
+    assert flight.do("key", lambda: "mine") == ("mine", False)
+    assert time.monotonic() - started < 5
+
+
+def test_waiting_process_runs_the_call_when_the_leader_fails(tmp_path):
+    db_path = str(tmp_path / "flight.db")
+    runs_path = str(tmp_path / "runs")
+    SingleFlight(db_path=db_path)
+    queue = fork.Queue()
+
+    leader = fork.Process(target=_child_do, args=(db_path, "key", runs_path, 0.5, True, queue))
+    leader.start()
+    assert wait_for(lambda: len(runs(runs_path)) == 1)
+
+    flight = SingleFlight(db_path=db_path, poll_interval=0.05)
+    assert flight.do("key", lambda: "retried") == ("retried", False)
+    assert queue.get(timeout=10) == ("error", "child failed")
+    leader.join()
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,106 @@
+"""
+Token-budgeted chunking of job posting text for LLM extraction.
+
+Instead of cutting the posting at a fixed character count, the text is split
+into typed sections by the section segmenter, only the sections relevant to
+an extraction type are kept, and they are packed, on paragraph boundaries,
+into chunks that fit a token budget.
+"""
+
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from section_segmenter import SegmentedPosting, segment
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used to estimate prompt size
+CHARS_PER_TOKEN = 4
+
+# Section types (see section_segmenter) relevant to each extraction type.
+# Types without sections (role_type) use the whole posting.
+SECTION_KINDS = {
+    "responsibilities": ("responsibilities", "description"),
+    "qualifications": ("qualifications", "skills"),
+    "skills": ("skills", "qualifications"),
+    "experience": ("qualifications", "description"),
+    "role_type": (),
+}
+
+# Sections relevant to any field, used when all fields are requested together
+SECTION_KINDS["combined"] = tuple(sorted({kind for kinds in SECTION_KINDS.values() for kind in kinds}))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def select_sections(posting: SegmentedPosting, extraction_type: str) -> List[Tuple[str, List[str]]]:
+    """Keep the (heading, lines) of sections relevant to the extraction type, or all of them if none are."""
+    relevant = posting.of(*SECTION_KINDS.get(extraction_type, ()))
+    return [(section.heading, section.lines) for section in relevant] or posting.split()
+
+
+def _pieces(heading: str, paragraphs: List[str], max_chars: int) -> Iterable[str]:
+    """Yield a section as pieces no longer than max_chars, split on paragraph boundaries."""
+    section = "\n".join([heading] + paragraphs) if heading else "\n".join(paragraphs)
+    if len(section) <= max_chars:
+        yield section
+        return
+    if heading:
+        yield heading[:max_chars]
+    for paragraph in paragraphs:
+        # Last resort for a single paragraph that exceeds the budget on its own
+        for start in range(0, len(paragraph), max_chars):
+            yield paragraph[start:start + max_chars]
+
+
+def chunk_text(text: str, extraction_type: str, token_budget: int,
+               max_chunks: Optional[int] = None) -> List[str]:
+    """
+    Split job text into chunks relevant to one extraction type.
+
+    Args:
+        text (str): Plain text of the job posting.
+        extraction_type (str): Field being extracted, or "combined" for all fields.
+        token_budget (int): Maximum estimated tokens per chunk.
+        max_chunks (int): Optional cap on the number of chunks returned.
+
+    Returns:
+        list: Chunks in document order, each within the token budget.
+    """
+    max_chars = max(token_budget * CHARS_PER_TOKEN, 1)
+    sections = select_sections(segment(text), extraction_type)
+
+    chunks = []
+    current = ""
+    for heading, paragraphs in sections:
+        for piece in _pieces(heading, paragraphs, max_chars):
+            if current and len(current) + 2 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+
+    if max_chunks and len(chunks) > max_chunks:
+        logger.warning(f"Posting needs {len(chunks)} chunks for {extraction_type}, keeping the first {max_chunks}")
+        chunks = chunks[:max_chunks]
+    return chunks
+
+
+def merge_results(results: Iterable[List[str]]) -> List[str]:
+    """Merge per-chunk result lists, dropping case-insensitive duplicates while keeping order."""
+    merged = []
+    seen = set()
+    for items in results:
+        for item in items:
+            key = item.strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
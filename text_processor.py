@@ -1,19 +1,52 @@
+import os
 import re
 import logging
-from bs4 import BeautifulSoup
-import trafilatura
+import threading
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from html_document import JobPage
+from keyword_matcher import KeywordMatcher
+from skill_taxonomy import SkillTaxonomy, get_skill_taxonomy
+from near_duplicates import NearDuplicateIndex
+from section_segmenter import segment
+from structured_data import find_json_ld_job, find_microdata_job, has_microdata_job, job_posting_fields
 # Import LLM extractor
-from llm_extractor import extract_with_llm, check_ollama_available
+from llm_extractor import (extract_with_llm, extract_all_with_llm, is_ollama_available, LLM_FIELDS, LLM_CONCURRENCY,
+                           LLM_MODEL_TAG, PROMPT_VERSION)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Check if Ollama is available - will determine whether to use LLM or regex
-OLLAMA_AVAILABLE = check_ollama_available()
+# How LLM fields are requested: "combined" asks for every field in one call,
+# "concurrent" makes one call per field in parallel, "sequential" one call per field in turn
+LLM_EXTRACTION_MODE = os.environ.get("LLM_EXTRACTION_MODE", "combined")
 
-# Define skill-related keywords
+# When set, take title and company from trafilatura metadata and skip our own DOM
+# parse entirely if both are present
+HTML_FAST_PATH = os.environ.get("HTML_FAST_PATH", "").lower() in ("1", "true", "yes")
+
+# LLM fields whose model output can be relayed token by token while it streams
+STREAMED_FIELDS = ("skills", "responsibilities", "qualifications")
+
+# Reposts of a posting (SimHash similarity at or above the threshold) reuse its LLM-extracted fields.
+# NEAR_DUP_INDEX_SIZE=0 disables the index; NEAR_DUP_INDEX_PATH keeps it across restarts
+near_duplicate_index = NearDuplicateIndex(
+    threshold=float(os.environ.get("NEAR_DUP_THRESHOLD", "0.95")),
+    max_entries=int(os.environ.get("NEAR_DUP_INDEX_SIZE", "10000")),
+    db_path=os.environ.get("NEAR_DUP_INDEX_PATH") or None,
+    version=f"{LLM_MODEL_TAG}:{PROMPT_VERSION}",
+)
+
+# Cleared while extracting heuristics only, so the extractors skip their LLM calls
+_llm_allowed = ContextVar("llm_allowed", default=True)
+
+# Shared worker pool for concurrent field extraction, created on first use
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+# Define skill-related keywords, used when no taxonomy file is available
 SKILL_KEYWORDS = [
     "python", "javascript", "java", "c++", "c#", "ruby", "php", "sql", "nosql", 
     "mongodb", "postgresql", "mysql", "oracle", "aws", "azure", "gcp", "docker", 
@@ -58,67 +91,302 @@ ROLE_TYPE_KEYWORDS = {
     ]
 }
 
-def extract_job_details(html_content, url):
+# Skill taxonomy mapping every alias to a canonical skill. Its matchers work on
+# word boundaries over the whole text and on space boundaries within bullet items.
+SKILL_TAXONOMY = get_skill_taxonomy()
+if not SKILL_TAXONOMY.names:
+    SKILL_TAXONOMY = SkillTaxonomy.from_keywords(SKILL_KEYWORDS)
+
+# Keyword matchers compiled once at import
+ROLE_TYPE_MATCHERS = {role: KeywordMatcher(keywords) for role, keywords in ROLE_TYPE_KEYWORDS.items()}
+
+# Precompiled regex registry. Every pattern used by the extractors is compiled once
+# here rather than passed to re as a raw string (or built with an f-string) per call.
+TITLE_TEXT_RE = re.compile(r"(?:job title|position)(?:\s*:\s*|\s+is\s+)(.*?)(?:\.|,|\n)", re.IGNORECASE)
+COMPANY_TEXT_RE = re.compile(r"(?:company|organization)(?:\s*:\s*|\s+is\s+)(.*?)(?:\.|,|\n)", re.IGNORECASE)
+
+POTENTIAL_SKILL_RE = re.compile(r'\b([A-Z][a-zA-Z0-9]*(?:\s[A-Z][a-zA-Z0-9]*)*|[A-Za-z0-9]+\+\+|[A-Za-z0-9]+\#|[a-z][a-zA-Z0-9]+(?:\.js|\.NET))\b')
+SKILL_PHRASE_REGEXES = [
+    re.compile(r'experience (?:with|in|using) ([^,.;]+)'),
+    re.compile(r'knowledge of ([^,.;]+)'),
+    re.compile(r'proficiency in ([^,.;]+)'),
+    re.compile(r'familiarity with ([^,.;]+)'),
+    re.compile(r'expertise in ([^,.;]+)'),
+    re.compile(r'understanding of ([^,.;]+)'),
+    re.compile(r'skilled in ([^,.;]+)'),
+    re.compile(r'proficient in ([^,.;]+)')
+]
+SKILL_LIST_SPLIT_RE = re.compile(r'\s+and\s+|,\s*')
+
+EXPERIENCE_REGEXES = [re.compile(pattern, re.IGNORECASE) for pattern in EXPERIENCE_PATTERNS]
+ENTRY_LEVEL_RE = re.compile(r'\bentry[\s-]level\b', re.IGNORECASE)
+JUNIOR_RE = re.compile(r'\bjunior\b', re.IGNORECASE)
+SENIOR_RE = re.compile(r'\bsenior\b', re.IGNORECASE)
+EXPERIENCED_RE = re.compile(r'\bexperienced\b', re.IGNORECASE)
+
+LOCATION_REGEXES = [re.compile(pattern, re.IGNORECASE) for pattern in LOCATION_PATTERNS]
+REMOTE_RE = re.compile(r'\bremote\b', re.IGNORECASE)
+HYBRID_RE = re.compile(r'\bhybrid\b', re.IGNORECASE)
+ON_SITE_RE = re.compile(r'\bon[\s-]site\b', re.IGNORECASE)
+IN_OFFICE_RE = re.compile(r'\bin[\s-]office\b', re.IGNORECASE)
+
+MANAGES_TEAM_RE = re.compile(r'\b(?:manage|lead|supervise)(?:s|ing)?\s+(?:a\s+)?team\b')
+WORKS_INDEPENDENTLY_RE = re.compile(r'\b(?:work(?:s|ing)?\s+independently|individual\s+contributor)\b')
+
+DESCRIPTION_START_REGEXES = [
+    re.compile(r'job description(?:\s*:|\s+)(.*)', re.IGNORECASE),
+    re.compile(r'about the (?:job|role|position)(?:\s*:|\s+)(.*)', re.IGNORECASE),
+    re.compile(r'what you\'ll (?:do|be doing)(?:\s*:|\s+)(.*)', re.IGNORECASE),
+    re.compile(r'responsibilities(?:\s*:|\s+)(.*)', re.IGNORECASE)
+]
+
+RESPONSIBILITY_PHRASE_RE = re.compile(r'\b(?:responsible for|in charge of|duties include|will be working on)\b', re.IGNORECASE)
+RESPONSIBILITY_VERB_RE = re.compile(r'^(?:Lead|Manage|Develop|Design|Create|Implement|Maintain|Support|Collaborate|Analyze|Report|Communicate|Oversee|Direct|Drive|Ensure|Provide|Work|Build|Architect|Optimize)', re.IGNORECASE)
+
+QUALIFICATION_LINE_RE = re.compile(
+    r'\b(?:must have|should have|requires?|required|proficien|expertise in|experience|knowledge of|familiarity with|'
+    r'degree|education|background in|certification|bachelor\'s|master\'s|phd|skill|understanding of)',
+    re.IGNORECASE
+)
+
+# Sections whose lines are never duties or requirements
+NON_DUTY_SECTIONS = ("about", "benefits", "location")
+
+def extract_job_details(html_content, url, progress=None, stream_tokens=False):
     """
     Extract job details from HTML content.
     
     Args:
         html_content (str): The HTML content of the job posting.
         url (str): The URL of the job posting.
+        progress (callable): Optional progress(event, data) callback. Each field is
+            reported as a "field" event with {"name", "value"} as soon as it is known.
+        stream_tokens (bool): With a progress callback, also relay the model output
+            for STREAMED_FIELDS as "token" events with {"field", "text"}. Only per-field
+            LLM calls stream; the combined call returns all fields at once.
         
     Returns:
         dict: The extracted job details.
     """
+    job_details, _, _ = _extract_job_details(html_content, url, progress, stream_tokens)
+    return job_details
+
+def extract_heuristic_details(html_content, url):
+    """
+    Extract job details without consulting the LLM.
+    
+    For batch runs that keep the CPU-bound parsing apart from LLM calls: the
+    result can be improved later with refine_with_llm.
+    
+    Args:
+        html_content (str): The HTML content of the job posting.
+        url (str): The URL of the job posting.
+        
+    Returns:
+        tuple: The job details, the page's plain text, and the fields the LLM
+            could still refine (those not given by structured data).
+    """
+    token = _llm_allowed.set(False)
+    try:
+        return _extract_job_details(html_content, url, use_llm=False)
+    finally:
+        _llm_allowed.reset(token)
+
+def refine_with_llm(job_details, plain_text, fields):
+    """
+    Re-extract fields of heuristic job details with the LLM's help.
+    
+    Args:
+        job_details (dict): Details from extract_heuristic_details, updated in place.
+        plain_text (str): The page's plain text.
+        fields (list): Fields to refine.
+        
+    Returns:
+        dict: The updated job details; unchanged if Ollama is unavailable.
+    """
+    if not fields or not plain_text or not is_ollama_available():
+        return job_details
+    
+    if LLM_EXTRACTION_MODE == "combined":
+        llm_fields = extract_all_with_llm(plain_text, list(fields))
+    else:
+        llm_fields = {field: extract_with_llm(plain_text, field) for field in fields}
+    
+    for field in fields:
+        if llm_fields.get(field) is not None:
+            job_details[field] = TEXT_EXTRACTORS[field](plain_text, llm_fields[field])
+    return job_details
+
+def _extract_job_details(html_content, url, progress=None, stream_tokens=False, use_llm=None):
+    """Extract job details; returns them with the plain text and the fields left to the text extractors."""
+    def report(name, value):
+        if progress is not None:
+            progress('field', {'name': name, 'value': value})
+    
     # Extract plain text from HTML for text-based analysis
     logger.debug("Extracting plain text from HTML content")
     
-    # Try to extract text using trafilatura first
-    plain_text = trafilatura.extract(html_content)
-    
-    # If trafilatura fails, fallback to BeautifulSoup
-    if not plain_text:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        plain_text = soup.get_text(separator=' ', strip=True)
+    # Parse the page once; text extraction and the structure-based lookups share the tree
+    page = JobPage(html_content, use_metadata=HTML_FAST_PATH)
+    plain_text = page.text
+    
+    # Fields stated outright by a schema.org JobPosting skip the heuristic and LLM extractors
+    known = extract_structured_fields(html_content, page)
+    if known:
+        logger.info(f"Structured data provides: {', '.join(known)}")
+    
+    # Fast path: trafilatura metadata already names the title and company, so skip the DOM
+    metadata = page.metadata
+    if metadata.get('title') and metadata.get('sitename'):
+        logger.debug("Using trafilatura metadata for title and company")
+        title = known.get('title') or metadata['title']
+        company = known.get('company') or metadata['sitename']
+        location = known.get('location') or extract_location(None, plain_text)
+    else:
+        title = known.get('title') or extract_job_title(page, plain_text)
+        company = known.get('company') or extract_company_name(page, plain_text)
+        location = known.get('location') or extract_location(page, plain_text)
+    report('title', title)
+    report('company', company)
+    report('location', location)
+    for field in LLM_FIELDS:
+        if field in known:
+            report(field, known[field])
+    
+    # Fetch all LLM fields in a single call; fields missing here are extracted individually
+    # Ollama availability is probed lazily and refreshed by a circuit breaker
+    if use_llm is None:
+        use_llm = is_ollama_available()
+    
+    # Text-based extractors for the fields structured data did not provide
+    text_extractors = {field: extractor for field, extractor in TEXT_EXTRACTORS.items() if field not in known}
+    
+    # A near-duplicate of an earlier posting reuses its fields: a hash and a lookup instead of LLM calls.
+    # Without the LLM nothing gets indexed, so an empty index is not worth hashing against.
+    fingerprint = None
+    if text_extractors and (use_llm or len(near_duplicate_index)):
+        fingerprint = near_duplicate_index.fingerprint(plain_text)
+    match = near_duplicate_index.find(fingerprint)
+    reused = {}
+    if match is not None:
+        fields, similarity = match
+        reused = {field: fields[field] for field in text_extractors if field in fields}
+        logger.info(f"Near-duplicate of an earlier posting ({similarity:.0%} similar), reusing: {', '.join(reused)}")
+        for field, value in reused.items():
+            report(field, value)
+        text_extractors = {field: extractor for field, extractor in text_extractors.items() if field not in reused}
+    
+    # Fields the model answered (not the keyword fallback), and the values built from them
+    model_fields = set()
+    from_model = {}
+    
+    llm_fields = {}
+    if use_llm and LLM_EXTRACTION_MODE == "combined" and text_extractors:
+        logger.info(f"Using combined LLM-based extraction for: {', '.join(text_extractors)}")
+        llm_fields = extract_all_with_llm(plain_text, list(text_extractors), model_fields=model_fields)
+    
+    def run_extractor(field, extractor):
+        llm_results = llm_fields.get(field)
+        if llm_results is None and use_llm:
+            on_token = None
+            if progress is not None and stream_tokens and field in STREAMED_FIELDS:
+                on_token = lambda text: progress('token', {'field': field, 'text': text})
+            llm_results = extract_with_llm(plain_text, field, on_token=on_token, model_fields=model_fields)
+        value = extractor(plain_text, llm_results)
+        # The extractors fall back to regex when the model gave nothing usable
+        if llm_results and field in model_fields:
+            from_model[field] = value
+        report(field, value)
+        return value
+    
+    if use_llm and LLM_EXTRACTION_MODE == "concurrent":
+        # Run the independent field extractions in parallel and report them as they finish
+        logger.info("Using concurrent LLM-based extraction for all fields")
+        executor = get_llm_executor()
+        futures = {executor.submit(run_extractor, field, extractor): field
+                   for field, extractor in text_extractors.items()}
+        text_fields = {futures[future]: future.result() for future in as_completed(futures)}
+    else:
+        text_fields = {field: run_extractor(field, extractor) for field, extractor in text_extractors.items()}
+    text_fields.update(reused)
+    # Only model output is worth reusing for later reposts; fallback and regex values are not indexed
+    from_model.update(reused)
+    near_duplicate_index.add(fingerprint, from_model)
+    text_fields.update((field, known[field]) for field in known if field in LLM_FIELDS)
     
-    # Create BeautifulSoup object for structure-based analysis
-    soup = BeautifulSoup(html_content, 'html.parser')
+    description_excerpt = extract_description_excerpt(plain_text)
+    report('description_excerpt', description_excerpt)
     
     # Initialize the result dictionary
     job_details = {
-        'title': extract_job_title(soup, plain_text),
-        'company': extract_company_name(soup, plain_text),
-        'skills': extract_skills(plain_text),
-        'experience': extract_experience(plain_text),
-        'location': extract_location(soup, plain_text),
-        'role_type': determine_role_type(plain_text),
-        'description_excerpt': extract_description_excerpt(plain_text),
-        'responsibilities': extract_responsibilities(plain_text),
-        'qualifications': extract_qualifications(plain_text)
+        'title': title,
+        'company': company,
+        'skills': text_fields['skills'],
+        'experience': text_fields['experience'],
+        'location': location,
+        'role_type': text_fields['role_type'],
+        'description_excerpt': description_excerpt,
+        'responsibilities': text_fields['responsibilities'],
+        'qualifications': text_fields['qualifications']
     }
     
     logger.debug(f"Extracted job details: {job_details}")
-    return job_details
+    return job_details, plain_text, list(text_extractors)
+
+def extract_structured_fields(html_content, page):
+    """
+    Extract the fields a schema.org JobPosting on the page states outright.
+    
+    JSON-LD is found by scanning the raw HTML; microdata is only read from the
+    parsed tree when the page declares a JobPosting item type.
+    
+    Args:
+        html_content (str): The HTML content of the job posting.
+        page (JobPage): The parsed page, used for microdata.
+        
+    Returns:
+        dict: The fields found, keyed like the job details.
+    """
+    try:
+        job = find_json_ld_job(html_content)
+        if job is None and has_microdata_job(html_content):
+            job = find_microdata_job(page.tree)
+        fields = job_posting_fields(job)
+    except Exception as e:
+        logger.error(f"Error reading structured data: {e}")
+        return {}
+    if 'skills' in fields:
+        fields['skills'] = SKILL_TAXONOMY.normalize(fields['skills'])
+    return fields
+
+def llm_allowed():
+    """Whether the extractors may call the LLM: Ollama is up and the caller has not opted out."""
+    return _llm_allowed.get() and is_ollama_available()
 
-def extract_job_title(soup, plain_text):
+def get_llm_executor():
+    """Return the shared thread pool used for concurrent LLM field extraction."""
+    global _llm_executor
+    with _llm_executor_lock:
+        if _llm_executor is None:
+            _llm_executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY,
+                                               thread_name_prefix="llm-extract")
+        return _llm_executor
+
+def extract_job_title(page, plain_text):
     """Extract the job title from the page."""
     # Try common HTML patterns first
     title_candidates = []
     
     # Look for h1 elements that might contain the job title
-    h1_elements = soup.find_all('h1')
-    for h1 in h1_elements:
-        title_candidates.append(h1.get_text(strip=True))
+    title_candidates.extend(page.find_texts('h1'))
     
     # Look for title in meta tags
-    meta_title = soup.find('meta', property='og:title')
-    if meta_title and meta_title.get('content'):
-        title_candidates.append(meta_title['content'])
+    meta_title = page.meta_content('og:title')
+    if meta_title:
+        title_candidates.append(meta_title)
     
     # Try to find elements with 'job-title' or similar in class or id
-    job_title_elements = soup.find_all(class_=lambda c: c and 'job-title' in c.lower())
-    job_title_elements += soup.find_all(id=lambda i: i and 'job-title' in i.lower())
-    for element in job_title_elements:
-        title_candidates.append(element.get_text(strip=True))
+    title_candidates.extend(page.texts_with_class_or_id('job-title'))
     
     # Look for the first non-empty candidate
     for title in title_candidates:
@@ -126,28 +394,24 @@ def extract_job_title(soup, plain_text):
             return title
     
     # Fallback: try to extract from plain text
-    title_match = re.search(r"(?:job title|position)(?:\s*:\s*|\s+is\s+)(.*?)(?:\.|,|\n)", 
-                           plain_text, re.IGNORECASE)
+    title_match = TITLE_TEXT_RE.search(plain_text)
     if title_match:
         return title_match.group(1).strip()
     
     return "Job Title Not Found"
 
-def extract_company_name(soup, plain_text):
+def extract_company_name(page, plain_text):
     """Extract the company name from the page."""
     # Try common HTML patterns first
     company_candidates = []
     
     # Look for company in meta tags
-    meta_company = soup.find('meta', property='og:site_name')
-    if meta_company and meta_company.get('content'):
-        company_candidates.append(meta_company['content'])
+    meta_company = page.meta_content('og:site_name')
+    if meta_company:
+        company_candidates.append(meta_company)
     
     # Try to find elements with 'company-name' or similar in class or id
-    company_elements = soup.find_all(class_=lambda c: c and 'company' in c.lower())
-    company_elements += soup.find_all(id=lambda i: i and 'company' in i.lower())
-    for element in company_elements:
-        company_candidates.append(element.get_text(strip=True))
+    company_candidates.extend(page.texts_with_class_or_id('company'))
     
     # Look for the first non-empty candidate
     for company in company_candidates:
@@ -155,23 +419,23 @@ def extract_company_name(soup, plain_text):
             return company
     
     # Fallback: try to extract from plain text
-    company_match = re.search(r"(?:company|organization)(?:\s*:\s*|\s+is\s+)(.*?)(?:\.|,|\n)", 
-                             plain_text, re.IGNORECASE)
+    company_match = COMPANY_TEXT_RE.search(plain_text)
     if company_match:
         return company_match.group(1).strip()
     
     return "Company Name Not Found"
 
-def extract_skills(text):
+def extract_skills(text, llm_results=None):
     """Extract skills from text using a combination of predefined keywords and dynamic extraction."""
     # Try LLM-based extraction if Ollama is available
-    if OLLAMA_AVAILABLE:
+    if llm_allowed():
         logger.info("Using LLM-based extraction for skills")
         try:
-            llm_results = extract_with_llm(text, "skills")
+            if llm_results is None:
+                llm_results = extract_with_llm(text, "skills")
             if llm_results and len(llm_results) > 0:
-                # Remove bullet points if they are present
-                clean_skills = [s.replace('• ', '') if s.startswith('• ') else s for s in llm_results]
+                # Remove bullet points and map aliases to canonical skill names
+                clean_skills = SKILL_TAXONOMY.normalize(llm_results)
                 return sorted(clean_skills)
             logger.warning("LLM extraction returned no results for skills, falling back to regex")
         except Exception as e:
@@ -182,102 +446,54 @@ def extract_skills(text):
     found_skills = []
     text_lower = text.lower()
     
-    # First pass: Use the predefined skills list
-    for skill in SKILL_KEYWORDS:
-        skill_lower = skill.lower()
-        # Use word boundary to match whole words only
-        pattern = r'\b' + re.escape(skill_lower) + r'\b'
-        if re.search(pattern, text_lower):
-            found_skills.append(skill)
-    
-    # Find skills in common sections like "Requirements" or "Qualifications"
-    skill_sections_patterns = [
-        r'(?:requirements|qualifications|skills needed|what you\'ll need|what you need|skills|technical skills|technical requirements)(?::|.{0,10})\s*(.*?)(?:(?:\n\n)|responsibilities|about the role|about us|what we offer|benefits)',
-        r'(?:experience|expertise|proficiency)(?::|.{0,10})\s*(.*?)(?:(?:\n\n)|responsibilities|qualifications|about the role|about us|what we offer|benefits)'
-    ]
+    # First pass: Use the skill taxonomy, matched on whole words in one scan
+    found_skills.extend(SKILL_TAXONOMY.find(text_lower))
     
-    skill_sections = []
-    for pattern in skill_sections_patterns:
-        sections = re.findall(pattern, text_lower, re.DOTALL)
-        skill_sections.extend(sections)
-    
-    if skill_sections:
-        for section in skill_sections:
-            # Extract bullet points or list items 
-            bullet_items = re.findall(r'(?:•|-|\*|\d+\.)\s*(.*?)(?:\n|$)', section)
-            
-            # If no bullet points found, try to split by sentences or commas
-            if not bullet_items:
-                # Try to split by sentences first
-                sentences = re.split(r'(?<=[.!?])\s+', section)
-                bullet_items = [s.strip() for s in sentences if s.strip()]
-            
-            for item in bullet_items:
-                item = item.strip()
-                if not item:
-                    continue
-                
-                # Look for technical skills in the bullet point
-                # First check if any known skills are mentioned
-                for skill in SKILL_KEYWORDS:
-                    skill_lower = skill.lower()
-                    if (f" {skill_lower} " in f" {item.lower()} " or 
-                        item.lower().startswith(skill_lower + " ") or 
-                        item.lower().endswith(" " + skill_lower)) and skill not in found_skills:
-                        found_skills.append(skill)
-                
-                # Then look for potential new skills (technical terms often have specific patterns)
-                # Look for terms that might be technologies, programming languages, frameworks, etc.
-                potential_skills = re.findall(r'\b([A-Z][a-zA-Z0-9]*(?:\s[A-Z][a-zA-Z0-9]*)*|[A-Za-z0-9]+\+\+|[A-Za-z0-9]+\#|[a-z][a-zA-Z0-9]+(?:\.js|\.NET))\b', item)
-                for skill in potential_skills:
-                    skill = skill.strip()
-                    # Ignore very common words and short terms
-                    if (len(skill) > 2 and 
-                        skill.lower() not in ['the', 'and', 'for', 'with', 'using', 'have', 'has', 'had', 'our', 'that', 'this'] and
-                        skill not in found_skills):
-                        found_skills.append(skill)
-                        
-                # Extract technical terms from the item
-                # Look for phrases like "experience with X", "knowledge of X", etc.
-                experience_patterns = [
-                    r'experience (?:with|in|using) ([^,.;]+)',
-                    r'knowledge of ([^,.;]+)',
-                    r'proficiency in ([^,.;]+)',
-                    r'familiarity with ([^,.;]+)',
-                    r'expertise in ([^,.;]+)',
-                    r'understanding of ([^,.;]+)',
-                    r'skilled in ([^,.;]+)',
-                    r'proficient in ([^,.;]+)'
-                ]
+    # Look closer at the items of skills and qualifications sections
+    for item in segment(text).items("skills", "qualifications"):
+        item_lower = item.lower()
+        
+        # First check if any known skills are mentioned as space-delimited terms
+        for skill in SKILL_TAXONOMY.find_space_delimited(item_lower):
+            if skill not in found_skills:
+                found_skills.append(skill)
+        
+        # Then look for potential new skills (technical terms often have specific patterns)
+        # Matched on lowercased text, so only names like c++, c# or node.js qualify
+        potential_skills = POTENTIAL_SKILL_RE.findall(item_lower)
+        for skill in potential_skills:
+            skill = skill.strip()
+            # Ignore very common words and short terms
+            if (len(skill) > 2 and 
+                skill.lower() not in ['the', 'and', 'for', 'with', 'using', 'have', 'has', 'had', 'our', 'that', 'this'] and
+                skill not in found_skills):
+                found_skills.append(skill)
                 
-                for pattern in experience_patterns:
-                    matches = re.findall(pattern, item.lower())
-                    for match in matches:
-                        # Split by 'and' or commas to get individual skills
-                        skills_parts = re.split(r'\s+and\s+|,\s*', match)
-                        for part in skills_parts:
-                            part = part.strip()
-                            if part and len(part) > 2 and part not in found_skills:
-                                found_skills.append(part)
-    
-    # Remove duplicates while preserving case
-    unique_skills = []
-    lower_skills = set()
-    
-    for skill in found_skills:
-        if skill.lower() not in lower_skills:
-            lower_skills.add(skill.lower())
-            unique_skills.append(skill)
+        # Extract technical terms from the item
+        # Look for phrases like "experience with X", "knowledge of X", etc.
+        for pattern in SKILL_PHRASE_REGEXES:
+            matches = pattern.findall(item_lower)
+            for match in matches:
+                # Split by 'and' or commas to get individual skills
+                skills_parts = SKILL_LIST_SPLIT_RE.split(match)
+                for part in skills_parts:
+                    part = part.strip()
+                    if part and len(part) > 2 and part not in found_skills:
+                        found_skills.append(part)
+    
+    # Map aliases to canonical names and remove duplicates while preserving case
+    unique_skills = SKILL_TAXONOMY.normalize(found_skills)
     
     return sorted(unique_skills) if unique_skills else ["No specific skills identified"]
 
-def extract_experience(text):
+def extract_experience(text, llm_results=None):
     """Extract experience requirements from text."""
     # Try LLM-based extraction if Ollama is available
-    if OLLAMA_AVAILABLE:
+    if llm_allowed():
         logger.info("Using LLM-based extraction for experience")
         try:
-            llm_results = extract_with_llm(text, "experience")
+            if llm_results is None:
+                llm_results = extract_with_llm(text, "experience")
             if llm_results and len(llm_results) > 0:
                 # For experience, we expect a single string result
                 if isinstance(llm_results, list) and len(llm_results) > 0:
@@ -290,39 +506,37 @@ def extract_experience(text):
     
     # Fallback to regex-based extraction if LLM is not available or fails
     # Look for patterns like "X years of experience"
-    for pattern in EXPERIENCE_PATTERNS:
-        experience_match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in EXPERIENCE_REGEXES:
+        experience_match = pattern.search(text)
         if experience_match:
             years = experience_match.group(1)
             return f"{years}+ years of experience required"
     
     # Check for more general mentions of experience
-    if re.search(r'\bentry[\s-]level\b', text, re.IGNORECASE):
+    if ENTRY_LEVEL_RE.search(text):
         return "Entry-level position"
-    if re.search(r'\bjunior\b', text, re.IGNORECASE):
+    if JUNIOR_RE.search(text):
         return "Junior-level position"
-    if re.search(r'\bsenior\b', text, re.IGNORECASE):
+    if SENIOR_RE.search(text):
         return "Senior-level position"
-    if re.search(r'\bexperienced\b', text, re.IGNORECASE):
+    if EXPERIENCED_RE.search(text):
         return "Experience required (unspecified years)"
     
     return "Experience requirements not clearly specified"
 
-def extract_location(soup, text):
-    """Extract job location from the page."""
+def extract_location(page, text):
+    """Extract job location from the page, or from the text alone if page is None."""
     # Try to find location in structured HTML first
     location_candidates = []
     
-    # Look for elements with 'location' in class or id
-    location_elements = soup.find_all(class_=lambda c: c and 'location' in c.lower())
-    location_elements += soup.find_all(id=lambda i: i and 'location' in i.lower())
-    for element in location_elements:
-        location_candidates.append(element.get_text(strip=True))
-    
-    # Check for location in meta tags
-    meta_location = soup.find('meta', property='og:location')
-    if meta_location and meta_location.get('content'):
-        location_candidates.append(meta_location['content'])
+    if page is not None:
+        # Look for elements with 'location' in class or id
+        location_candidates.extend(page.texts_with_class_or_id('location'))
+        
+        # Check for location in meta tags
+        meta_location = page.meta_content('og:location')
+        if meta_location:
+            location_candidates.append(meta_location)
     
     # Look for the first non-empty candidate
     for location in location_candidates:
@@ -330,28 +544,29 @@ def extract_location(soup, text):
             return location
     
     # Try text-based pattern matching
-    for pattern in LOCATION_PATTERNS:
-        location_match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in LOCATION_REGEXES:
+        location_match = pattern.search(text)
         if location_match:
             return location_match.group(1).strip()
     
     # Check for common location indicators
-    if re.search(r'\bremote\b', text, re.IGNORECASE):
+    if REMOTE_RE.search(text):
         return "Remote"
-    if re.search(r'\bhybrid\b', text, re.IGNORECASE):
+    if HYBRID_RE.search(text):
         return "Hybrid"
-    if re.search(r'\bon[\s-]site\b', text, re.IGNORECASE) or re.search(r'\bin[\s-]office\b', text, re.IGNORECASE):
+    if ON_SITE_RE.search(text) or IN_OFFICE_RE.search(text):
         return "On-site (location not specified)"
     
     return "Location not clearly specified"
 
-def determine_role_type(text):
+def determine_role_type(text, llm_results=None):
     """Determine if the role is for an individual contributor or team lead."""
     # Try LLM-based extraction if Ollama is available
-    if OLLAMA_AVAILABLE:
+    if llm_allowed():
         logger.info("Using LLM-based extraction for role_type")
         try:
-            llm_results = extract_with_llm(text, "role_type")
+            if llm_results is None:
+                llm_results = extract_with_llm(text, "role_type")
             if llm_results:
                 # For role_type, we expect a single string result
                 if isinstance(llm_results, list) and len(llm_results) > 0:
@@ -369,19 +584,16 @@ def determine_role_type(text):
     ic_count = 0
     lead_count = 0
     
-    for keyword in ROLE_TYPE_KEYWORDS['individual_contributor']:
-        ic_count += len(re.findall(r'\b' + re.escape(keyword) + r'\b', text_lower))
-    
-    for keyword in ROLE_TYPE_KEYWORDS['team_lead']:
-        lead_count += len(re.findall(r'\b' + re.escape(keyword) + r'\b', text_lower))
+    ic_count += sum(ROLE_TYPE_MATCHERS['individual_contributor'].count(text_lower).values())
+    lead_count += sum(ROLE_TYPE_MATCHERS['team_lead'].count(text_lower).values())
     
     # Look for specific indicators of management responsibility
-    manages_team = re.search(r'\b(?:manage|lead|supervise)(?:s|ing)?\s+(?:a\s+)?team\b', text_lower)
+    manages_team = MANAGES_TEAM_RE.search(text_lower)
     if manages_team:
         lead_count += 3  # Give extra weight to explicit mentions of team management
     
     # Look for phrases about working independently
-    works_independently = re.search(r'\b(?:work(?:s|ing)?\s+independently|individual\s+contributor)\b', text_lower)
+    works_independently = WORKS_INDEPENDENTLY_RE.search(text_lower)
     if works_independently:
         ic_count += 3  # Give extra weight to explicit mentions of working independently
     
@@ -399,15 +611,8 @@ def determine_role_type(text):
 def extract_description_excerpt(text, max_length=200):
     """Extract a short excerpt from the job description."""
     # Try to find the start of the job description
-    desc_start_patterns = [
-        r'job description(?:\s*:|\s+)(.*)',
-        r'about the (?:job|role|position)(?:\s*:|\s+)(.*)',
-        r'what you\'ll (?:do|be doing)(?:\s*:|\s+)(.*)',
-        r'responsibilities(?:\s*:|\s+)(.*)'
-    ]
-    
-    for pattern in desc_start_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in DESCRIPTION_START_REGEXES:
+        match = pattern.search(text)
         if match:
             excerpt = match.group(1).strip()
             # Truncate and add ellipsis if needed
@@ -420,13 +625,14 @@ def extract_description_excerpt(text, max_length=200):
         return text[:max_length-3] + "..."
     return text
 
-def extract_responsibilities(text):
+def extract_responsibilities(text, llm_results=None):
     """Extract key responsibilities from the job description."""
     # Try LLM-based extraction if Ollama is available
-    if OLLAMA_AVAILABLE:
+    if llm_allowed():
         logger.info("Using LLM-based extraction for responsibilities")
         try:
-            llm_results = extract_with_llm(text, "responsibilities")
+            if llm_results is None:
+                llm_results = extract_with_llm(text, "responsibilities")
             if llm_results and len(llm_results) > 0:
                 return llm_results
             logger.warning("LLM extraction returned no results for responsibilities, falling back to regex")
@@ -434,171 +640,30 @@ def extract_responsibilities(text):
             logger.error(f"Error in LLM-based extraction for responsibilities: {e}")
             logger.info("Falling back to regex-based extraction")
     
-    # Fallback to regex-based extraction if LLM is not available or fails
-    # Check for specific standalone "Key Responsibilities:" section first - very specific pattern
-    standalone_match = re.search(r'Key\s+Responsibilities\s*:\s*\n\s*((?:.+\n)+?)(?:\n\n|\n\s*Qualifications)', 
-                               text, re.IGNORECASE | re.DOTALL)
-    
-    # If that doesn't work, try a more general pattern
-    if not standalone_match:
-        standalone_match = re.search(r'key\s+responsibilities\s*:?\s*\n((?:.+\n)+?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))', 
-                                text, re.IGNORECASE | re.DOTALL)
-    
-    if standalone_match:
-        responsibilities_text = standalone_match.group(1).strip()
-        # Process the found text into bullet points
-        bullet_items = re.findall(r'(?:•|-|\*|\d+\.)\s*(.*?)(?:\n|$)', responsibilities_text)
-        
-        # If the text doesn't have bullet formatting, each line might be a responsibility
-        if not bullet_items:
-            lines = [line.strip() for line in responsibilities_text.split('\n') if line.strip()]
-            if lines:
-                formatted_responsibilities = []
-                for line in lines:
-                    if not line or len(line) < 10:
-                        continue
-                    # Limit to a reasonable length
-                    if len(line) > 80:
-                        truncated = line[:80].rsplit(' ', 1)[0] + "..."
-                        formatted_responsibilities.append("• " + truncated)
-                    else:
-                        formatted_responsibilities.append("• " + line)
-                if formatted_responsibilities:
-                    return formatted_responsibilities[:10]
-    
-    # Define more general patterns to look for responsibility sections
-    responsibility_patterns = [
-        # Various header formats
-        r'(?:key\s+)?responsibilities(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))',
-        r'(?:key\s+)?duties(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))',
-        r'what\s+you\'ll\s+(?:do|be\s+doing)(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))',
-        r'job\s+(?:duties|functions)(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))',
-        r'the\s+role(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))',
-        r'responsibilities\s+and\s+duties(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))',
-        r'primary\s+responsibilities(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:qualifications|requirements|skills|about|apply|benefits|$))'
-    ]
+    # Fallback to the responsibilities sections found by the segmenter
+    posting = segment(text)
+    responsibilities = format_items(posting.items("responsibilities"), 10)
+    if responsibilities:
+        return responsibilities
     
-    for pattern in responsibility_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if match:
-            responsibilities_text = match.group(1).strip()
-            
-            # Extract bullet points or numbered items
-            bullet_items = re.findall(r'(?:•|-|\*|\d+\.)\s*(.*?)(?:\n|$)', responsibilities_text)
-            
-            # If no bullet points found, try to split by sentences or newlines
-            if not bullet_items:
-                # First try to split by newlines, as each line might be a separate responsibility
-                lines = [line.strip() for line in responsibilities_text.split('\n') if line.strip()]
-                if lines:
-                    formatted_responsibilities = []
-                    for line in lines:
-                        if not line or len(line) < 10:
-                            continue
-                        # Limit to a reasonable length
-                        if len(line) > 80:
-                            truncated = line[:80].rsplit(' ', 1)[0] + "..."
-                            formatted_responsibilities.append("• " + truncated)
-                        else:
-                            formatted_responsibilities.append("• " + line)
-                    if formatted_responsibilities:
-                        return formatted_responsibilities[:10]
-                
-                # If that doesn't work, try to split by sentences
-                sentences = re.split(r'(?<=[.!?])\s+', responsibilities_text)
-                bullet_items = [s.strip() for s in sentences if s.strip()]
-            
-            # Format as a list with bullet points - keep them concise
-            if bullet_items:
-                formatted_responsibilities = []
-                for item in bullet_items:
-                    item = item.strip()
-                    if not item:
-                        continue
-                    # Limit to a reasonable length
-                    if len(item) > 80:
-                        # Try to truncate at a logical point
-                        truncated = item[:80].rsplit(' ', 1)[0] + "..."
-                        formatted_responsibilities.append("• " + truncated)
-                    else:
-                        formatted_responsibilities.append("• " + item)
-                return formatted_responsibilities[:10]  # Limit to 10 items
-            
-            # If no structured format found, try to break into smaller chunks
-            sentences = re.split(r'(?<=[.!?])\s+', responsibilities_text)
-            if sentences:
-                formatted_sentences = []
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence or len(sentence) < 10:
-                        continue
-                    # Limit to a reasonable length
-                    if len(sentence) > 80:
-                        truncated = sentence[:80].rsplit(' ', 1)[0] + "..."
-                        formatted_sentences.append("• " + truncated)
-                    else:
-                        formatted_sentences.append("• " + sentence)
-                if formatted_sentences:
-                    return formatted_sentences[:8]  # Limit to 8 to avoid overwhelming
-            
-            # Last resort - extract key phrases
-            keywords = ["manage", "develop", "create", "implement", "support", "collaborate"]
-            phrases = []
-            for keyword in keywords:
-                matches = re.finditer(rf'\b{keyword}\b.*?\.', responsibilities_text, re.IGNORECASE)
-                for match in matches:
-                    phrase = match.group(0).strip()
-                    if 10 < len(phrase) < 80:
-                        phrases.append("• " + phrase)
-            if phrases:
-                return phrases[:8]
-                
-            # If all else fails, return a chunked version of the text
-            if len(responsibilities_text) > 80:
-                chunks = [responsibilities_text[i:i+80] for i in range(0, len(responsibilities_text), 80)]
-                return ["• " + chunk + "..." for chunk in chunks[:5]]
-            return ["• " + responsibilities_text]
-    
-    # If still not found, look for any paragraph that seems to describe job duties
-    # This is a fallback approach with looser pattern matching
-    fallback_patterns = [
-        r'(?:manage|lead|develop|design|create|implement|maintain|support|collaborate|analyze|report|communicate|oversee|direct|drive|ensure|provide|work|build)(.*?)(?:\.|$)',
-        r'(?:responsible for|in charge of|duties include|will be working on)(.*?)(?:\.|$)'
-    ]
-    
-    found_duties = []
-    for pattern in fallback_patterns:
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        for match in matches:
-            duty = match.group(0).strip()
-            if duty and len(duty) > 15 and len(duty) < 200:  # Reasonable length for a responsibility
-                found_duties.append("• " + duty)
-    
-    if found_duties:
-        return found_duties[:8]  # Limit to first 8 to avoid too many false positives
-    
-    # Last resort - try to look for lines that might be responsibilities based on verb patterns
-    lines = text.split('\n')
-    verb_pattern = r'^(?:Lead|Manage|Develop|Design|Create|Implement|Maintain|Support|Collaborate|Analyze|Report|Communicate|Oversee|Direct|Drive|Ensure|Provide|Work|Build|Architect|Optimize)'
-    
-    verb_lines = []
-    for line in lines:
-        if re.match(verb_pattern, line.strip(), re.IGNORECASE) and len(line.strip()) > 15:
-            verb_lines.append("• " + line.strip())
-    
-    if verb_lines:
-        return verb_lines[:8]  # Limit to avoid false positives
+    # Without a section, take lines anywhere that read like duties
+    duties = [item for section in posting.sections if section.kind not in NON_DUTY_SECTIONS
+              for item in section.items
+              if len(item) > 15 and (RESPONSIBILITY_VERB_RE.match(item) or RESPONSIBILITY_PHRASE_RE.search(item))]
+    if duties:
+        return format_items(duties, 8, max_length=None)
     
     # If no responsibility section found
     return ["No specific responsibilities section found in the job posting."]
 
-def extract_qualifications(text):
+def extract_qualifications(text, llm_results=None):
     """Extract qualifications and skills requirements from the job description."""
     # Try LLM-based extraction if Ollama is available
-    if OLLAMA_AVAILABLE:
+    if llm_allowed():
         logger.info("Using LLM-based extraction for qualifications")
         try:
-            llm_results = extract_with_llm(text, "qualifications")
+            if llm_results is None:
+                llm_results = extract_with_llm(text, "qualifications")
             if llm_results and len(llm_results) > 0:
                 return llm_results
             logger.warning("LLM extraction returned no results for qualifications, falling back to regex")
@@ -606,164 +671,40 @@ def extract_qualifications(text):
             logger.error(f"Error in LLM-based extraction for qualifications: {e}")
             logger.info("Falling back to regex-based extraction")
     
-    # Fallback to regex-based extraction if LLM is not available or fails
-    # Check for specific standalone "Qualifications & Skills:" section first - very specific pattern
-    standalone_match = re.search(r'Qualifications\s+&\s+Skills\s*:\s*\n\s*((?:.+\n)+?)(?:\n\n|\nLocation)', 
-                           text, re.IGNORECASE | re.DOTALL)
-    
-    # If that doesn't work, try a more general pattern
-    if not standalone_match:
-        standalone_match = re.search(r'(?:qualifications\s*(?:&|and)?\s*skills|skills\s*(?:&|and)?\s*qualifications)\s*:?\s*\n((?:.+\n)+?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))', 
-                                text, re.IGNORECASE | re.DOTALL)
-    
-    if standalone_match:
-        qualifications_text = standalone_match.group(1).strip()
-        # Process the found text into bullet points
-        bullet_items = re.findall(r'(?:•|-|\*|\d+\.)\s*(.*?)(?:\n|$)', qualifications_text)
-        
-        # If the text doesn't have bullet formatting, each line might be a qualification
-        if not bullet_items:
-            lines = [line.strip() for line in qualifications_text.split('\n') if line.strip()]
-            if lines:
-                formatted_qualifications = []
-                for line in lines:
-                    if not line or len(line) < 10:
-                        continue
-                    # Limit to a reasonable length
-                    if len(line) > 80:
-                        truncated = line[:80].rsplit(' ', 1)[0] + "..."
-                        formatted_qualifications.append("• " + truncated)
-                    else:
-                        formatted_qualifications.append("• " + line)
-                if formatted_qualifications:
-                    return formatted_qualifications[:10]
-    
-    # Define more general patterns to look for qualification sections
-    qualification_patterns = [
-        # Various header formats
-        r'(?:key\s+)?qualifications(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))',
-        r'(?:key\s+)?requirements(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))',
-        r'skills(?:\s+required|needed)?(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))',
-        r'what\s+you\'ll\s+need(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))',
-        r'we\'re\s+looking\s+for(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))',
-        r'(?:candidate|applicant)\s+requirements(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))',
-        r'(?:required|preferred)\s+qualifications(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))',
-        r'experience\s+(?:required|needed)(?:\s*:|\s*\n)(.*?)(?:\n\n|\n\s*(?:responsibilities|about|apply|benefits|company|compensation|$))'
-    ]
+    # Fallback to the qualifications (or else skills) sections found by the segmenter
+    posting = segment(text)
+    qualifications = format_items(posting.items("qualifications") or posting.items("skills"), 10)
+    if qualifications:
+        return qualifications
     
-    for pattern in qualification_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if match:
-            qualifications_text = match.group(1).strip()
-            
-            # Extract bullet points or numbered items
-            bullet_items = re.findall(r'(?:•|-|\*|\d+\.)\s*(.*?)(?:\n|$)', qualifications_text)
-            
-            # If no bullet points found, try to split by sentences or newlines
-            if not bullet_items:
-                # First try to split by newlines, as each line might be a separate qualification
-                lines = [line.strip() for line in qualifications_text.split('\n') if line.strip()]
-                if lines:
-                    formatted_qualifications = []
-                    for line in lines:
-                        if not line or len(line) < 10:
-                            continue
-                        # Limit to a reasonable length
-                        if len(line) > 80:
-                            truncated = line[:80].rsplit(' ', 1)[0] + "..."
-                            formatted_qualifications.append("• " + truncated)
-                        else:
-                            formatted_qualifications.append("• " + line)
-                    if formatted_qualifications:
-                        return formatted_qualifications[:10]
-                
-                # If that doesn't work, try to split by sentences
-                sentences = re.split(r'(?<=[.!?])\s+', qualifications_text)
-                bullet_items = [s.strip() for s in sentences if s.strip()]
-            
-            # Format as a list with bullet points - keep them concise
-            if bullet_items:
-                formatted_qualifications = []
-                for item in bullet_items:
-                    item = item.strip()
-                    if not item:
-                        continue
-                    # Limit to a reasonable length
-                    if len(item) > 80:
-                        # Try to truncate at a logical point
-                        truncated = item[:80].rsplit(' ', 1)[0] + "..."
-                        formatted_qualifications.append("• " + truncated)
-                    else:
-                        formatted_qualifications.append("• " + item)
-                return formatted_qualifications[:10]  # Limit to 10 items
-            
-            # If no structured format found, try to break into smaller chunks
-            sentences = re.split(r'(?<=[.!?])\s+', qualifications_text)
-            if sentences:
-                formatted_sentences = []
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence or len(sentence) < 10:
-                        continue
-                    # Limit to a reasonable length
-                    if len(sentence) > 80:
-                        truncated = sentence[:80].rsplit(' ', 1)[0] + "..."
-                        formatted_sentences.append("• " + truncated)
-                    else:
-                        formatted_sentences.append("• " + sentence)
-                if formatted_sentences:
-                    return formatted_sentences[:8]  # Limit to 8 to avoid overwhelming
-            
-            # Last resort - extract key phrases
-            keywords = ["experience", "knowledge", "degree", "skills", "proficient", "education"]
-            phrases = []
-            for keyword in keywords:
-                matches = re.finditer(rf'\b{keyword}\b.*?\.', qualifications_text, re.IGNORECASE)
-                for match in matches:
-                    phrase = match.group(0).strip()
-                    if 10 < len(phrase) < 80:
-                        phrases.append("• " + phrase)
-            if phrases:
-                return phrases[:8]
-                
-            # If all else fails, return a chunked version of the text
-            if len(qualifications_text) > 80:
-                chunks = [qualifications_text[i:i+80] for i in range(0, len(qualifications_text), 80)]
-                return ["• " + chunk + "..." for chunk in chunks[:5]]
-            return ["• " + qualifications_text]
-    
-    # If still not found, look for any paragraph that seems to describe qualifications
-    # This is a fallback approach with looser pattern matching
-    fallback_patterns = [
-        r'(?:must have|should have|requires|required|proficient in|expertise in|experience with|knowledge of|familiarity with)(.*?)(?:\.|$)',
-        r'(?:degree in|education in|background in|certification in|qualified in)(.*?)(?:\.|$)',
-        r'(?:you have|you are|you will have|you should have|bachelor\'s|master\'s|phd)(.*?)(?:\.|$)'
-    ]
-    
-    found_qualifications = []
-    for pattern in fallback_patterns:
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        for match in matches:
-            qualification = match.group(0).strip()
-            if qualification and len(qualification) > 15 and len(qualification) < 200:  # Reasonable length
-                found_qualifications.append("• " + qualification)
-    
-    if found_qualifications:
-        return found_qualifications[:8]  # Limit to avoid too many false positives
-    
-    # Last resort - look for common patterns of qualifications by keyword
-    keywords = ['experience', 'knowledge', 'degree', 'education', 'skill', 'proficiency', 'certification', 'understanding']
-    
-    keyword_qualifications = []
-    lines = text.split('\n')
-    for line in lines:
-        for keyword in keywords:
-            if keyword in line.lower() and len(line.strip()) > 15 and len(line.strip()) < 200:
-                keyword_qualifications.append("• " + line.strip())
-                break  # Only add each line once
-    
-    if keyword_qualifications:
-        return keyword_qualifications[:8]  # Limit to avoid false positives
+    # Without a section, take lines anywhere that read like requirements
+    requirements = [item for section in posting.sections if section.kind not in NON_DUTY_SECTIONS
+                    for item in section.items
+                    if 15 < len(item) < 200 and QUALIFICATION_LINE_RE.search(item)]
+    if requirements:
+        return format_items(requirements, 8, max_length=None)
     
     # If no qualification section found
     return ["No specific qualifications section found in the job posting."]
+
+def format_items(items, limit, min_length=10, max_length=80):
+    """Format section items as "• " bullets, shortening ones over max_length (if set) at a word boundary."""
+    formatted = []
+    for item in items:
+        if len(item) < min_length:
+            continue
+        if max_length and len(item) > max_length:
+            item = item[:max_length].rsplit(' ', 1)[0] + "..."
+        formatted.append("• " + item)
+        if len(formatted) == limit:
+            break
+    return formatted
+
+# Text-based extractors, keyed by the LLM field that feeds them
+TEXT_EXTRACTORS = {
+    'skills': extract_skills,
+    'experience': extract_experience,
+    'role_type': determine_role_type,
+    'responsibilities': extract_responsibilities,
+    'qualifications': extract_qualifications
+}